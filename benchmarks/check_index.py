@@ -0,0 +1,127 @@
+from typing import Any, Callable, Dict, List, Tuple
+from pathlib import Path
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+
+from analyzer.tree_parser import CodeParser, LANGUAGE_LIBRARY
+from analyzer.parallel import ParallelAnalyzer
+from analyzer.repo_index import AUTO, SCAN, RepositoryIndex
+from analyzer.sources import DEFAULT_IGNORES
+from benchmarks.corpus import add_corpus_arguments, corpus_options, generate_corpus, write_corpus
+
+# A module git ignores, and a tracked one calling into it
+GENERATED = "def gen_helper(value):\n    return value\n"
+USES_GENERATED = "from gen.g import gen_helper\n\n\ndef use_gen(value):\n    return gen_helper(value)\n"
+
+FIRST_FUNCTION = re.compile(r"^def (\w+)\(", re.MULTILINE)
+
+
+def git(root: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=check", "-c", "user.email=check@localhost", *args],
+        check=True, capture_output=True
+    )
+
+
+def rename_first_function(path: Path) -> None:
+    source = path.read_text()
+    path.write_text(FIRST_FUNCTION.sub(r"def \1_renamed(", source, count=1))
+
+
+def snapshot(index: RepositoryIndex) -> Dict[str, Any]:
+    return {file: index.record(file) for file in sorted(index.files)}
+
+
+def scenario(root: Path) -> List[Tuple[str, str, Callable[[], None]]]:
+    """Changes applied one after another, each with how the index finds them."""
+    def commit() -> None:
+        rename_first_function(root / "pkg0" / "mod3.py")
+        git(root, "rm", "-q", "pkg0/mod5.py")
+        (root / "pkg0" / "extra.py").write_text(
+            "from pkg0.mod3 import *\nfrom pkg0 import mod4\n\n\ndef extra(value):\n"
+            "    return mod4.mod4_func_0(value)\n")
+        git(root, "add", "-A")
+        git(root, "commit", "-qm", "change")
+
+    def uncommitted() -> None:
+        with open(root / "pkg0" / "mod1.py", "a") as f:
+            f.write("\n\ndef late(value):\n    return value\n")
+        (root / "pkg0" / "untracked.py").write_text("from pkg0.mod1 import late\n\n\ndef fresh(value):\n"
+                                                    "    return late(value)\n")
+
+    def reverted() -> None:
+        git(root, "checkout", "-q", "pkg0/mod1.py")
+
+    def ignored_edit() -> None:
+        path = root / "gen" / "g.py"
+        path.write_text(path.read_text().replace("gen_helper", "gen_helper2"))
+
+    def ignored_add_delete() -> None:
+        (root / "gen" / "h.py").write_text(GENERATED.replace("gen_helper", "gen_other"))
+        (root / "gen" / "g.py").unlink()
+
+    def scanned() -> None:
+        rename_first_function(root / "pkg0" / "mod7.py")
+
+    return [
+        ("commit: rename, delete, add", AUTO, commit),
+        ("uncommitted edit and untracked file", AUTO, uncommitted),
+        ("uncommitted edit reverted", AUTO, reverted),
+        ("gitignored file edited", AUTO, ignored_edit),
+        ("gitignored file added and deleted", AUTO, ignored_add_delete),
+        ("work tree edit found by scanning", SCAN, scanned)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that a repository index kept up to date through a series of "
+                    "changes to a git repository equals one built from scratch.")
+    add_corpus_arguments(parser)
+    parser.add_argument("--library", default=LANGUAGE_LIBRARY, help="prebuilt grammar library")
+    parser.set_defaults(files=120)
+    args = parser.parse_args()
+
+    code_parser = CodeParser(args.library, build_if_missing=False)
+    analyzer = ParallelAnalyzer(code_parser, workers=1)
+    ignore = list(DEFAULT_IGNORES)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory) / "repo"
+        write_corpus(generate_corpus(**corpus_options(args)), root)
+        (root / ".gitignore").write_text("gen/\n")
+        (root / "gen").mkdir()
+        (root / "gen" / "g.py").write_text(GENERATED)
+        (root / "pkg0" / "uses_gen.py").write_text(USES_GENERATED)
+        git(root, "init", "-q")
+        git(root, "add", "-A")
+        git(root, "commit", "-qm", "init")
+
+        RepositoryIndex(Path(directory) / "index", root, analyzer, ignore).update()
+        for step, (description, detect, change) in enumerate(scenario(root)):
+            change()
+            index = RepositoryIndex(Path(directory) / "index", root, analyzer, ignore)
+            stats = index.update(detect)
+            fresh = RepositoryIndex(Path(directory) / f"fresh{step}", root, analyzer, ignore)
+            fresh.update()
+            matches = snapshot(index) == snapshot(fresh)
+            failures += not matches
+            print(
+                f"{'ok  ' if matches else 'FAIL'} {description}: {stats['mode']}, "
+                f"{stats['analyzed']} analyzed, {len(stats['deleted'])} deleted, "
+                f"{len(stats['affected'])} resolved again"
+            )
+    analyzer.shutdown()
+
+    if failures:
+        print(f"\n{failures} incremental updates differ from a fresh index")
+        return 1
+    print("\nEvery incremental update equals a fresh index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
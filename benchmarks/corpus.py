@@ -0,0 +1,183 @@
+from typing import Dict, List, Tuple
+from pathlib import Path
+import argparse
+import random
+
+# Modules per generated package
+MODULES_PER_PACKAGE = 20
+
+# Earlier modules each module imports from
+IMPORTS_PER_MODULE = 3
+
+
+class ModuleWriter:
+    """Writes one synthetic module, choosing everything from a seeded generator."""
+
+    def __init__(self, rng: random.Random, name: str, depth: int, call_density: float,
+                 imported: List[str], bases: List[str]):
+        self.rng = rng
+        self.name = name
+        self.stem = name.rsplit(".", 1)[-1]
+        self.depth = depth
+        self.call_density = call_density
+        # Functions callable from anywhere in this module, local ones added as written
+        self.callables = list(imported)
+        self.bases = list(bases)
+        self.functions: List[str] = []
+        self.classes: List[str] = []
+        self.lines: List[str] = []
+        self.size = 0
+
+    def emit(self, indent: int, text: str) -> None:
+        line = "    " * indent + text if text else ""
+        self.lines.append(line)
+        self.size += len(line) + 1
+
+    def _call_count(self) -> int:
+        whole = int(self.call_density)
+        return whole + (1 if self.rng.random() < self.call_density - whole else 0)
+
+    def _calls(self, indent: int, method_names: List[str]) -> None:
+        for _ in range(self._call_count()):
+            targets = self.callables + [f"self.{name}" for name in method_names]
+            if not targets:
+                return
+            target = self.rng.choice(targets)
+            self.emit(indent, f"value = {target}(value)")
+
+    def body(self, indent: int, depth: int, method_names: List[str]) -> None:
+        """A block of statements with compound statements nested depth deep."""
+        self.emit(indent, f"value = value + {self.rng.randint(1, 99)}")
+        self._calls(indent, method_names)
+        if depth > 0:
+            kind = self.rng.choice(("if", "for", "def", "with"))
+            if kind == "if":
+                self.emit(indent, f"if value > {self.rng.randint(0, 1000)}:")
+            elif kind == "for":
+                self.emit(indent, f"for item in range({self.rng.randint(2, 9)}):")
+            elif kind == "with":
+                self.emit(indent, "with open(__file__) as handle:")
+            else:
+                inner = f"inner_{depth}"
+                self.emit(indent, f"def {inner}(value):")
+                self.body(indent + 1, depth - 1, [])
+                self.emit(indent + 1, "return value")
+                self.emit(indent, f"value = {inner}(value)")
+                return
+            self.body(indent + 1, depth - 1, method_names)
+        self.emit(indent, "")
+
+    def function(self) -> None:
+        name = f"{self.stem}_func_{len(self.functions)}"
+        self.emit(0, f"def {name}(value):")
+        self.emit(1, f'"""Synthetic function {len(self.functions)} of {self.name}."""')
+        self.body(1, self.depth, [])
+        self.emit(1, "return value")
+        self.emit(0, "")
+        self.emit(0, "")
+        self.functions.append(name)
+        self.callables.append(name)
+
+    def cls(self) -> None:
+        name = f"{self.stem.title().replace('_', '')}Class{len(self.classes)}"
+        base = self.rng.choice(self.bases) if self.bases and self.rng.random() < 0.5 else None
+        self.emit(0, f"class {name}({base}):" if base else f"class {name}:")
+        methods = [f"method_{i}" for i in range(self.rng.randint(2, 4))]
+        for index, method in enumerate(methods):
+            self.emit(1, f"def {method}(self, value):")
+            # Methods call the ones before them, so calls stay acyclic
+            self.body(2, max(0, self.depth - 1), methods[:index])
+            self.emit(2, "return value")
+            self.emit(0, "")
+        self.emit(0, "")
+        self.classes.append(name)
+        self.bases.append(name)
+
+
+def generate_corpus(files: int = 100, file_bytes: int = 4096, depth: int = 3,
+                    call_density: float = 2.0, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """
+    Generate a synthetic Python codebase as (path, content) pairs.
+
+    Modules are spread over packages and import functions and classes
+    from earlier modules, so calls and inheritance cross files. Each
+    module grows by functions and classes until it holds about file_bytes;
+    function bodies nest compound statements depth levels deep and make
+    call_density calls per block on average. The same arguments always
+    give the same corpus.
+    """
+    rng = random.Random(seed)
+    corpus: List[Tuple[str, bytes]] = []
+    # Top-level names of every module written so far, by module name
+    exports: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    for index in range(files):
+        package = f"pkg{index // MODULES_PER_PACKAGE}"
+        module = f"{package}.mod{index}"
+
+        sources = rng.sample(sorted(exports), min(IMPORTS_PER_MODULE, len(exports)))
+        imports = ["import os", "import sys"]
+        imported: List[str] = []
+        bases: List[str] = []
+        for source in sources:
+            functions, classes = exports[source]
+            names = rng.sample(functions, min(2, len(functions)))
+            if classes:
+                names.append(rng.choice(classes))
+                bases.append(names[-1])
+            imported.extend(name for name in names if name in functions)
+            imports.append(f"from {source} import {', '.join(names)}")
+
+        writer = ModuleWriter(rng, module, depth, call_density, imported, bases)
+        for line in imports:
+            writer.emit(0, line)
+        writer.emit(0, "")
+        writer.emit(0, "")
+        # At least one function and one class, so every module has both
+        while writer.size < file_bytes or not writer.functions or not writer.classes:
+            if rng.random() < 0.6:
+                writer.function()
+            else:
+                writer.cls()
+
+        exports[module] = (writer.functions, writer.classes)
+        corpus.append((f"{package}/mod{index}.py", "\n".join(writer.lines).encode("utf8")))
+    return corpus
+
+
+def write_corpus(corpus: List[Tuple[str, bytes]], directory: Path) -> List[Path]:
+    """Write a generated corpus under directory and return the file paths."""
+    paths = []
+    for name, content in corpus:
+        path = Path(directory) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--files", type=int, default=200, help="modules to generate")
+    parser.add_argument("--file-bytes", type=int, default=4096, help="approximate size of each module")
+    parser.add_argument("--depth", type=int, default=3, help="nesting depth of function bodies")
+    parser.add_argument("--call-density", type=float, default=2.0, help="calls per block on average")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def corpus_options(args: argparse.Namespace) -> Dict[str, float]:
+    return {
+        "files": args.files,
+        "file_bytes": args.file_bytes,
+        "depth": args.depth,
+        "call_density": args.call_density,
+        "seed": args.seed
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic Python corpus to a directory.")
+    parser.add_argument("directory", type=Path)
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    paths = write_corpus(generate_corpus(**corpus_options(args)), args.directory)
+    print(f"Wrote {len(paths)} files to {args.directory}")
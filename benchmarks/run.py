@@ -0,0 +1,275 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from analyzer.tree_parser import CodeParser, LANGUAGE_LIBRARY
+from analyzer.code_analyzer import CodeAnalyzer
+from analyzer.results import AnalysisResults
+from llm.context_builder import ContextBuilder, ContextIndex
+from visualization.mermaid_generator import MermaidGenerator
+from benchmarks.corpus import add_corpus_arguments, corpus_options, generate_corpus, write_corpus
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# Bump when benchmarks are added, removed or change what they measure,
+# so results are never compared against a baseline of other benchmarks
+SUITE_VERSION = 2
+
+# Default of LLM_CONTEXT_TOKEN_BUDGET
+CONTEXT_TOKEN_BUDGET = 6000
+
+QUESTIONS = (
+    "Which functions call mod3_func_0?",
+    "What does Mod1Class0 inherit from and who uses it?",
+    "Give an overview of the pkg0 package"
+)
+
+
+class Benchmark:
+    """One timed operation over the whole corpus."""
+
+    def __init__(self, name: str, run: Callable[[], Any], files: int, size: int):
+        self.name = name
+        self.run = run
+        self.files = files
+        self.size = size
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict[str, Any]:
+    """
+    Time a benchmark, then run it once more under tracemalloc for its
+    peak Python memory. Memory held by tree-sitter itself is not traced.
+    """
+    benchmark.run()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        benchmark.run()
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(times)
+    return {
+        "seconds": seconds,
+        "min_seconds": min(times),
+        "files_per_second": benchmark.files / seconds if seconds else 0.0,
+        "mb_per_second": benchmark.size / 1e6 / seconds if seconds else 0.0,
+        "peak_memory_bytes": peak
+    }
+
+
+def max_rss() -> Optional[int]:
+    """Peak resident memory of this process, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def build_suite(parser: CodeParser, corpus: List[Tuple[str, bytes]],
+                paths: List[Path]) -> Tuple[List[Benchmark], Callable[[], Dict[str, float]]]:
+    """The benchmarks over a corpus, and a function breaking extraction down by step."""
+    # Nothing remembered between rounds, so every round parses again
+    analyzer = CodeAnalyzer(parser, recent_max_bytes=0)
+    names = [name for name, _ in corpus]
+    files = len(corpus)
+    size = sum(len(content) for _, content in corpus)
+    sources = [content.decode("utf8") for _, content in corpus]
+    trees = [parser.parse_source(source) for source in sources]
+
+    def extract() -> None:
+        for name, tree in zip(names, trees):
+            analyzer.current_file = name
+            analyzer.extract(tree)
+
+    def analyze() -> AnalysisResults:
+        # What /api/analyze does in-process, without the analysis cache
+        results = AnalysisResults(names)
+        for name, content in corpus:
+            results.add({"file": name, **analyzer.extract_source(name, content)})
+        results.resolve()
+        return results
+
+    def extract_steps() -> Dict[str, float]:
+        timings: Dict[str, float] = {}
+        for name, tree in zip(names, trees):
+            analyzer.extractor.extract(tree, name, timings)
+        return timings
+
+    view = analyze().view()
+    index = ContextIndex(view)
+    builder = ContextBuilder(CONTEXT_TOKEN_BUDGET)
+
+    benchmarks = [
+        Benchmark("parse_file", lambda: [parser.parse_file(str(path)) for path in paths], files, size),
+        Benchmark("parse_source", lambda: [parser.parse_source(source) for source in sources], files, size),
+        # Every extractor runs in the one pass; extract_steps breaks it down
+        Benchmark("extract", extract, files, size),
+        Benchmark("analyze_relationships", lambda: analyzer.analyze_relationships(paths), files, size),
+        Benchmark("analyze", analyze, files, size),
+        Benchmark("create_flowchart", lambda: MermaidGenerator().create_flowchart(view), files, size),
+        # A question sent with the whole analysis, which indexes it every time
+        Benchmark("context_build", lambda: [
+            builder.build(question, view) for question in QUESTIONS], files, size),
+        # Questions about a stored analysis, whose index is kept
+        Benchmark("context_build_indexed", lambda: [
+            builder.build(question, None, index) for question in QUESTIONS], files, size)
+    ]
+    return benchmarks, extract_steps
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    options = corpus_options(args)
+    corpus = generate_corpus(**options)
+    parser = CodeParser(args.library, build_if_missing=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(corpus, Path(directory))
+        benchmarks, extract_steps = build_suite(parser, corpus, paths)
+        selected = [
+            benchmark for benchmark in benchmarks
+            if not args.only or benchmark.name in args.only
+        ]
+        results = {}
+        for benchmark in selected:
+            results[benchmark.name] = measure(benchmark, args.repeat)
+            print(f"  {benchmark.name}: {results[benchmark.name]['seconds']:.4f}s", file=sys.stderr)
+        steps = extract_steps()
+
+    return {
+        "suite_version": SUITE_VERSION,
+        "corpus": {
+            **options,
+            "total_files": len(corpus),
+            "total_bytes": sum(len(content) for _, content in corpus)
+        },
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine()
+        },
+        "benchmarks": results,
+        "extract_steps_seconds": steps,
+        "max_rss_bytes": max_rss()
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            memory_threshold: float) -> Optional[List[str]]:
+    """
+    Regressions against a baseline: benchmarks whose median time or peak
+    memory grew by more than the threshold fraction. None when the
+    baseline was recorded over a different corpus or suite.
+    """
+    if (baseline.get("suite_version") != results["suite_version"]
+            or baseline.get("corpus") != results["corpus"]):
+        return None
+
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        if current["seconds"] > previous["seconds"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {current['seconds']:.4f}s vs {previous['seconds']:.4f}s "
+                f"(+{current['seconds'] / previous['seconds'] - 1:.0%})")
+        if current["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + memory_threshold):
+            regressions.append(
+                f"{name}: peak memory {current['peak_memory_bytes'] / 2 ** 20:.1f} MiB vs "
+                f"{previous['peak_memory_bytes'] / 2 ** 20:.1f} MiB")
+    return regressions
+
+
+def report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> str:
+    corpus = results["corpus"]
+    lines = [
+        f"Corpus: {corpus['total_files']} files, {corpus['total_bytes'] / 1e6:.2f} MB "
+        f"(depth {corpus['depth']}, call density {corpus['call_density']}, seed {corpus['seed']})",
+        "",
+        f"{'benchmark':<24}{'median s':>10}{'files/s':>11}{'MB/s':>9}{'peak MiB':>10}{'vs base':>9}"
+    ]
+    for name, result in results["benchmarks"].items():
+        previous = (baseline or {}).get("benchmarks", {}).get(name)
+        change = f"{result['seconds'] / previous['seconds'] - 1:+.0%}" if previous else "-"
+        lines.append(
+            f"{name:<24}{result['seconds']:>10.4f}{result['files_per_second']:>11.0f}"
+            f"{result['mb_per_second']:>9.2f}{result['peak_memory_bytes'] / 2 ** 20:>10.1f}{change:>9}"
+        )
+    steps = ", ".join(
+        f"{step} {seconds:.4f}s" for step, seconds in results["extract_steps_seconds"].items())
+    lines.append("")
+    lines.append(f"Extraction by step: {steps}")
+    if results["max_rss_bytes"] is not None:
+        lines.append(f"Peak resident memory: {results['max_rss_bytes'] / 2 ** 20:.1f} MiB")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analyzer on a synthetic corpus and compare with a baseline.")
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="*", help="benchmarks to run, by name")
+    parser.add_argument("--library", default=LANGUAGE_LIBRARY, help="prebuilt grammar library")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown, as a fraction of the baseline, that counts as a regression")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="growth in peak memory that counts as a regression")
+    parser.add_argument("--output", type=Path, help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(report(results, None))
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold) if baseline else None
+    print(report(results, baseline if regressions is not None else None))
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return 0
+    if regressions is None:
+        print("\nThe baseline was recorded over a different corpus or suite version; not compared")
+        return 0
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%} time / {args.memory_threshold:.0%} memory:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+
+from analyzer.extractors import ANALYZER_VERSION
+from storage import LOW_WATER_MARK, write_atomic
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCache:
+    """
+    On-disk cache of per-file extraction results, addressed by content.
+
+    Entries are keyed by the SHA-256 of the file bytes together with the
+    grammar and analyzer versions, so an unchanged file is never parsed
+    twice and a grammar or extractor change invalidates old entries.
+    Writes go through a temporary file and an atomic rename, which keeps
+    the cache consistent when several workers share the directory.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, grammar_version: str):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.version = f"{grammar_version}:{ANALYZER_VERSION}".encode('utf8')
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._current_bytes: Optional[int] = None
+
+    def key(self, content: bytes) -> str:
+        """Content address of a file under the current grammar and analyzer."""
+        digest = hashlib.sha256(self.version)
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, content: bytes, file: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Return the cached extraction for this content, attributed to the given file."""
+        path = self._entry_path(self.key(content))
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Refresh the entry's age for LRU eviction; losing a race with an
+        # evicting worker only costs us the hit we already have in hand
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return {
+            result_type: [{"file": file, **record} for record in records]
+            for result_type, records in stored.items()
+        }
+
+    def put(self, content: bytes, extracted: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Persist an extraction result for this content."""
+        stored = {
+            result_type: [
+                {k: v for k, v in record.items() if k != "file"}
+                for record in records
+            ]
+            for result_type, records in extracted.items()
+        }
+        data = json.dumps(stored, separators=(',', ':')).encode('utf8')
+
+        path = self._entry_path(self.key(content))
+        try:
+            path.parent.mkdir(exist_ok=True)
+            write_atomic(path, data)
+        except OSError as e:
+            logger.warning("Error writing analysis cache entry %s: %s", path, e)
+            return
+
+        self.writes += 1
+        if self._current_bytes is None:
+            self._current_bytes = self._scan_size()
+        else:
+            self._current_bytes += len(data)
+
+        if self._current_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache is under budget."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * LOW_WATER_MARK
+
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                self.evictions += 1
+            except OSError:
+                # Another worker evicted it first
+                pass
+            total -= stat.st_size
+
+        self._current_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss, write and eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes
+        }
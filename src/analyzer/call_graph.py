@@ -0,0 +1,263 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from analyzer.symbol_index import module_name
+
+
+def _neighbors(indptr: np.ndarray, indices: np.ndarray,
+               frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Every neighbor of every frontier node, and the frontier node it came from."""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=indices.dtype)
+        return empty, empty
+    # Offsets of all adjacency slices, gathered without a Python loop
+    ends = np.cumsum(counts)
+    positions = np.arange(total) + np.repeat(starts - (ends - counts), counts)
+    return indices[positions], np.repeat(frontier, counts)
+
+
+class CallGraph:
+    """
+    Call graph over fully qualified function names.
+
+    Adjacency is stored CSR-style in NumPy arrays, once for callees
+    (forward) and once for callers (reverse). Traversals expand a whole
+    BFS level at a time with array operations, and every query takes a
+    depth limit and a result cap so its cost is bounded.
+    """
+
+    def __init__(self, names: List[str], callers: np.ndarray, callees: np.ndarray):
+        self.names = names
+        self.ids = {name: node for node, name in enumerate(names)}
+        count = len(names)
+
+        # Drop duplicate edges, then sort them by caller and by callee
+        keys = np.unique(callers.astype(np.int64) * count + callees)
+        callers = (keys // max(count, 1)).astype(np.int32)
+        callees = (keys % max(count, 1)).astype(np.int32)
+
+        self.forward_indptr, self.forward = self._csr(callers, callees, count)
+        self.reverse_indptr, self.reverse = self._csr(callees, callers, count)
+        self._components: Optional[List[List[int]]] = None
+        self._by_short_name: Optional[Dict[str, List[str]]] = None
+
+    @staticmethod
+    def _csr(sources: np.ndarray, targets: np.ndarray,
+             count: int) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+        return indptr, targets[order]
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[str, str]],
+                   nodes: Iterable[str] = ()) -> "CallGraph":
+        ids: Dict[str, int] = {}
+        for name in nodes:
+            ids.setdefault(name, len(ids))
+        callers: List[int] = []
+        callees: List[int] = []
+        for caller, callee in edges:
+            callers.append(ids.setdefault(caller, len(ids)))
+            callees.append(ids.setdefault(callee, len(ids)))
+        return cls(
+            list(ids),
+            np.array(callers, dtype=np.int32),
+            np.array(callees, dtype=np.int32)
+        )
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict[str, Any]) -> "CallGraph":
+        """Build the graph from an /api/analyze response's resolved calls."""
+        functions = (
+            f"{module_name(function['file'])}.{function['qualified_name']}".lstrip(".")
+            for function in analysis.get("functions", [])
+            if "qualified_name" in function
+        )
+        edges = (
+            (call["caller"], call["callee"])
+            for call in analysis.get("relationships", {}).get("resolved_calls", [])
+            if call.get("callee_kind", "function") == "function"
+        )
+        return cls.from_edges(edges, functions)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.forward)
+
+    def find(self, name: str) -> List[str]:
+        """Nodes a name refers to: an exact qualified name, or else a dotted suffix of one."""
+        if name in self.ids:
+            return [name]
+        if self._by_short_name is None:
+            self._by_short_name = {}
+            for node in self.names:
+                self._by_short_name.setdefault(node.rpartition(".")[2], []).append(node)
+        suffix = "." + name
+        return [
+            node for node in self._by_short_name.get(name.rpartition(".")[2], [])
+            if node.endswith(suffix)
+        ]
+
+    def _adjacency(self, reverse: bool) -> Tuple[np.ndarray, np.ndarray]:
+        if reverse:
+            return self.reverse_indptr, self.reverse
+        return self.forward_indptr, self.forward
+
+    def bfs(self, start: str, reverse: bool = False, max_depth: int = 10,
+            max_results: int = 1000) -> Dict[str, Any]:
+        """
+        Functions reachable from start (its transitive callees), or with
+        reverse=True the functions that transitively call it, nearest first.
+        """
+        indptr, indices = self._adjacency(reverse)
+        visited = np.zeros(len(self.names), dtype=bool)
+        source = self.ids[start]
+        visited[source] = True
+        frontier = np.array([source], dtype=np.int32)
+
+        found: List[Dict[str, Any]] = []
+        truncated = False
+        depth = 0
+        while len(frontier) and depth < max_depth and not truncated:
+            depth += 1
+            neighbors, _ = _neighbors(indptr, indices, frontier)
+            frontier = np.unique(neighbors[~visited[neighbors]])
+            visited[frontier] = True
+            room = max_results - len(found)
+            if len(frontier) > room:
+                frontier = frontier[:room]
+                truncated = True
+            found.extend({"function": self.names[node], "depth": depth} for node in frontier.tolist())
+
+        return {
+            "function": start,
+            "results": found,
+            "truncated": truncated,
+            "depth_limited": bool(len(frontier)) and depth >= max_depth and not truncated
+        }
+
+    def shortest_path(self, source: str, target: str,
+                      max_depth: int = 10) -> Optional[List[str]]:
+        """Shortest call chain from source to target, or None if none within max_depth."""
+        start, goal = self.ids[source], self.ids[target]
+        if start == goal:
+            return [source]
+
+        parents = np.full(len(self.names), -1, dtype=np.int64)
+        parents[start] = start
+        frontier = np.array([start], dtype=np.int32)
+        for _ in range(max_depth):
+            if not len(frontier):
+                break
+            neighbors, origins = _neighbors(self.forward_indptr, self.forward, frontier)
+            fresh = parents[neighbors] < 0
+            neighbors, origins = neighbors[fresh], origins[fresh]
+            frontier, first = np.unique(neighbors, return_index=True)
+            parents[frontier] = origins[first]
+            if parents[goal] >= 0:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(int(parents[path[-1]]))
+                return [self.names[node] for node in reversed(path)]
+        return None
+
+    def strongly_connected_components(self) -> List[List[int]]:
+        """Components of mutually recursive functions (iterative Tarjan), computed once."""
+        if self._components is not None:
+            return self._components
+
+        count = len(self.names)
+        indptr = self.forward_indptr.tolist()
+        indices = self.forward.tolist()
+        index = [-1] * count
+        lowlink = [0] * count
+        on_stack = [False] * count
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            # Explicit call stack of (node, next edge position)
+            work = [(root, indptr[root])]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+
+            while work:
+                node, position = work[-1]
+                if position < indptr[node + 1]:
+                    work[-1] = (node, position + 1)
+                    child = indices[position]
+                    if index[child] == -1:
+                        index[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, indptr[child]))
+                    elif on_stack[child]:
+                        lowlink[node] = min(lowlink[node], index[child])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        self._components = components
+        return components
+
+    def cycles(self, max_results: int = 1000) -> Dict[str, Any]:
+        """Groups of mutually recursive functions, including directly recursive ones, largest first."""
+        recursive = []
+        for component in self.strongly_connected_components():
+            if len(component) > 1:
+                recursive.append(component)
+            else:
+                node = component[0]
+                callees = self.forward[self.forward_indptr[node]:self.forward_indptr[node + 1]]
+                if node in callees:
+                    recursive.append(component)
+        recursive.sort(key=len, reverse=True)
+
+        return {
+            "cycles": [
+                sorted(self.names[node] for node in component)
+                for component in recursive[:max_results]
+            ],
+            "total": len(recursive),
+            "truncated": len(recursive) > max_results
+        }
+
+    def fan(self, limit: int = 20) -> Dict[str, Any]:
+        """Functions with the most distinct callers (fan-in) and callees (fan-out)."""
+        fan_in = np.diff(self.reverse_indptr)
+        fan_out = np.diff(self.forward_indptr)
+
+        def top(degrees: np.ndarray) -> List[Dict[str, Any]]:
+            count = min(limit, len(degrees))
+            if count <= 0:
+                return []
+            # Highest degree first, ties by name order in the graph
+            nodes = np.argsort(-degrees, kind="stable")[:count]
+            return [
+                {"function": self.names[node], "count": int(degrees[node])}
+                for node in nodes.tolist() if degrees[node] > 0
+            ]
+
+        return {"fan_in": top(fan_in), "fan_out": top(fan_out)}
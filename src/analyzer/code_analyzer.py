@@ -1,12 +1,33 @@
+from collections import OrderedDict
 from tree_sitter import Node
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
+import hashlib
+import logging
+import time
+
+from analyzer.extractors import QueryExtractor
+from analyzer.analysis_cache import AnalysisCache
+
+logger = logging.getLogger(__name__)
+
+# Source bytes of the files whose extractions extract_file keeps, so that
+# analyze_file followed by analyze_relationships parses each file once
+RECENT_MAX_BYTES = 64 * 1024 * 1024
 
 
 class CodeAnalyzer:
-    def __init__(self, parser):
+    def __init__(self, parser, extractor: Optional[QueryExtractor] = None,
+                 analysis_cache: Optional[AnalysisCache] = None,
+                 recent_max_bytes: int = RECENT_MAX_BYTES):
         self.parser = parser
         self.current_file = None
+        self.extractor = extractor or parser.extractor
+        self.analysis_cache = analysis_cache
+        self.recent_max_bytes = recent_max_bytes
+        # path -> (content digest, source bytes, extraction), least recent first
+        self._recent: "OrderedDict[str, Tuple[bytes, int, Dict[str, List[Dict[str, Any]]]]]" = OrderedDict()
+        self._recent_bytes = 0
 
     def analyze_node(self, node: Node, depth: int = 0) -> Dict[str, Any]:
         """Recursively analyze a node and its children."""
@@ -26,107 +47,91 @@ class CodeAnalyzer:
 
         return result
 
+    def extract(self, tree: Node,
+                timings: Optional[Dict[str, float]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Extract functions, classes, imports and relationships in one pass."""
+        return self.extractor.extract(tree, str(self.current_file), timings)
+
+    def extract_file(self, file_path: Path) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract everything for one file on disk. A file extracted recently
+        and unchanged since is not parsed again.
+        """
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        file = str(file_path)
+        digest = hashlib.sha256(content).digest()
+
+        recent = self._recent.get(file)
+        if recent is not None and recent[0] == digest:
+            self._recent.move_to_end(file)
+            self.current_file = file
+            return recent[2]
+
+        extracted = self.extract_source(file, content)
+        self._remember(file, digest, len(content), extracted)
+        return extracted
+
+    def _remember(self, file: str, digest: bytes, size: int,
+                  extracted: Dict[str, List[Dict[str, Any]]]) -> None:
+        previous = self._recent.pop(file, None)
+        if previous is not None:
+            self._recent_bytes -= previous[1]
+        if size > self.recent_max_bytes:
+            return
+        self._recent[file] = (digest, size, extracted)
+        self._recent_bytes += size
+        while self._recent_bytes > self.recent_max_bytes:
+            _, (_, evicted, _) = self._recent.popitem(last=False)
+            self._recent_bytes -= evicted
+
+    def extract_source(self, file: str, content: bytes,
+                       timings: Optional[Dict[str, float]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract everything for one file's content held in memory, skipping
+        the parse entirely when the analysis cache already has a result.
+        Seconds spent parsing and in each extraction step are added to
+        timings, if given.
+        """
+        self.current_file = file
+
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get(content, file)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        tree = self.parser.parse_bytes(content)
+        if timings is not None:
+            timings["parse"] = timings.get("parse", 0.0) + time.perf_counter() - started
+        if not tree:
+            raise RuntimeError(f"Failed to parse file: {file}")
+
+        extracted = self.extract(tree, timings)
+        if self.analysis_cache is not None:
+            self.analysis_cache.put(content, extracted)
+        return extracted
+
     def get_functions(self, tree: Node) -> List[Dict[str, Any]]:
         """Extract function definitions from the AST."""
-        functions = []
-        cursor = tree.walk()
-
-        def visit_node():
-            if cursor.node.type == "function_definition":
-                name_node = cursor.node.child_by_field_name("name")
-                if name_node:
-                    functions.append({
-                        "file": str(self.current_file),
-                        "name": name_node.text.decode('utf8'),
-                        "start_line": cursor.node.start_point[0],
-                        "end_line": cursor.node.end_point[0]
-                    })
-
-            # Traverse children
-            if cursor.goto_first_child():
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-
-        visit_node()
-        return functions
+        return self.extract(tree)["functions"]
 
     def get_classes(self, tree: Node) -> List[Dict[str, Any]]:
         """Extract class definitions from the AST."""
-        classes = []
-        cursor = tree.walk()
-
-        def visit_node():
-            if cursor.node.type == "class_definition":
-                name_node = cursor.node.child_by_field_name("name")
-                if name_node:
-                    class_info = {
-                        "file": str(self.current_file),
-                        "name": name_node.text.decode('utf8'),
-                        "start_line": cursor.node.start_point[0],
-                        "end_line": cursor.node.end_point[0],
-                        "methods": []
-                    }
-
-                    # Get methods
-                    for child in cursor.node.children:
-                        if child.type == "function_definition":
-                            method_name = child.child_by_field_name("name")
-                            if method_name:
-                                class_info["methods"].append(
-                                    method_name.text.decode('utf8')
-                                )
-
-                    classes.append(class_info)
-
-            # Traverse children
-            if cursor.goto_first_child():
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-
-        visit_node()
-        return classes
+        return self.extract(tree)["classes"]
 
     def get_imports(self, tree: Node) -> List[Dict[str, Any]]:
         """Extract import statements from the AST."""
-        imports = []
-        cursor = tree.walk()
-
-        def visit_node():
-            if cursor.node.type in ["import_statement", "import_from_statement"]:
-                imports.append({
-                    "file": str(self.current_file),
-                    "type": cursor.node.type,
-                    "text": cursor.node.text.decode('utf8'),
-                    "line": cursor.node.start_point[0]
-                })
-
-            # Traverse children
-            if cursor.goto_first_child():
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-
-        visit_node()
-        return imports
+        return self.extract(tree)["imports"]
 
     def analyze_file(self, file_path: Path) -> Dict[str, Any]:
         """Analyze a single Python file."""
-        self.current_file = file_path
-
-        tree = self.parser.parse_file(str(file_path))
-        if not tree:
-            raise RuntimeError(f"Failed to parse file: {file_path}")
-
+        extracted = self.extract_file(file_path)
         return {
             "file": str(file_path),
-            "functions": self.get_functions(tree),
-            "classes": self.get_classes(tree),
-            "imports": self.get_imports(tree)
+            "functions": extracted["functions"],
+            "classes": extracted["classes"],
+            "imports": extracted["imports"]
         }
 
     def analyze_relationships(self, file_paths: List[Path]) -> Dict[str, List[Dict[str, Any]]]:
@@ -139,110 +144,11 @@ class CodeAnalyzer:
 
         for file_path in file_paths:
             try:
-                self.current_file = file_path
-                tree = self.parser.parse_file(str(file_path))
-
-                if not tree:
-                    raise RuntimeError(f"Failed to parse file: {file_path}")
-
-                # Analyze function calls
-                self._analyze_function_calls(
-                    tree, relationships["function_calls"])
-
-                # Analyze class inheritance
-                self._analyze_class_inheritance(
-                    tree, relationships["class_inheritance"])
-
-                # Analyze import dependencies
-                self._analyze_import_dependencies(
-                    tree, relationships["import_dependencies"])
+                extracted = self.extract_file(file_path)
+                for rel_type in relationships:
+                    relationships[rel_type].extend(extracted[rel_type])
 
             except Exception as e:
-                print(
-                    f"Error analyzing relationships in {file_path}: {str(e)}")
+                logger.warning("Error analyzing relationships in %s: %s", file_path, e)
 
         return relationships
-
-    def _analyze_function_calls(self, tree: Node, function_calls: List):
-        """Analyze function calls within the AST."""
-        cursor = tree.walk()
-        current_function = None
-
-        def visit_node():
-            nonlocal current_function
-
-            # Track current function context
-            if cursor.node.type == "function_definition":
-                name_node = cursor.node.child_by_field_name("name")
-                if name_node:
-                    current_function = name_node.text.decode('utf8')
-
-            # Detect function calls
-            if cursor.node.type == "call":
-                function_name = cursor.node.child_by_field_name("function")
-                if function_name and current_function:
-                    callee = function_name.text.decode('utf8')
-                    function_calls.append({
-                        "file": str(self.current_file),
-                        "caller": current_function,
-                        "callee": callee,
-                        "line": cursor.node.start_point[0]
-                    })
-
-            # Traverse children
-            if cursor.goto_first_child():
-                previous_function = current_function
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-                current_function = previous_function
-
-        visit_node()
-
-    def _analyze_class_inheritance(self, tree: Node, class_inheritance: List):
-        """Analyze class inheritance relationships."""
-        cursor = tree.walk()
-
-        def visit_node():
-            if cursor.node.type == "class_definition":
-                name_node = cursor.node.child_by_field_name("name")
-                bases = cursor.node.child_by_field_name("bases")
-                if name_node and bases:
-                    class_name = name_node.text.decode('utf8')
-                    for base in bases.children:
-                        if base.type == "identifier":
-                            class_inheritance.append({
-                                "file": str(self.current_file),
-                                "class": class_name,
-                                "inherits_from": base.text.decode('utf8')
-                            })
-
-            if cursor.goto_first_child():
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-
-        visit_node()
-
-    def _analyze_import_dependencies(self, tree: Node, import_dependencies: List):
-        """Analyze import dependencies between files."""
-        cursor = tree.walk()
-
-        def visit_node():
-            if cursor.node.type in ["import_statement", "import_from_statement"]:
-                import_path = cursor.node.text.decode('utf8')
-                import_dependencies.append({
-                    "file": str(self.current_file),
-                    "import_statement": import_path,
-                    "line": cursor.node.start_point[0]
-                })
-
-            if cursor.goto_first_child():
-                visit_node()
-                while cursor.goto_next_sibling():
-                    visit_node()
-                cursor.goto_parent()
-
-        visit_node()
@@ -0,0 +1,230 @@
+from tree_sitter import Language, Node, Tree
+from typing import Any, Dict, List, Optional, Tuple, Union
+import time
+
+# Bump whenever the shape or content of extracted records changes, so
+# results persisted by earlier versions are no longer reused
+ANALYZER_VERSION = "2"
+
+# Every list produced by a single extraction pass over one file
+RESULT_KEYS = (
+    "functions",
+    "classes",
+    "imports",
+    "function_calls",
+    "class_inheritance",
+    "import_dependencies",
+)
+
+IMPORT_TYPES = ("import_statement", "import_from_statement")
+
+Results = Dict[str, List[Dict[str, Any]]]
+
+# One query matches every construct the analyzer extracts. Matching runs
+# in tree-sitter's C engine; Python only sees the captured nodes.
+EXTRACTION_QUERY = """
+(function_definition) @function
+(class_definition) @class
+(class_definition
+  superclasses: (argument_list (identifier) @base))
+(class_definition
+  body: (block (function_definition) @method))
+(class_definition
+  body: (block (decorated_definition
+    definition: (function_definition) @method)))
+(call) @call
+(import_statement) @import
+(import_from_statement) @import
+"""
+
+
+def _document_order(node: Node) -> Tuple[int, int]:
+    # Pre-order: earlier start first, and the outer of two nodes sharing a start
+    return node.start_byte, -node.end_byte
+
+
+def _name(node: Node) -> Optional[str]:
+    name_node = node.child_by_field_name("name")
+    return name_node.text.decode('utf8') if name_node else None
+
+
+def _qualify(definitions: List[Tuple[Node, Optional[str]]]) -> Dict[int, str]:
+    """
+    Dotted path of every named function and class within its module, like
+    Python's __qualname__ without the <locals> markers, keyed by node id.
+    """
+    qualified: Dict[int, str] = {}
+    enclosing: List[Tuple[int, Optional[str]]] = []
+    for node, name in sorted(definitions, key=lambda definition: _document_order(definition[0])):
+        while enclosing and enclosing[-1][0] <= node.start_byte:
+            enclosing.pop()
+        parent = enclosing[-1][1] if enclosing else None
+        path = (f"{parent}.{name}" if parent else name) if name else parent
+        if name:
+            qualified[node.id] = path
+        enclosing.append((node.end_byte, path))
+    return qualified
+
+
+def _class_of(node: Node, levels: int) -> Node:
+    for _ in range(levels):
+        node = node.parent
+    return node
+
+
+class QueryExtractor:
+    """
+    Extracts functions, classes, imports and relationships from a syntax
+    tree with one precompiled tree-sitter query.
+
+    Compile it once per language (CodeParser.extractor does this) and
+    reuse it for every tree.
+    """
+
+    def __init__(self, language: Language):
+        self.query = language.query(EXTRACTION_QUERY)
+
+    def extract(self, root: Union[Tree, Node], file: str,
+                timings: Optional[Dict[str, float]] = None) -> Results:
+        """
+        Run the query over a tree or subtree and build every result list.
+
+        If timings is given, the seconds spent running the query and
+        building each kind of result are added to it by step name.
+        """
+        if isinstance(root, Tree):
+            root = root.root_node
+
+        mark = time.perf_counter()
+
+        def step(name: str) -> None:
+            nonlocal mark
+            if timings is not None:
+                now = time.perf_counter()
+                timings[name] = timings.get(name, 0.0) + now - mark
+                mark = now
+
+        captured: Dict[str, List[Node]] = {
+            name: [] for name in ("function", "class", "base", "method", "call", "import")
+        }
+        for node, capture_name in self.query.captures(root):
+            captured[capture_name].append(node)
+        for nodes in captured.values():
+            nodes.sort(key=_document_order)
+
+        functions = captured["function"]
+        function_names = [_name(node) for node in functions]
+        classes = captured["class"]
+        class_names = [_name(node) for node in classes]
+        qualified = _qualify(
+            list(zip(functions, function_names)) + list(zip(classes, class_names)))
+        step("query")
+
+        results: Results = {key: [] for key in RESULT_KEYS}
+        self._functions(functions, function_names, qualified, file, results)
+        step("functions")
+        self._classes(classes, class_names, captured["method"], captured["base"],
+                      qualified, file, results)
+        step("classes")
+        self._calls(captured["call"], functions, function_names, qualified, file, results)
+        step("calls")
+        self._imports(captured["import"], file, results)
+        step("imports")
+        return results
+
+    def _functions(self, functions: List[Node], names: List[Optional[str]],
+                   qualified: Dict[int, str], file: str, results: Results) -> None:
+        for node, name in zip(functions, names):
+            if name:
+                results["functions"].append({
+                    "file": file,
+                    "name": name,
+                    "qualified_name": qualified[node.id],
+                    "start_line": node.start_point[0],
+                    "end_line": node.end_point[0]
+                })
+
+    def _classes(self, classes: List[Node], names: List[Optional[str]], methods: List[Node],
+                 bases: List[Node], qualified: Dict[int, str], file: str,
+                 results: Results) -> None:
+        # Methods sit in the class body block, possibly under a decorator
+        methods_by_class: Dict[int, List[str]] = {}
+        for node in methods:
+            levels = 3 if node.parent.type == "decorated_definition" else 2
+            name = _name(node)
+            if name:
+                methods_by_class.setdefault(_class_of(node, levels).id, []).append(name)
+
+        for node, name in zip(classes, names):
+            if name:
+                results["classes"].append({
+                    "file": file,
+                    "name": name,
+                    "qualified_name": qualified[node.id],
+                    "start_line": node.start_point[0],
+                    "end_line": node.end_point[0],
+                    "methods": methods_by_class.get(node.id, [])
+                })
+
+        # A class's bases precede anything nested in its body, so document
+        # order of the bases is also the order their classes were found in
+        for node in bases:
+            class_name = _name(_class_of(node, 2))
+            if class_name:
+                results["class_inheritance"].append({
+                    "file": file,
+                    "class": class_name,
+                    "inherits_from": node.text.decode('utf8')
+                })
+
+    def _calls(self, calls: List[Node], functions: List[Node], names: List[Optional[str]],
+               qualified: Dict[int, str], file: str, results: Results) -> None:
+        # Sweep calls and function definitions in document order, keeping
+        # the stack of functions that enclose the current position
+        enclosing: List[Tuple[int, Optional[str], Optional[str]]] = []
+        next_function = 0
+
+        for node in calls:
+            position = node.start_byte
+            while (next_function < len(functions)
+                   and functions[next_function].start_byte <= position):
+                function = functions[next_function]
+                name = names[next_function]
+                next_function += 1
+                while enclosing and enclosing[-1][0] <= function.start_byte:
+                    enclosing.pop()
+                if name:
+                    enclosing.append((function.end_byte, name, qualified[function.id]))
+                else:
+                    enclosing.append((function.end_byte, *(
+                        enclosing[-1][1:] if enclosing else (None, None))))
+
+            while enclosing and enclosing[-1][0] <= position:
+                enclosing.pop()
+
+            _, caller, caller_qualified = enclosing[-1] if enclosing else (None, None, None)
+            function_name = node.child_by_field_name("function")
+            if function_name and caller:
+                results["function_calls"].append({
+                    "file": file,
+                    "caller": caller,
+                    "caller_qualified": caller_qualified,
+                    "callee": function_name.text.decode('utf8'),
+                    "line": node.start_point[0]
+                })
+
+    def _imports(self, imports: List[Node], file: str, results: Results) -> None:
+        for node in imports:
+            text = node.text.decode('utf8')
+            line = node.start_point[0]
+            results["imports"].append({
+                "file": file,
+                "type": node.type,
+                "text": text,
+                "line": line
+            })
+            results["import_dependencies"].append({
+                "file": file,
+                "import_statement": text,
+                "line": line
+            })
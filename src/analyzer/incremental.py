@@ -0,0 +1,216 @@
+from tree_sitter import Node, Parser, Tree
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+
+from analyzer.extractors import QueryExtractor, RESULT_KEYS
+
+LINE_KEYS = ("start_line", "end_line", "line")
+
+
+def _point_at(source: bytes, offset: int) -> Tuple[int, int]:
+    """Row and byte column of a byte offset, as tree-sitter expects them."""
+    row = source.count(b"\n", 0, offset)
+    return row, offset - (source.rfind(b"\n", 0, offset) + 1)
+
+
+def _overlaps(start: int, end: int, ranges: List[Tuple[int, int]]) -> bool:
+    # Inclusive bounds so that insertions at a node's edge count as touching it
+    return any(a <= end and b >= start for a, b in ranges)
+
+
+class Segment:
+    """Extraction results of one top-level statement of a file."""
+
+    __slots__ = ("start_byte", "end_byte", "start_row", "results", "dirty")
+
+    def __init__(self, node: Node, results: Dict[str, List[Dict[str, Any]]]):
+        self.start_byte = node.start_byte
+        self.end_byte = node.end_byte
+        self.start_row = node.start_point[0]
+        self.results = results
+        self.dirty = False
+
+    def shift_rows(self, start_row: int) -> None:
+        """Move every recorded line number so the segment starts at start_row."""
+        delta = start_row - self.start_row
+        if delta:
+            for records in self.results.values():
+                for record in records:
+                    for key in LINE_KEYS:
+                        if key in record:
+                            record[key] += delta
+        self.start_row = start_row
+
+
+class FileState:
+    """Source, syntax tree and per-statement extraction results of one file."""
+
+    def __init__(self, source: bytes, tree: Optional[Tree], segments: List[Segment]):
+        self.source = source
+        # None after a failed batch, until the next one parses afresh
+        self.tree = tree
+        self.segments = segments
+
+    def results(self) -> Dict[str, List[Dict[str, Any]]]:
+        merged = {key: [] for key in RESULT_KEYS}
+        for segment in self.segments:
+            for key in RESULT_KEYS:
+                merged[key].extend(segment.results[key])
+        return merged
+
+
+class EditSession:
+    """
+    Keeps the trees and symbol tables of a set of files so that edits can
+    be re-analyzed incrementally.
+
+    Each file's results are split by top-level statement. An edit is
+    applied to the previous tree with Tree.edit, the file is reparsed with
+    the old tree, and only statements that intersect the changed ranges
+    are extracted again; the rest are reused with their line numbers moved.
+    """
+
+    def __init__(self, parser: Parser, extractor: QueryExtractor):
+        self.parser = parser
+        self.extractor = extractor
+        self.files: Dict[str, FileState] = {}
+        self.lock = threading.Lock()
+
+    def _segments(self, file: str, nodes: List[Node]) -> List[Segment]:
+        return [Segment(node, self.extractor.extract(node, file)) for node in nodes]
+
+    def add_file(self, file: str, source: bytes) -> None:
+        """Parse and fully analyze a file, replacing any previous version."""
+        with self.lock:
+            tree = self.parser.parse(source)
+            self.files[file] = FileState(
+                source, tree, self._segments(file, tree.root_node.children))
+
+    def apply_edits(self, file: str, edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply edits, each {"start_byte", "end_byte", "text"} in the coordinates
+        of the source as left by the previous edit, and patch the file's results.
+
+        The batch applies whole or not at all: every range is checked before
+        anything changes, and if parsing or extraction fails the file keeps
+        its previous source and results.
+        """
+        with self.lock:
+            state = self.files.get(file)
+            if state is None:
+                raise KeyError(file)
+
+            # Checked up front, so a rejected batch leaves the file untouched
+            batch: List[Tuple[int, int, bytes]] = []
+            length = len(state.source)
+            for edit in edits:
+                start = int(edit["start_byte"])
+                old_end = int(edit["end_byte"])
+                if not 0 <= start <= old_end <= length:
+                    raise ValueError(
+                        f"Edit range {start}-{old_end} is outside the file "
+                        f"({length} bytes)")
+                text = edit.get("text", "").encode('utf8')
+                batch.append((start, old_end, text))
+                length += len(text) - (old_end - start)
+
+            try:
+                return self._apply(file, state, batch)
+            except BaseException:
+                # The tree may have been edited past its source; the next
+                # batch parses the file afresh instead of reusing it
+                state.tree = None
+                raise
+
+    def _apply(self, file: str, state: FileState, batch: List[Tuple[int, int, bytes]]) -> Dict[str, Any]:
+        source = state.source
+        tree = state.tree
+        edited_ranges: List[Tuple[int, int]] = []
+        # Segment positions in current coordinates, and whether an edit touched them
+        bounds = [[segment.start_byte, segment.end_byte, False] for segment in state.segments]
+
+        for start, old_end, text in batch:
+            new_source = source[:start] + text + source[old_end:]
+            new_end = start + len(text)
+            delta = new_end - old_end
+
+            if tree is not None:
+                tree.edit(
+                    start_byte=start,
+                    old_end_byte=old_end,
+                    new_end_byte=new_end,
+                    start_point=_point_at(source, start),
+                    old_end_point=_point_at(source, old_end),
+                    new_end_point=_point_at(new_source, new_end)
+                )
+
+            # Keep earlier edits and segments in current coordinates
+            edited_ranges = [
+                (a + delta if a > old_end else a, b + delta if b >= old_end else b)
+                for a, b in edited_ranges
+            ]
+            edited_ranges.append((start, new_end))
+            for bound in bounds:
+                if bound[1] < start:
+                    continue
+                if bound[0] > old_end:
+                    bound[0] += delta
+                    bound[1] += delta
+                else:
+                    bound[2] = True
+
+            source = new_source
+
+        if tree is None:
+            new_tree = self.parser.parse(source)
+            changed = [(0, len(source))]
+        else:
+            new_tree = self.parser.parse(source, tree)
+            changed = edited_ranges + [
+                (r.start_byte, r.end_byte) for r in tree.get_changed_ranges(new_tree)
+            ]
+
+        reusable = {
+            (start, end): segment
+            for segment, (start, end, dirty) in zip(state.segments, bounds) if not dirty
+        }
+
+        segments = []
+        # Reused segments are moved only once every statement has been extracted
+        moved = []
+        for node in new_tree.root_node.children:
+            segment = reusable.get((node.start_byte, node.end_byte))
+            if segment is None or _overlaps(node.start_byte, node.end_byte, changed):
+                segment = Segment(node, self.extractor.extract(node, file))
+            else:
+                moved.append((segment, node))
+            segments.append(segment)
+
+        for segment, node in moved:
+            segment.start_byte = node.start_byte
+            segment.end_byte = node.end_byte
+            segment.shift_rows(node.start_point[0])
+        state.source = source
+        state.tree = new_tree
+        state.segments = segments
+
+        return {
+            "file": file,
+            "size": len(source),
+            "changed_ranges": len(changed),
+            "statements": len(segments),
+            "reextracted": len(segments) - len(moved),
+            "reused": len(moved)
+        }
+
+    def file_results(self, file: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self.lock:
+            return self.files[file].results()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One analysis record per file, in the order the files were added."""
+        with self.lock:
+            return [
+                {"file": file, **state.results()}
+                for file, state in self.files.items()
+            ]
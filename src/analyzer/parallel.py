@@ -0,0 +1,219 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+import multiprocessing
+import threading
+import os
+
+from analyzer.tree_parser import CodeParser
+from analyzer.code_analyzer import CodeAnalyzer
+from analyzer.analysis_cache import AnalysisCache
+from analyzer.parser_pool import ParserPool
+from telemetry.metrics import PHASE_SECONDS, REGISTRY
+
+# Shards handed out per worker; more than one keeps workers busy when
+# some files are much larger than others
+CHUNKS_PER_WORKER = 4
+
+# A file to analyze: a path on disk, a (name, content) pair in memory, or
+# a (name, path) pair for a file on disk reported under another name
+Source = Union[Path, Tuple[str, Union[bytes, Path]]]
+
+FILES_TOTAL = REGISTRY.counter(
+    "code_analysis_files_total",
+    "Files analyzed, by outcome",
+    ("outcome",)
+)
+PARSED_BYTES = REGISTRY.counter(
+    "code_analysis_parsed_bytes_total",
+    "Bytes of source parsed, excluding files answered from the analysis cache"
+)
+
+# AnalysisCache counters each record reports the change of
+CACHE_COUNTERS = ("hits", "misses", "writes", "evictions")
+
+# Analyzer owned by each pool process, set up once by _init_worker
+_worker_analyzer: Optional[CodeAnalyzer] = None
+
+
+def _cache_counts(analyzer: CodeAnalyzer) -> Dict[str, int]:
+    cache = analyzer.analysis_cache
+    return {name: getattr(cache, name) for name in CACHE_COUNTERS} if cache is not None else {}
+
+
+def analyze_one(analyzer: CodeAnalyzer, source: Source) -> Dict[str, Any]:
+    """
+    Analyze one file into a record holding its symbols and relationships.
+
+    The record also carries the time spent in each step under "timings",
+    the file's size under "bytes" and what it did to the analysis cache's
+    counters under "cache", so they reach the parent process when a
+    worker did the work; ParallelAnalyzer removes all three.
+    """
+    timings: Dict[str, float] = {}
+    if isinstance(source, tuple):
+        file, content = source
+    else:
+        file, content = str(source), source
+
+    before = _cache_counts(analyzer)
+    size = 0
+    try:
+        if isinstance(content, Path):
+            with open(content, 'rb') as f:
+                content = f.read()
+        size = len(content)
+        record = {"file": file, **analyzer.extract_source(file, content, timings)}
+    except Exception as e:
+        record = {"file": file, "error": str(e)}
+    after = _cache_counts(analyzer)
+    record.update(
+        timings=timings,
+        bytes=size,
+        cache={name: after[name] - before[name] for name in after}
+    )
+    return record
+
+
+def observe(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Record a file's timings and size in the metrics and strip them from it."""
+    timings = record.pop("timings", {})
+    size = record.pop("bytes", 0)
+    for step, seconds in timings.items():
+        PHASE_SECONDS.observe(seconds, phase=step if step == "parse" else f"extract_{step}")
+    if "parse" in timings:
+        PARSED_BYTES.inc(size)
+    FILES_TOTAL.inc(outcome="error" if "error" in record else "ok")
+    return record
+
+
+def _init_worker(library_path: str, cache_dir: Optional[str], cache_max_bytes: int) -> None:
+    global _worker_analyzer
+    # The parent process has already loaded or built the library
+    parser = CodeParser(library_path, build_if_missing=False)
+    analysis_cache = None
+    if cache_dir:
+        analysis_cache = AnalysisCache(
+            Path(cache_dir), cache_max_bytes, parser.grammar_version)
+    _worker_analyzer = CodeAnalyzer(parser, analysis_cache=analysis_cache)
+
+
+def _analyze_chunk(sources: List[Source]) -> List[Dict[str, Any]]:
+    return [analyze_one(_worker_analyzer, source) for source in sources]
+
+
+class ParallelAnalyzer:
+    """
+    Analyze many files across a pool of worker processes.
+
+    Each worker owns its own CodeParser and CodeAnalyzer. Records come
+    back in the order the files were given, whatever order the workers
+    finish in. Uploads smaller than min_files are analyzed in-process so
+    they do not pay for inter-process round trips; there, concurrent
+    requests take parsers from the pool, which by default holds one.
+
+    Every worker opens the analysis cache directory with its own
+    AnalysisCache, so cache_stats() adds up the counters each file
+    reports rather than reading those of the parent's cache.
+    """
+
+    def __init__(self, parser: CodeParser, workers: int = 0, min_files: int = 64,
+                 analysis_cache: Optional[AnalysisCache] = None,
+                 pool: Optional[ParserPool] = None):
+        self.parser = parser
+        self.workers = workers or os.cpu_count() or 1
+        self.min_files = min_files
+        self.analysis_cache = analysis_cache
+        self.pool = pool or ParserPool(parser, max_size=1, idle_timeout=float("inf"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._cache_counts = dict.fromkeys(CACHE_COUNTERS, 0)
+        self._cache_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                cache = self.analysis_cache
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Forking a threaded server process is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(
+                        self.parser.library_path,
+                        str(cache.directory) if cache else None,
+                        cache.max_bytes if cache else 0
+                    )
+                )
+            return self._executor
+
+    def analyze(self, sources: List[Source],
+                chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one record per file, in the original file order.
+
+        By default the files are split into CHUNKS_PER_WORKER shards per
+        worker. A smaller chunk_size reports progress more often; either
+        way at most CHUNKS_PER_WORKER chunks per worker are in flight, so
+        results waiting behind a slow chunk stay bounded.
+        """
+        if self.workers <= 1 or len(sources) < self.min_files:
+            analyzer = CodeAnalyzer(self.pool, analysis_cache=self.analysis_cache)
+            for source in sources:
+                yield self._observe(analyze_one(analyzer, source))
+            return
+
+        if chunk_size is None:
+            chunk_size = -(-len(sources) // (self.workers * CHUNKS_PER_WORKER))
+        chunk_size = max(1, chunk_size)
+        window = self.workers * CHUNKS_PER_WORKER
+
+        executor = self._get_executor()
+        pending: "deque[Future]" = deque()
+        try:
+            for start in range(0, len(sources), chunk_size):
+                pending.append(executor.submit(_analyze_chunk, sources[start:start + chunk_size]))
+                if len(pending) >= window:
+                    for record in pending.popleft().result():
+                        yield self._observe(record)
+            # Collected in submission order
+            while pending:
+                for record in pending.popleft().result():
+                    yield self._observe(record)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request
+            self._executor = None
+            raise RuntimeError("Analysis worker process terminated unexpectedly")
+        finally:
+            # The caller stopped early, e.g. a client disconnected
+            for future in pending:
+                future.cancel()
+
+    def _observe(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        counts = record.pop("cache", {})
+        with self._cache_lock:
+            for name, count in counts.items():
+                self._cache_counts[name] += count
+        return observe(record)
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Analysis cache counters summed over this process and every worker, if caching."""
+        if self.analysis_cache is None:
+            return None
+        with self._cache_lock:
+            counts = dict(self._cache_counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+            "max_bytes": self.analysis_cache.max_bytes
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if any were started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+from tree_sitter import Parser, Tree
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import threading
+import time
+
+from analyzer.extractors import QueryExtractor
+from analyzer.tree_parser import CodeParser
+
+
+class ParserPool:
+    """
+    Tree-sitter parsers for one language, each used by one thread at a time.
+
+    A tree-sitter Parser must not be used from two threads at once, so
+    threads check a parser out, parse and return it. At most max_size
+    parsers exist; further checkouts wait for one to be returned. Parsers
+    left idle for idle_timeout seconds are dropped, so a burst of
+    concurrent requests does not keep its parsers forever.
+
+    parse_bytes, parse and extractor match CodeParser and Parser, so a
+    pool can be handed to CodeAnalyzer or EditSession in their place.
+    When timeout_micros is set and the tree-sitter binding supports parse
+    timeouts, a parse running longer gives up instead of holding its
+    parser.
+    """
+
+    def __init__(self, code_parser: CodeParser, max_size: int, idle_timeout: float,
+                 timeout_micros: int = 0):
+        self.code_parser = code_parser
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.timeout_micros = timeout_micros
+        # Older bindings (0.20) have no timeout_micros on Parser
+        self.timeout_supported = hasattr(Parser(), "timeout_micros")
+
+        # (time returned, parser), oldest first; the newest is reused first
+        # so that parsers beyond what the load needs go idle and are reaped
+        self.idle: List[Tuple[float, Parser]] = []
+        self.size = 0
+        self.condition = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.created = 0
+        self.reaped = 0
+        self.timeouts = 0
+
+    @property
+    def extractor(self) -> QueryExtractor:
+        return self.code_parser.extractor
+
+    def _new_parser(self) -> Parser:
+        parser = self.code_parser.new_parser()
+        if self.timeout_micros and self.timeout_supported:
+            parser.timeout_micros = self.timeout_micros
+        return parser
+
+    def _reap(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = 0
+        while stale < len(self.idle) and self.idle[stale][0] < cutoff:
+            stale += 1
+        if stale:
+            del self.idle[:stale]
+            self.size -= stale
+            self.reaped += stale
+
+    def checkout(self) -> Parser:
+        """Take a parser, waiting for one if max_size are all in use."""
+        with self.condition:
+            self._reap()
+            self.checkouts += 1
+            if not self.idle and self.size >= self.max_size:
+                self.waits += 1
+            while not self.idle and self.size >= self.max_size:
+                self.condition.wait()
+            if self.idle:
+                return self.idle.pop()[1]
+            self.size += 1
+
+        try:
+            parser = self._new_parser()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created += 1
+        return parser
+
+    def checkin(self, parser: Parser) -> None:
+        """Return a parser taken with checkout."""
+        with self.condition:
+            self.idle.append((time.monotonic(), parser))
+            self.condition.notify()
+
+    @contextmanager
+    def parser(self) -> Iterator[Parser]:
+        parser = self.checkout()
+        try:
+            yield parser
+        finally:
+            self.checkin(parser)
+
+    def parse(self, source: bytes, old_tree: Optional[Tree] = None) -> Tree:
+        """Parse with a pooled parser; raises TimeoutError if the parse timed out."""
+        with self.parser() as parser:
+            tree = parser.parse(source, old_tree) if old_tree is not None else parser.parse(source)
+        # With a timeout set, tree-sitter gives up and returns no tree
+        if tree is None:
+            with self.condition:
+                self.timeouts += 1
+            raise TimeoutError(f"Parsing took longer than {self.timeout_micros} microseconds")
+        return tree
+
+    def parse_bytes(self, content: bytes) -> Optional[Tree]:
+        """Parse raw Python source bytes and return its syntax tree."""
+        return self.parse(content)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            self._reap()
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "created": self.created,
+                "reaped": self.reaped,
+                "timeouts": self.timeouts,
+                "timeout_supported": self.timeout_supported
+            }
@@ -0,0 +1,435 @@
+from collections import deque
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import subprocess
+import time
+
+from analyzer.extractors import ANALYZER_VERSION, RESULT_KEYS
+from analyzer.parallel import ParallelAnalyzer
+from analyzer.results import AnalysisResults
+from analyzer.sources import is_ignored, iter_tree_sources
+from analyzer.symbol_index import SymbolIndex, module_name
+from storage import atomic_file
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the stored layout changes, so old indexes are rebuilt
+INDEX_VERSION = "1"
+
+# Record lists the symbol index is built from
+SYMBOL_KEYS = ("functions", "classes", "imports", "class_inheritance")
+
+# How changed files are found
+AUTO = "auto"
+GIT = "git"
+SCAN = "scan"
+# Reported when there was no usable index to compare with
+FULL = "full"
+
+
+class GitError(RuntimeError):
+    """Raised when a git command fails or the directory is not in a work tree."""
+
+
+def _git(root: Path, *args: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", "-C", str(root), *args],
+            check=True, capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed")
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.strip() or f"git {args[0]} failed")
+    return completed.stdout
+
+
+def git_head(root: Path) -> str:
+    return _git(root, "rev-parse", "HEAD").strip()
+
+
+def git_changes(root: Path, since: str, until: Optional[str] = None) -> Dict[str, str]:
+    """
+    Files under root changed between two revisions, or between a revision
+    and the work tree when until is None, as {path relative to root:
+    status letter}. Untracked files count as added in the work tree case.
+    """
+    revisions = [since] + ([until] if until else [])
+    output = _git(root, "diff", "--name-status", "--no-renames", "--relative", "-z", *revisions, "--")
+    fields = output.split("\0")
+    changes = {fields[i + 1]: fields[i][0] for i in range(0, len(fields) - 1, 2)}
+    if until is None:
+        for name in _git(root, "ls-files", "--others", "--exclude-standard", "-z").split("\0"):
+            if name:
+                changes.setdefault(name, "A")
+    return changes
+
+
+def git_files(root: Path) -> Set[str]:
+    """Files under root that git tracks, or would if added: every file it does not ignore."""
+    output = _git(root, "ls-files", "--cached", "--others", "--exclude-standard", "-z")
+    return {name for name in output.split("\0") if name}
+
+
+def _is_ignored_path(name: str, patterns: List[str]) -> bool:
+    """Whether a file or any directory above it matches an ignore glob."""
+    parts = name.split("/")
+    return any(is_ignored("/".join(parts[:i]), patterns) for i in range(1, len(parts) + 1))
+
+
+def _suffixes(module: str) -> List[str]:
+    parts = module.split(".")
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+def _prefixes(dotted: str) -> List[str]:
+    parts = dotted.split(".")
+    return [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _write_json(path: Path, value: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_file(path, 'w') as f:
+        json.dump(value, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def _symbols(record: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """The parts of a file's record the symbol index needs, in compact form."""
+    return {
+        "functions": [[r["name"], r["qualified_name"], r["start_line"]] for r in record["functions"]],
+        "classes": [[r["name"], r["qualified_name"], r["start_line"]] for r in record["classes"]],
+        "imports": [r["text"] for r in record["imports"]],
+        "class_inheritance": [[r["class"], r["inherits_from"]] for r in record["class_inheritance"]]
+    }
+
+
+def _symbol_records(file: str, symbols: Dict[str, List[Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    return {
+        "functions": [
+            {"file": file, "name": name, "qualified_name": qualified, "start_line": line}
+            for name, qualified, line in symbols["functions"]
+        ],
+        "classes": [
+            {"file": file, "name": name, "qualified_name": qualified, "start_line": line}
+            for name, qualified, line in symbols["classes"]
+        ],
+        "imports": [{"file": file, "text": text} for text in symbols["imports"]],
+        "class_inheritance": [
+            {"file": file, "class": name, "inherits_from": base}
+            for name, base in symbols["class_inheritance"]
+        ]
+    }
+
+
+class RepositoryIndex:
+    """
+    A persisted analysis of every Python file under a directory, brought
+    up to date by re-analyzing only what changed.
+
+    The directory holds a manifest of each file's size, mtime and content
+    hash, the symbols of every file in one compact table, and each file's
+    full record, with its resolved calls, in a file of its own. An update
+    finds candidate files with git (the diff since the last indexed
+    revision, plus files that were uncommitted then or are untracked now,
+    and a scan of the files git ignores) or by comparing sizes and mtimes,
+    and re-analyzes those whose content hash changed.
+
+    Calls are resolved again only in files whose imports can reach a
+    changed, added or deleted module, directly or through re-exports,
+    since name resolution only crosses files through imports. A grammar,
+    analyzer or ignore-list change rebuilds the index from scratch.
+    """
+
+    def __init__(self, directory: Path, root: Path, analyzer: ParallelAnalyzer,
+                 ignore: Iterable[str] = (), max_file_bytes: int = 0):
+        self.directory = Path(directory)
+        self.root = Path(root).resolve()
+        self.analyzer = analyzer
+        self.ignore = list(ignore)
+        self.max_file_bytes = max_file_bytes
+        self.version = f"{INDEX_VERSION}:{ANALYZER_VERSION}:{analyzer.parser.grammar_version}"
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.symbols: Dict[str, Dict[str, List[Any]]] = {}
+        self.revision: Optional[str] = None
+        # Files that differed from the indexed revision when it was recorded
+        self.dirty: List[str] = []
+        self._load()
+
+    def _record_path(self, file: str) -> Path:
+        digest = hashlib.sha256(file.encode('utf8')).hexdigest()
+        return self.directory / "files" / digest[:2] / f"{digest}.json"
+
+    def _load(self) -> None:
+        try:
+            with open(self.directory / "manifest.json", 'r', encoding='utf8') as f:
+                manifest = json.load(f)
+            with open(self.directory / "symbols.json", 'r', encoding='utf8') as f:
+                symbols = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("version") != self.version or manifest.get("ignore") != self.ignore:
+            logger.info("Index at %s is outdated; rebuilding it", self.directory)
+            return
+        self.files = manifest["files"]
+        self.symbols = symbols
+        self.revision = manifest.get("revision")
+        self.dirty = manifest.get("dirty", [])
+
+    def _save(self) -> None:
+        _write_json(self.directory / "symbols.json", self.symbols)
+        # Written last, so an interrupted update leaves the previous manifest
+        _write_json(self.directory / "manifest.json", {
+            "version": self.version,
+            "ignore": self.ignore,
+            "revision": self.revision,
+            "dirty": self.dirty,
+            "files": self.files
+        })
+
+    def record(self, file: str) -> Optional[Dict[str, Any]]:
+        """A file's stored record, with its resolved calls."""
+        try:
+            with open(self._record_path(file), 'r', encoding='utf8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Every stored record, in file order."""
+        for file in sorted(self.files):
+            record = self.record(file)
+            if record is not None:
+                yield record
+
+    def symbol_index(self) -> SymbolIndex:
+        """The symbol index over every file, built as a full analysis builds it."""
+        tables: Dict[str, List[Dict[str, Any]]] = {key: [] for key in SYMBOL_KEYS}
+        for file in sorted(self.symbols):
+            for key, records in _symbol_records(file, self.symbols[file]).items():
+                tables[key].extend(records)
+        index = SymbolIndex()
+        index.add(tables)
+        return index
+
+    def results(self) -> AnalysisResults:
+        """Every stored record as one analysis, with calls resolved across files."""
+        results = AnalysisResults(sorted(self.files))
+        for record in self.records():
+            results.add(record)
+        return results
+
+    def _scan(self, tracked: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Files that are new, gone, or differ in size or mtime from the
+        manifest, leaving out those in tracked, if given.
+        """
+        candidates = set()
+        seen = set()
+        for name, path in iter_tree_sources(self.root, self.ignore):
+            if tracked is not None and name in tracked:
+                continue
+            seen.add(name)
+            entry = self.files.get(name)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                candidates.add(name)
+        gone = {name for name in self.files if name not in seen and (tracked is None or name not in tracked)}
+        return candidates | gone
+
+    def _candidates(self, detect: str, since: Optional[str],
+                    until: Optional[str]) -> Tuple[str, Set[str]]:
+        """How changes were found, and the files that may have changed."""
+        if not self.files:
+            return FULL, {name for name, _ in iter_tree_sources(self.root, self.ignore)}
+
+        since = since or self.revision
+        if detect in (AUTO, GIT) and since:
+            try:
+                if until:
+                    head = git_head(self.root)
+                    if head != _git(self.root, "rev-parse", until).strip():
+                        raise GitError(f"{until} is not checked out; files are read from the work tree")
+                    # The commits between the revisions, then uncommitted work on top
+                    names = set(git_changes(self.root, since, until)) | set(git_changes(self.root, head))
+                else:
+                    names = set(git_changes(self.root, since))
+                names |= set(self.dirty)
+                candidates = {
+                    name for name in names
+                    if name.endswith(".py") and (name in self.files or not _is_ignored_path(name, self.ignore))
+                }
+                # Files git ignores are analyzed too, but only a scan sees them change
+                return GIT, candidates | self._scan(git_files(self.root))
+            except GitError as e:
+                # Revisions asked for explicitly are never silently ignored
+                if detect == GIT or since != self.revision or until:
+                    raise
+                logger.info("Finding changes by scanning, not with git: %s", e)
+        elif detect == GIT:
+            raise GitError("No revision to compare with; pass one or index a git work tree first")
+
+        return SCAN, self._scan()
+
+    def _dependents(self, index: SymbolIndex, modules: Set[str]) -> Set[str]:
+        """
+        Files whose resolved calls may change when the given modules change.
+
+        Those are the files importing the modules, or a package above
+        them, then the files importing from those a name that leads back:
+        one they import themselves, or a class with such a base.
+        """
+        # Files by every dotted prefix of the names their imports bind
+        prefix_refs: Dict[str, Set[str]] = {}
+        exact_refs: Dict[str, Set[str]] = {}
+        for file, scope in index.scopes.items():
+            for target in list(scope.aliases.values()) + scope.star_imports:
+                exact_refs.setdefault(target, set()).add(file)
+                for prefix in _prefixes(target):
+                    prefix_refs.setdefault(prefix, set()).add(file)
+
+        affected: Set[str] = set()
+        # Names already followed per module; None once every name is
+        followed: Dict[str, Optional[Set[str]]] = {module: None for module in modules}
+        queue: "deque[Tuple[str, Optional[Set[str]]]]" = deque((module, None) for module in modules)
+        while queue:
+            module, names = queue.popleft()
+            # Dotted names that changed, under every name the module may be imported by
+            changed = set()
+            for suffix in _suffixes(module):
+                changed.update([suffix] if names is None else (f"{suffix}.{name}" for name in names))
+            # Packages above a changed name, through which calls may reach it
+            above = {prefix for name in changed for prefix in _prefixes(name)[:-1]}
+
+            files = set()
+            for name in changed:
+                files |= prefix_refs.get(name, set())
+            for name in above:
+                files |= exact_refs.get(name, set())
+
+            def leads_back(target: str) -> bool:
+                return target in above or any(prefix in changed for prefix in _prefixes(target))
+
+            for file in files:
+                affected.add(file)
+                scope = index.scopes[file]
+                if any(leads_back(target) for target in scope.star_imports):
+                    passed = None
+                else:
+                    passed = {alias for alias, target in scope.aliases.items() if leads_back(target)}
+                    # Classes whose bases are such names, or such classes
+                    grown = True
+                    while grown:
+                        grown = False
+                        for class_name, bases in scope.bases.items():
+                            if class_name not in passed and any(
+                                    base.split(".")[0] in passed for base in bases):
+                                passed.add(class_name)
+                                grown = True
+
+                previous = followed.get(scope.name, set())
+                if previous is None or passed == set():
+                    continue
+                if passed is not None:
+                    passed -= previous
+                    if not passed:
+                        continue
+                    followed[scope.name] = previous | passed
+                else:
+                    followed[scope.name] = None
+                queue.append((scope.name, passed))
+        return affected
+
+    def update(self, detect: str = AUTO, since: Optional[str] = None,
+               until: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the work tree and report what was
+        done: the files re-analyzed, those deleted, and those whose calls
+        were resolved again, whose records have changed.
+        """
+        started = time.perf_counter()
+        mode, candidates = self._candidates(detect, since, until)
+
+        changed: List[Tuple[str, Path]] = []
+        errors: List[Dict[str, Any]] = []
+        deleted: List[str] = []
+        for name in sorted(candidates):
+            path = self.root / name
+            try:
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                stat = path.stat()
+            except OSError:
+                if name in self.files:
+                    deleted.append(name)
+                continue
+            entry = self.files.get(name)
+            if entry is not None and entry["sha256"] == digest:
+                # Touched but not changed
+                entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+            self.files[name] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            if self.max_file_bytes and stat.st_size > self.max_file_bytes:
+                errors.append({"file": name, "error": f"File too large: {stat.st_size} bytes"})
+            else:
+                changed.append((name, path))
+        added = sum(1 for name in candidates if name in self.files and name not in self.symbols)
+
+        # Stored as they come in, so a full build never holds every record at once
+        analyzed = []
+        for record in chain(errors, self.analyzer.analyze(changed)):
+            if "error" in record:
+                record = {"file": record["file"], "error": record["error"],
+                          **{key: [] for key in RESULT_KEYS}}
+            self.symbols[record["file"]] = _symbols(record)
+            _write_json(self._record_path(record["file"]), record)
+            analyzed.append(record["file"])
+        for name in deleted:
+            self.files.pop(name, None)
+            self.symbols.pop(name, None)
+            try:
+                self._record_path(name).unlink()
+            except OSError:
+                pass
+
+        index = self.symbol_index()
+        if mode == FULL:
+            affected = set(analyzed)
+        else:
+            # Modules whose definitions or imports may differ now
+            touched = {module_name(name) for name in analyzed + deleted}
+            affected = (self._dependents(index, touched) | set(analyzed)) & set(self.files)
+
+        for file in sorted(affected):
+            record = self.record(file)
+            if record is not None:
+                record["resolved_calls"] = list(index.resolve_calls(record["function_calls"]))
+                _write_json(self._record_path(file), record)
+
+        if mode != SCAN:
+            try:
+                self.revision = git_head(self.root)
+                # Uncommitted changes are checked again next time, whatever the diff says
+                self.dirty = sorted(git_changes(self.root, self.revision))
+            except GitError:
+                self.revision = None
+                self.dirty = []
+        self._save()
+
+        return {
+            "mode": mode,
+            "revision": self.revision,
+            "files": len(self.files),
+            "analyzed": len(analyzed),
+            "added": added,
+            "deleted": deleted,
+            "affected": sorted(affected),
+            "seconds": time.perf_counter() - started
+        }
@@ -0,0 +1,178 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import json
+import sys
+
+from analyzer.extractors import RESULT_KEYS
+from analyzer.symbol_index import SymbolIndex
+from analyzer.symbols import RECORD_FIELDS, RecordTable, StringTable
+
+RELATIONSHIP_TYPES = ("function_calls", "class_inheritance", "import_dependencies")
+
+# Relationships computed over the whole analyzed set rather than per file
+RESOLVED_CALLS = "resolved_calls"
+
+# Records serialized per chunk of a streamed response
+JSON_CHUNK_RECORDS = 1000
+
+
+def _dumps(value: Any) -> str:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _iter_json_array(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    chunk: List[str] = []
+    separator = "["
+    for record in records:
+        chunk.append(separator)
+        chunk.append(_dumps(record))
+        separator = ","
+        if len(chunk) >= 2 * JSON_CHUNK_RECORDS:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append("]" if separator == "," else "[]")
+    yield "".join(chunk)
+
+
+class AnalysisResults:
+    """
+    Accumulates per-file analysis records into the /api/analyze response.
+
+    Records are stored in compact record tables with interned strings
+    rather than as one dict per symbol; dicts are rebuilt lazily when the
+    response is serialized. Once every file is added, resolve() links the
+    calls to the definitions they refer to across files.
+    """
+
+    def __init__(self, files: List[str]):
+        self.files = files
+        self.file_table = StringTable()
+        for file in files:
+            self.file_table.add(file)
+        self.strings = StringTable()
+        self.tables: Dict[str, RecordTable] = {
+            key: RecordTable(fields, self.file_table, self.strings)
+            for key, fields in RECORD_FIELDS.items()
+        }
+        self.errors: List[Dict[str, Any]] = []
+        self.index: Optional[SymbolIndex] = None
+
+    @property
+    def functions(self) -> RecordTable:
+        return self.tables["functions"]
+
+    @property
+    def classes(self) -> RecordTable:
+        return self.tables["classes"]
+
+    @property
+    def imports(self) -> RecordTable:
+        return self.tables["imports"]
+
+    @property
+    def relationships(self) -> Dict[str, RecordTable]:
+        return {
+            rel_type: self.tables[rel_type]
+            for rel_type in RELATIONSHIP_TYPES + (RESOLVED_CALLS,)
+        }
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Merge one file's record, as produced by analyze_one."""
+        if "error" in record:
+            self.errors.append({
+                "file": record["file"],
+                "error": record["error"]
+            })
+            return
+
+        for key in RESULT_KEYS:
+            self.tables[key].extend(record[key])
+        self.index = None
+
+    def resolve(self) -> SymbolIndex:
+        """Build the symbol index over every file added so far and resolve the calls."""
+        if self.index is None:
+            index = SymbolIndex()
+            index.add(self.tables)
+            resolved = self.tables[RESOLVED_CALLS] = RecordTable(
+                RECORD_FIELDS[RESOLVED_CALLS], self.file_table, self.strings)
+            resolved.extend(index.resolve_calls(self.tables["function_calls"]))
+            self.index = index
+        return self.index
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        self.errors.append(error)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisResults":
+        """Rebuild results from a response produced by to_dict or iter_json."""
+        results = cls(data["files"])
+        for key in RESULT_KEYS:
+            source = data["relationships"] if key in RELATIONSHIP_TYPES else data
+            results.tables[key].extend(source[key])
+        results.errors = data.get("errors", [])
+        results.resolve()
+        return results
+
+    def memory_size(self) -> int:
+        """Approximate bytes held by the record tables and interned strings."""
+        size = sum(
+            column.itemsize * len(column)
+            for table in self.tables.values()
+            for columns in (table.columns, table.items)
+            for column in columns.values()
+        )
+        for table in (self.strings, self.file_table):
+            # Each string, plus its list slot and dict entry
+            size += sum(sys.getsizeof(value) + 8 + 100 for value in table.strings)
+        return size
+
+    def view(self) -> Dict[str, Any]:
+        """
+        The response's layout over the record tables, for code that reads
+        an analysis as a dict; records are built only as they are read.
+        """
+        self.resolve()
+        return {
+            "files": self.files,
+            "functions": self.functions,
+            "classes": self.classes,
+            "relationships": self.relationships,
+            "imports": self.imports,
+            "errors": self.errors
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the full response; prefer iter_json for large analyses."""
+        self.resolve()
+        return {
+            "files": self.files,
+            "functions": list(self.functions),
+            "classes": list(self.classes),
+            "relationships": {
+                rel_type: list(table) for rel_type, table in self.relationships.items()
+            },
+            "imports": list(self.imports),
+            "errors": self.errors
+        }
+
+    def iter_json(self, extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Serialize the response in chunks, in the same layout as to_dict,
+        without holding every record as a dict at once. Fields in extra
+        are written first.
+        """
+        self.resolve()
+        head = "".join(_dumps(key) + ":" + _dumps(value) + "," for key, value in (extra or {}).items())
+        yield '{' + head + '"files":' + _dumps(self.files) + ',"functions":'
+        yield from _iter_json_array(self.functions)
+        yield ',"classes":'
+        yield from _iter_json_array(self.classes)
+        separator = ',"relationships":{'
+        for rel_type, table in self.relationships.items():
+            yield separator + _dumps(rel_type) + ":"
+            yield from _iter_json_array(table)
+            separator = ","
+        yield '},"imports":'
+        yield from _iter_json_array(self.imports)
+        yield ',"errors":' + _dumps(self.errors) + "}"
@@ -0,0 +1,148 @@
+from typing import BinaryIO, Iterable, Iterator, Tuple
+from pathlib import Path
+import fnmatch
+import os
+import posixpath
+import tarfile
+import zipfile
+
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar")
+
+# Skipped when walking a repository: tooling state, environments, build output
+DEFAULT_IGNORES = (
+    ".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "node_modules",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", "build", "dist", "*.egg-info"
+)
+
+
+class ArchiveLimitExceeded(ValueError):
+    """Raised when an archive has too many members or too much content."""
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _member_name(name: str) -> str:
+    """Normalize an archive member path; it is only ever used as a label."""
+    return posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+
+
+class _SourceBudget:
+    """
+    Enforces the per-archive limits while members are read. Every member
+    counts, including those skipped: a tar stream decompresses them to
+    get past them, so their size is charged before that happens.
+    """
+
+    def __init__(self, max_members: int, max_bytes: int):
+        self.max_members = max_members
+        self.max_bytes = max_bytes
+        self.members = 0
+        self.bytes = 0
+
+    def admit(self, name: str, declared_size: int) -> int:
+        """Count a member and return how many bytes it may still occupy."""
+        self.members += 1
+        if self.members > self.max_members:
+            raise ArchiveLimitExceeded(
+                f"Archive has more than {self.max_members} members")
+
+        remaining = self.max_bytes - self.bytes
+        if declared_size > remaining:
+            raise ArchiveLimitExceeded(
+                f"Archive content exceeds {self.max_bytes} bytes at {name}")
+        return remaining
+
+    def skip(self, name: str, declared_size: int) -> None:
+        """Count a member that is not read, charging its declared size."""
+        self.admit(name, declared_size)
+        self.bytes += declared_size
+
+    def consume(self, name: str, content: bytes, remaining: int) -> None:
+        # Headers can understate a member's size, so check what was read too
+        if len(content) > remaining:
+            raise ArchiveLimitExceeded(
+                f"Archive content exceeds {self.max_bytes} bytes at {name}")
+        self.bytes += len(content)
+
+
+def _iter_zip(fileobj: BinaryIO, budget: _SourceBudget) -> Iterator[Tuple[str, bytes]]:
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            name = _member_name(info.filename)
+            if info.is_dir() or not info.filename.endswith(".py"):
+                budget.skip(name, info.file_size)
+                continue
+
+            remaining = budget.admit(name, info.file_size)
+            with archive.open(info) as member:
+                content = member.read(remaining + 1)
+            budget.consume(name, content, remaining)
+            yield name, content
+
+
+def _iter_tar(fileobj: BinaryIO, budget: _SourceBudget) -> Iterator[Tuple[str, bytes]]:
+    # Stream mode reads members in order without seeking or extracting to disk
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            name = _member_name(info.name)
+            if not info.isfile() or not info.name.endswith(".py"):
+                # Checked before the next iteration decompresses past it
+                budget.skip(name, info.size)
+                continue
+
+            remaining = budget.admit(name, info.size)
+            member = archive.extractfile(info)
+            content = member.read(remaining + 1) if member else b""
+            budget.consume(name, content, remaining)
+            yield name, content
+
+
+def iter_archive_sources(fileobj: BinaryIO, filename: str, max_members: int,
+                         max_bytes: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (member name, content) for every Python file in a zip or tar archive.
+
+    Members are read one at a time straight into memory. Nothing is
+    written to disk, and ArchiveLimitExceeded is raised as soon as the
+    member count or total uncompressed size, of every member and not
+    only the Python files, goes over its limit.
+    """
+    budget = _SourceBudget(max_members, max_bytes)
+    if filename.lower().endswith(".zip"):
+        yield from _iter_zip(fileobj, budget)
+    else:
+        yield from _iter_tar(fileobj, budget)
+
+
+def is_ignored(name: str, patterns: Iterable[str]) -> bool:
+    """
+    Whether a path relative to the walked root, in / form, matches an
+    ignore glob. A pattern matches the whole relative path or its last
+    component, so "tests" skips every tests directory and "pkg/gen/*.py"
+    only the files under pkg/gen.
+    """
+    base = posixpath.basename(name)
+    for pattern in patterns:
+        pattern = pattern.rstrip("/")
+        if fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(base, pattern):
+            return True
+    return False
+
+
+def iter_tree_sources(root: Path, ignore: Iterable[str] = DEFAULT_IGNORES) -> Iterator[Tuple[str, Path]]:
+    """
+    The Python files under a directory as (name relative to root, path)
+    pairs, in sorted order. Ignored directories are not descended into.
+    """
+    patterns = list(ignore)
+    for directory, dirnames, filenames in os.walk(root):
+        relative = Path(directory).relative_to(root).as_posix()
+        prefix = "" if relative == "." else relative + "/"
+        dirnames[:] = sorted(
+            dirname for dirname in dirnames if not is_ignored(prefix + dirname, patterns))
+        for filename in sorted(filenames):
+            name = prefix + filename
+            if filename.endswith(".py") and not is_ignored(name, patterns):
+                yield name, Path(directory) / filename
@@ -0,0 +1,291 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import ast
+import posixpath
+import re
+
+# Kinds of definitions a call can resolve to
+FUNCTION = "function"
+CLASS = "class"
+
+# How many import or base-class hops are followed when resolving a name
+MAX_RESOLVE_DEPTH = 8
+
+DOTTED_NAME = re.compile(r"[A-Za-z_]\w*(\.[A-Za-z_]\w*)*")
+
+
+def module_name(file: str) -> str:
+    """
+    Dotted module name of a source path, e.g. pkg/mod.py -> pkg.mod.
+
+    Packages start after the last directory that is not a valid
+    identifier, so site-packages/pkg/mod.py and repo.zip/pkg/mod.py are
+    both pkg.mod.
+    """
+    parts = posixpath.normpath(file.replace("\\", "/")).split("/")
+    if parts[-1].endswith(".py"):
+        parts[-1] = parts[-1][:-3]
+    if parts[-1] == "__init__":
+        parts.pop()
+
+    start = len(parts)
+    while start > 0 and parts[start - 1].isidentifier():
+        start -= 1
+    # A file whose own name is not an identifier is still named by its stem
+    return ".".join(parts[start:]) if start < len(parts) else (parts[-1] if parts else "")
+
+
+def _package_of(file: str, module: str) -> str:
+    # The package a relative import starts from; a package's __init__ is its own
+    if posixpath.basename(file.replace("\\", "/")) == "__init__.py":
+        return module
+    return module.rpartition(".")[0]
+
+
+def _parse_import(text: str) -> Optional[Tuple[int, Optional[str], List[Tuple[str, Optional[str]]]]]:
+    """(relative level, module, [(name, alias)]) of one import statement, or None."""
+    try:
+        statement = ast.parse(text).body[0]
+    except (SyntaxError, ValueError, IndexError):
+        return None
+    names = [(alias.name, alias.asname) for alias in statement.names]
+    if isinstance(statement, ast.ImportFrom):
+        return statement.level, statement.module, names
+    if isinstance(statement, ast.Import):
+        return 0, None, names
+    return None
+
+
+class Definition:
+    """Where a function or class is defined."""
+
+    __slots__ = ("qualified_name", "kind", "file", "line")
+
+    def __init__(self, qualified_name: str, kind: str, file: str, line: int):
+        self.qualified_name = qualified_name
+        self.kind = kind
+        self.file = file
+        self.line = line
+
+
+class ModuleScope:
+    """The module a file defines and the names its imports bind."""
+
+    __slots__ = ("name", "aliases", "star_imports", "classes", "bases")
+
+    def __init__(self, name: str):
+        self.name = name
+        # Local name -> absolute dotted name it refers to
+        self.aliases: Dict[str, str] = {}
+        # Modules pulled in with "from x import *"
+        self.star_imports: List[str] = []
+        # Class short name -> qualified names (within the module) of that name
+        self.classes: Dict[str, List[str]] = {}
+        # Class qualified name (within the module) -> base class expressions
+        self.bases: Dict[str, List[str]] = {}
+
+
+class SymbolIndex:
+    """
+    Index of every function and class across an analyzed set of files.
+
+    Definitions are keyed by fully qualified name (module.Class.method),
+    short names map to every place they are defined, and each file's
+    imports are resolved to the absolute names they bind. Call edges are
+    then resolved to concrete definitions with dictionary lookups only.
+    """
+
+    def __init__(self):
+        self.definitions: Dict[str, Definition] = {}
+        self.by_name: Dict[str, List[Definition]] = {}
+        self.scopes: Dict[str, ModuleScope] = {}
+        self.modules: Dict[str, ModuleScope] = {}
+        # Every dotted suffix of every module name -> modules ending with it,
+        # so "pkg.mod" also finds a file analyzed as src/pkg/mod.py
+        self.module_suffixes: Dict[str, List[str]] = {}
+        self._import_cache: Dict[str, Any] = {}
+        self._lookups: Dict[str, Optional[Definition]] = {}
+
+    def _scope(self, file: str) -> ModuleScope:
+        scope = self.scopes.get(file)
+        if scope is None:
+            scope = self.scopes[file] = ModuleScope(module_name(file))
+            self.modules.setdefault(scope.name, scope)
+            parts = scope.name.split(".")
+            for i in range(len(parts)):
+                self.module_suffixes.setdefault(".".join(parts[i:]), []).append(scope.name)
+        return scope
+
+    def _define(self, record: Dict[str, Any], kind: str) -> None:
+        scope = self._scope(record["file"])
+        qualified_name = f"{scope.name}.{record['qualified_name']}".lstrip(".")
+        definition = Definition(qualified_name, kind, record["file"], record["start_line"])
+        # The first definition wins, as for a name bound twice in one module
+        if self.definitions.setdefault(qualified_name, definition) is definition:
+            self.by_name.setdefault(record["name"], []).append(definition)
+            if kind == CLASS:
+                scope.classes.setdefault(record["name"], []).append(record["qualified_name"])
+
+    def _add_import(self, record: Dict[str, Any]) -> None:
+        text = record["text"]
+        parsed = self._import_cache.get(text)
+        if parsed is None and text not in self._import_cache:
+            parsed = self._import_cache[text] = _parse_import(text)
+        if parsed is None:
+            return
+
+        scope = self._scope(record["file"])
+        level, module, names = parsed
+        if level:
+            base = _package_of(record["file"], scope.name)
+            for _ in range(level - 1):
+                base = base.rpartition(".")[0]
+            module = ".".join(part for part in (base, module) if part)
+
+        for name, alias in names:
+            if module is None:
+                # import a.b binds a; import a.b as c binds c to a.b
+                if alias:
+                    scope.aliases[alias] = name
+                else:
+                    head = name.partition(".")[0]
+                    scope.aliases[head] = head
+            elif name == "*":
+                scope.star_imports.append(module)
+            else:
+                scope.aliases[alias or name] = f"{module}.{name}" if module else name
+
+    def add(self, results: Dict[str, Iterable[Dict[str, Any]]]) -> None:
+        """Index the definitions and imports of extraction results of any number of files."""
+        self._lookups.clear()
+        for record in results.get("functions", ()):
+            self._define(record, FUNCTION)
+        for record in results.get("classes", ()):
+            self._define(record, CLASS)
+        for record in results.get("imports", ()):
+            self._add_import(record)
+        for record in results.get("class_inheritance", ()):
+            self._add_base(record)
+
+    def _add_base(self, record: Dict[str, Any]) -> None:
+        # Inheritance records name the class by its short name; bases of a
+        # nested class are attributed to every class of that name in the file
+        scope = self._scope(record["file"])
+        for local in scope.classes.get(record["class"], ()):
+            scope.bases.setdefault(local, []).append(record["inherits_from"])
+
+    def find_modules(self, dotted: str) -> List[str]:
+        """Modules a dotted import name may refer to, an exact match first."""
+        if dotted in self.modules:
+            return [dotted]
+        return self.module_suffixes.get(dotted, [])
+
+    def lookup(self, dotted: str, depth: int = 0) -> Optional[Definition]:
+        """Resolve an absolute dotted name, following re-exports through imports."""
+        if dotted in self._lookups:
+            return self._lookups[dotted]
+        # Marked unresolved while in progress, which also breaks import cycles;
+        # every name is then resolved at most once however often it is reached
+        self._lookups[dotted] = None
+        definition = self._lookups[dotted] = self._lookup(dotted, depth)
+        return definition
+
+    def _lookup(self, dotted: str, depth: int) -> Optional[Definition]:
+        definition = self.definitions.get(dotted)
+        if definition is not None or depth > MAX_RESOLVE_DEPTH:
+            return definition
+
+        # As with imports, the longest prefix naming an analyzed module is the
+        # module; the rest is looked up in it, possibly as a re-export
+        parts = dotted.split(".")
+        for split in range(len(parts) - 1, 0, -1):
+            modules = self.find_modules(".".join(parts[:split]))
+            if not modules:
+                continue
+            rest = parts[split:]
+            for module in modules:
+                definition = self._lookup_in_scope(self.modules[module], rest, depth + 1)
+                if definition is not None:
+                    return definition
+            return None
+        return None
+
+    def _lookup_in_scope(self, scope: ModuleScope, parts: List[str],
+                         depth: int) -> Optional[Definition]:
+        """Resolve a name as seen from the top level of a module."""
+        definition = self.definitions.get(".".join([scope.name] + parts).lstrip("."))
+        if definition is not None:
+            return definition
+
+        target = scope.aliases.get(parts[0])
+        if target is not None:
+            return self.lookup(".".join([target] + parts[1:]), depth)
+
+        for module in scope.star_imports:
+            definition = self.lookup(".".join([module] + parts), depth)
+            if definition is not None:
+                return definition
+        return None
+
+    def _method(self, scope: ModuleScope, class_name: str, method: str,
+                depth: int = 0) -> Optional[Definition]:
+        """Find a method on a class or, failing that, on its resolvable bases."""
+        definition = self.definitions.get(f"{scope.name}.{class_name}.{method}".lstrip("."))
+        if definition is not None or depth > MAX_RESOLVE_DEPTH:
+            return definition
+
+        for base in scope.bases.get(class_name, ()):
+            base_class = self._lookup_in_scope(scope, base.split("."), depth + 1)
+            if base_class is None or base_class.kind != CLASS:
+                continue
+            base_scope = self.scopes[base_class.file]
+            local = base_class.qualified_name[len(base_scope.name):].lstrip(".")
+            definition = self._method(base_scope, local, method, depth + 1)
+            if definition is not None:
+                return definition
+        return None
+
+    def resolve(self, file: str, caller_qualified: str, callee: str) -> Optional[Definition]:
+        """The definition a call in file, made from caller_qualified, refers to."""
+        callee = "".join(callee.split())
+        if not DOTTED_NAME.fullmatch(callee):
+            return None
+
+        scope = self._scope(file)
+        parts = callee.split(".")
+
+        if parts[0] in ("self", "cls") and len(parts) == 2:
+            # A method of the class the calling method belongs to
+            class_name = caller_qualified.rpartition(".")[0]
+            class_definition = self.definitions.get(f"{scope.name}.{class_name}".lstrip("."))
+            if class_definition is not None and class_definition.kind == CLASS:
+                return self._method(scope, class_name, parts[1])
+            return None
+
+        # Enclosing function scopes, innermost first; class bodies are not scopes
+        enclosing = caller_qualified.split(".")
+        while enclosing:
+            prefix = ".".join([scope.name] + enclosing).lstrip(".")
+            container = self.definitions.get(prefix)
+            if container is not None and container.kind == FUNCTION:
+                definition = self.definitions.get(".".join([prefix] + parts))
+                if definition is not None:
+                    return definition
+            enclosing.pop()
+
+        return self._lookup_in_scope(scope, parts, 0)
+
+    def resolve_calls(self, calls: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield a resolved edge for every call whose target is an analyzed definition."""
+        for call in calls:
+            scope = self._scope(call["file"])
+            definition = self.resolve(call["file"], call["caller_qualified"], call["callee"])
+            if definition is None:
+                continue
+            yield {
+                "file": call["file"],
+                "caller": f"{scope.name}.{call['caller_qualified']}".lstrip("."),
+                "callee": definition.qualified_name,
+                "callee_kind": definition.kind,
+                "callee_file": definition.file,
+                "line": call["line"]
+            }
@@ -0,0 +1,123 @@
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Field kinds of a compact record table
+FILE = "file"
+STRING = "string"
+INTEGER = "integer"
+STRING_LIST = "string_list"
+
+# Fields of every record kind, in the order the JSON API emits them
+RECORD_FIELDS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "functions": (
+        ("file", FILE), ("name", STRING), ("qualified_name", STRING),
+        ("start_line", INTEGER), ("end_line", INTEGER)),
+    "classes": (
+        ("file", FILE), ("name", STRING), ("qualified_name", STRING),
+        ("start_line", INTEGER), ("end_line", INTEGER), ("methods", STRING_LIST)),
+    "imports": (
+        ("file", FILE), ("type", STRING), ("text", STRING), ("line", INTEGER)),
+    "function_calls": (
+        ("file", FILE), ("caller", STRING), ("caller_qualified", STRING),
+        ("callee", STRING), ("line", INTEGER)),
+    "class_inheritance": (
+        ("file", FILE), ("class", STRING), ("inherits_from", STRING)),
+    "import_dependencies": (
+        ("file", FILE), ("import_statement", STRING), ("line", INTEGER)),
+    # Calls resolved by the symbol index across the whole analyzed set
+    "resolved_calls": (
+        ("file", FILE), ("caller", STRING), ("callee", STRING), ("callee_kind", STRING),
+        ("callee_file", FILE), ("line", INTEGER)),
+}
+
+
+class StringTable:
+    """Stores each distinct string once and refers to it by index."""
+
+    __slots__ = ("strings", "index")
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+    def __getitem__(self, position: int) -> str:
+        return self.strings[position]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class RecordTable:
+    """
+    Struct-of-arrays storage for one kind of record.
+
+    Every field is a column of unsigned ints: strings are indexes into a
+    shared StringTable, file paths into the file table, and string lists
+    are end offsets into a second column holding the items. Records are
+    turned back into dicts only when they are read.
+    """
+
+    def __init__(self, fields: Tuple[Tuple[str, str], ...], files: StringTable,
+                 strings: StringTable):
+        self.fields = fields
+        self.files = files
+        self.strings = strings
+        self.columns = {name: array("I") for name, _ in fields}
+        self.items = {name: array("I") for name, kind in fields if kind == STRING_LIST}
+        self.count = 0
+
+    def append(self, record: Dict[str, Any]) -> None:
+        for name, kind in self.fields:
+            value = record[name]
+            if kind == FILE:
+                value = self.files.add(value)
+            elif kind == STRING:
+                value = self.strings.add(value)
+            elif kind == STRING_LIST:
+                items = self.items[name]
+                items.extend(self.strings.add(item) for item in value)
+                value = len(items)
+            self.columns[name].append(value)
+        self.count += 1
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def _readers(self) -> List[Tuple[str, Callable[[int], Any]]]:
+        readers = []
+        for name, kind in self.fields:
+            column = self.columns[name]
+            if kind == FILE:
+                reader = lambda i, c=column, t=self.files.strings: t[c[i]]
+            elif kind == STRING:
+                reader = lambda i, c=column, t=self.strings.strings: t[c[i]]
+            elif kind == STRING_LIST:
+                reader = lambda i, c=column, items=self.items[name], t=self.strings.strings: [
+                    t[item] for item in items[c[i - 1] if i else 0:c[i]]
+                ]
+            else:
+                reader = column.__getitem__
+            readers.append((name, reader))
+        return readers
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        if not -self.count <= position < self.count:
+            raise IndexError(position)
+        position %= self.count
+        return {name: read(position) for name, read in self._readers()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        readers = self._readers()
+        for position in range(self.count):
+            yield {name: read(position) for name, read in readers}
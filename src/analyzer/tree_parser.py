@@ -1,50 +1,98 @@
 from tree_sitter import Language, Parser, Tree, Node
 from typing import Optional, Callable
 import os
+import sys
 from pathlib import Path
 import subprocess
+import hashlib
+import logging
+
+from analyzer.extractors import QueryExtractor
+
+LANGUAGE_LIBRARY = 'build/my-languages.so'
+GRAMMAR_REPOSITORY = 'https://github.com/tree-sitter/tree-sitter-python.git'
+
+logger = logging.getLogger(__name__)
+
+
+def build_language_library(library_path: str = LANGUAGE_LIBRARY,
+                           grammar_dir: str = 'tree-sitter-python') -> None:
+    """Clone the Python grammar if needed and compile it into a shared library."""
+    if not os.path.exists(grammar_dir):
+        logger.info("Cloning tree-sitter-python repository")
+        subprocess.run(['git', 'clone', GRAMMAR_REPOSITORY, grammar_dir], check=True)
+
+    logger.info("Building language library", extra={"library_path": library_path})
+    os.makedirs(os.path.dirname(library_path) or '.', exist_ok=True)
+    Language.build_library(library_path, [grammar_dir])
 
 
 class CodeParser:
-    def __init__(self):
-        print("Initializing CodeParser...")
+    """
+    Python parser over a prebuilt grammar library.
+
+    Loading the library takes milliseconds. Only when it is missing and
+    build_if_missing is set is the grammar cloned and compiled, which
+    needs git, a C compiler and network access; otherwise build it ahead
+    of time with `python -m analyzer.tree_parser`.
+    """
+
+    def __init__(self, library_path: str = LANGUAGE_LIBRARY, build_if_missing: bool = True):
+        self.library_path = library_path
+        self.build_if_missing = build_if_missing
         self.parser: Optional[Parser] = None
         self.language: Optional[Language] = None
+        self._grammar_version: Optional[str] = None
+        self._extractor: Optional[QueryExtractor] = None
         self.setup_tree_sitter()
-        print("Initialization complete.")
 
     def setup_tree_sitter(self) -> None:
         """Set up the tree-sitter parser with Python language support."""
         try:
-            print("Setting up tree-sitter...")
-            # Check if we need to clone the Python grammar
-            if not os.path.exists('tree-sitter-python'):
-                print("Cloning tree-sitter-python repository...")
-                subprocess.run([
-                    'git', 'clone',
-                    'https://github.com/tree-sitter/tree-sitter-python.git'
-                ], check=True)
-
-            # Build the language library if it doesn't exist
-            if not os.path.exists('build/my-languages.so'):
-                print("Building language library...")
-                os.makedirs('build', exist_ok=True)
-                Language.build_library(
-                    'build/my-languages.so',
-                    ['tree-sitter-python']
-                )
+            if not os.path.exists(self.library_path):
+                if not self.build_if_missing:
+                    raise FileNotFoundError(
+                        f"Grammar library {self.library_path} not found; "
+                        f"build it with `python -m analyzer.tree_parser {self.library_path}`"
+                    )
+                build_language_library(self.library_path)
 
             # Load the Python language
-            print("Loading Python language...")
-            self.language = Language('build/my-languages.so', 'python')
+            self.language = Language(self.library_path, 'python')
             self.parser = Parser()
             self.parser.set_language(self.language)
-            print("Tree-sitter setup complete.")
+            logger.debug("Loaded Python grammar", extra={"library_path": self.library_path})
 
         except Exception as e:
-            print(f"Error setting up tree-sitter: {str(e)}")
+            logger.error("Error setting up tree-sitter: %s", e)
             raise
 
+    def new_parser(self) -> Parser:
+        """Create an independent parser sharing the loaded Python language."""
+        if not self.language:
+            raise RuntimeError("Parser not initialized")
+
+        parser = Parser()
+        parser.set_language(self.language)
+        return parser
+
+    @property
+    def extractor(self) -> QueryExtractor:
+        """Extraction queries for the loaded language, compiled on first use."""
+        if self._extractor is None:
+            if not self.language:
+                raise RuntimeError("Parser not initialized")
+            self._extractor = QueryExtractor(self.language)
+        return self._extractor
+
+    @property
+    def grammar_version(self) -> str:
+        """Digest of the loaded grammar library, used to key cached results."""
+        if self._grammar_version is None:
+            with open(self.library_path, 'rb') as f:
+                self._grammar_version = hashlib.sha256(f.read()).hexdigest()
+        return self._grammar_version
+
     def parse_file(self, file_path: str) -> Optional[Tree]:
         """
         Parse a Python file and return its syntax tree.
@@ -53,15 +101,13 @@ class CodeParser:
             raise RuntimeError("Parser not initialized")
 
         try:
-            print(f"Parsing file: {file_path}")
             with open(file_path, 'rb') as f:
                 content = f.read()
-                print(f"File size: {len(content)} bytes")
-                tree = self.parser.parse(content)
-                print("File parsed successfully.")
-                return tree
+            tree = self.parser.parse(content)
+            logger.debug("Parsed file", extra={"file": str(file_path), "bytes": len(content)})
+            return tree
         except Exception as e:
-            print(f"Error parsing file {file_path}: {str(e)}")
+            logger.warning("Error parsing file %s: %s", file_path, e)
             return None
 
     def parse_source(self, source_code: str) -> Optional[Tree]:
@@ -72,32 +118,38 @@ class CodeParser:
             raise RuntimeError("Parser not initialized")
 
         try:
-            print("Parsing source code...")
-            tree = self.parser.parse(bytes(source_code, 'utf8'))
-            print("Source code parsed successfully.")
-            return tree
+            return self.parser.parse(bytes(source_code, 'utf8'))
         except Exception as e:
-            print(f"Error parsing source code: {str(e)}")
+            logger.warning("Error parsing source code: %s", e)
+            return None
+
+    def parse_bytes(self, content: bytes) -> Optional[Tree]:
+        """
+        Parse raw Python source bytes and return its syntax tree.
+        """
+        if not self.parser:
+            raise RuntimeError("Parser not initialized")
+
+        try:
+            return self.parser.parse(content)
+        except Exception as e:
+            logger.warning("Error parsing source bytes: %s", e)
             return None
 
     def get_root_node(self, tree: Tree) -> Optional[Node]:
         """
         Get the root node of a parsed syntax tree.
         """
-        if tree:
-            print("Retrieving root node...")
-            return tree.root_node
-        else:
-            print("No tree provided.")
-            return None
+        return tree.root_node if tree else None
 
     def get_node_text(self, node: Node, source_code: bytes) -> str:
         """
         Get the text corresponding to a node in the syntax tree.
         """
-        if node:
-            print("Retrieving node text...")
-            return node.text.decode('utf8')
-        else:
-            print("No node provided.")
-            return ""
+        return node.text.decode('utf8') if node else ""
+
+
+if __name__ == "__main__":
+    # Build the grammar library ahead of time, e.g. in a Docker image
+    logging.basicConfig(level=logging.INFO)
+    build_language_library(sys.argv[1] if len(sys.argv) > 1 else LANGUAGE_LIBRARY)
@@ -0,0 +1,246 @@
+# src/cli.py
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+from analyzer.tree_parser import CodeParser
+from analyzer.analysis_cache import AnalysisCache
+from analyzer.parallel import ParallelAnalyzer
+from analyzer.repo_index import AUTO, GIT, SCAN, GitError, RepositoryIndex
+from analyzer.results import AnalysisResults
+from analyzer.sources import DEFAULT_IGNORES, iter_tree_sources
+from telemetry.logs import configure_logging
+from config import settings
+
+# Files sent to a worker at a time; small enough for steady progress
+CHUNK_SIZE = 32
+
+# Seconds between redraws of the progress line
+PROGRESS_INTERVAL = 0.2
+
+
+class Progress:
+    """A single progress line on stderr, redrawn at most every PROGRESS_INTERVAL seconds."""
+
+    def __init__(self, total: int, enabled: bool, stream: TextIO = sys.stderr):
+        self.total = total
+        self.enabled = enabled
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.drawn = 0.0
+        self.done = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def advance(self, record: Dict[str, Any], size: int) -> None:
+        self.done += 1
+        self.bytes += size
+        if "error" in record:
+            self.errors += 1
+        now = time.perf_counter()
+        if self.enabled and (now - self.drawn >= PROGRESS_INTERVAL or self.done == self.total):
+            self.drawn = now
+            self.draw(now - self.started)
+
+    def draw(self, elapsed: float) -> None:
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        percent = 100 * self.done / self.total if self.total else 100.0
+        self.stream.write(
+            f"\r{self.done}/{self.total} files ({percent:.0f}%)  {rate:.0f} files/s  "
+            f"{self.bytes / 1e6:.1f} MB  {self.errors} errors  ETA {eta:.0f}s  "
+        )
+        self.stream.flush()
+
+    def finish(self) -> str:
+        if self.enabled:
+            self.stream.write("\n")
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"Analyzed {self.done} files ({self.bytes / 1e6:.1f} MB) in {elapsed:.1f}s, "
+            f"{self.done / elapsed if elapsed else 0.0:.0f} files/s, {self.errors} errors"
+        )
+
+
+def collect_sources(root: Path, ignore: List[str], max_file_bytes: int
+                    ) -> Tuple[List[Tuple[str, Path]], Dict[str, int], List[Dict[str, Any]]]:
+    """The files to analyze with their sizes, and error records for those too large to."""
+    sources = []
+    sizes = {}
+    skipped = []
+    for name, path in iter_tree_sources(root, ignore):
+        try:
+            size = path.stat().st_size
+        except OSError as e:
+            skipped.append({"file": name, "error": str(e)})
+            continue
+        if max_file_bytes and size > max_file_bytes:
+            skipped.append({"file": name, "error": f"File too large: {size} bytes"})
+            continue
+        sources.append((name, path))
+        sizes[name] = size
+    return sources, sizes, skipped
+
+
+def write_jsonl(record: Dict[str, Any], output: TextIO) -> None:
+    output.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+    output.write("\n")
+
+
+def create_analyzer(args: argparse.Namespace) -> ParallelAnalyzer:
+    parser = CodeParser(args.library, build_if_missing=settings.TREE_SITTER_BUILD_IF_MISSING)
+    analysis_cache = None
+    if args.cache_dir:
+        analysis_cache = AnalysisCache(
+            args.cache_dir, settings.ANALYSIS_CACHE_MAX_BYTES, parser.grammar_version)
+    return ParallelAnalyzer(
+        parser,
+        workers=args.workers,
+        min_files=settings.PARALLEL_MIN_FILES,
+        analysis_cache=analysis_cache
+    )
+
+
+def update_index(args: argparse.Namespace, ignore: List[str], output: TextIO) -> int:
+    """
+    Bring a repository index up to date. JSONL output holds the records
+    that changed, with a {"file", "deleted": true} line per deleted file;
+    the json format is the whole analysis, as without an index.
+    """
+    analyzer = create_analyzer(args)
+    try:
+        index = RepositoryIndex(args.index, args.path, analyzer, ignore, args.max_file_bytes)
+        stats = index.update(args.detect, args.since, args.until)
+    finally:
+        analyzer.shutdown()
+
+    if args.format == "json":
+        for chunk in index.results().iter_json():
+            output.write(chunk)
+        output.write("\n")
+    else:
+        for file in stats["affected"]:
+            record = index.record(file)
+            if record is not None:
+                write_jsonl(record, output)
+        for file in stats["deleted"]:
+            write_jsonl({"file": file, "deleted": True}, output)
+    output.flush()
+
+    print(
+        f"Index of {stats['files']} files updated by {stats['mode']} in {stats['seconds']:.1f}s: "
+        f"{stats['analyzed']} analyzed ({stats['added']} new), {len(stats['deleted'])} deleted, "
+        f"calls resolved again in {len(stats['affected'])}",
+        file=sys.stderr
+    )
+    return 0
+
+
+def analyze_tree(args: argparse.Namespace, output: TextIO) -> int:
+    root = args.path.resolve()
+    ignore = ([] if args.no_default_ignores else list(DEFAULT_IGNORES)) + args.ignore
+    if args.index:
+        return update_index(args, ignore, output)
+    sources, sizes, skipped = collect_sources(root, ignore, args.max_file_bytes)
+    analyzer = create_analyzer(args)
+
+    # Only the compact result file keeps records; JSONL writes each and drops it
+    results: Optional[AnalysisResults] = None
+    if args.format == "json":
+        results = AnalysisResults(
+            [record["file"] for record in skipped] + [name for name, _ in sources])
+
+    progress = Progress(len(sources) + len(skipped), args.progress)
+    try:
+        for record in skipped:
+            if results is not None:
+                results.add(record)
+            else:
+                write_jsonl(record, output)
+            progress.advance(record, 0)
+
+        for record in analyzer.analyze(sources, chunk_size=CHUNK_SIZE):
+            if results is not None:
+                results.add(record)
+            else:
+                write_jsonl(record, output)
+            progress.advance(record, sizes.get(record["file"], 0))
+
+        if results is not None:
+            # Calls are resolved across files once everything is in
+            for chunk in results.iter_json():
+                output.write(chunk)
+            output.write("\n")
+        output.flush()
+    finally:
+        analyzer.shutdown()
+
+    print(progress.finish(), file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Analyze every Python file under a directory without the web server."
+    )
+    parser.add_argument("path", type=Path, help="directory to analyze")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="write results here instead of standard output")
+    parser.add_argument("--format", choices=("jsonl", "json"), default="jsonl",
+                        help="jsonl: one record per file as it is done; json: one result "
+                             "in the /api/analyze layout, with calls resolved across files")
+    parser.add_argument("--ignore", action="append", default=[], metavar="GLOB",
+                        help="skip files and directories matching this glob (repeatable)")
+    parser.add_argument("--no-default-ignores", action="store_true",
+                        help=f"also walk {', '.join(DEFAULT_IGNORES)}")
+    parser.add_argument("--max-file-bytes", type=int, default=10 * 1024 * 1024,
+                        help="report larger files as errors instead of parsing them (0 = no limit)")
+    parser.add_argument("--workers", type=int, default=settings.ANALYSIS_WORKERS,
+                        help="worker processes (0 = one per CPU)")
+    parser.add_argument("--cache-dir", type=Path,
+                        help="reuse per-file results stored here by earlier runs")
+    parser.add_argument("--library", default=settings.TREE_SITTER_LIBRARY,
+                        help="prebuilt tree-sitter grammar library")
+    parser.add_argument("--index", type=Path,
+                        help="keep a per-file analysis of the tree here and re-analyze only "
+                             "files changed since the last run")
+    parser.add_argument("--detect", choices=(AUTO, GIT, SCAN), default=AUTO,
+                        help="with --index, find changed files with git diff, by comparing "
+                             "sizes and modification times, or with git where possible")
+    parser.add_argument("--since", metavar="REV",
+                        help="with --index, diff from this revision instead of the last indexed one")
+    parser.add_argument("--until", metavar="REV",
+                        help="with --index, diff up to this revision, which must be checked out")
+    parser.add_argument("--progress", action=argparse.BooleanOptionalAction, default=sys.stderr.isatty(),
+                        help="show progress on standard error (default: when it is a terminal)")
+    args = parser.parse_args(argv)
+
+    if not args.path.is_dir():
+        parser.error(f"{args.path} is not a directory")
+    if not args.index and (args.since or args.until):
+        parser.error("--since and --until need --index")
+    if args.detect == SCAN and (args.since or args.until):
+        parser.error("--since and --until need git to find changes")
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+    try:
+        if args.output:
+            with open(args.output, "w", encoding="utf8") as output:
+                return analyze_tree(args, output)
+        return analyze_tree(args, sys.stdout)
+    except GitError as e:
+        print(f"git: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # The reader, e.g. head, stopped early
+        return 0
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,74 @@
-import os
-from tree_sitter import Language, Parser
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
+    # Needed for questions to the model; the CLI and analysis endpoints run without it
+    OPENAI_API_KEY: Optional[str] = None
+    # Alternative chat-completions endpoint, e.g. a proxy or a local stub server
+    OPENAI_BASE_URL: Optional[str] = None
     DEBUG: bool = False
+    # Log level, and one JSON object per line instead of text
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    # Prebuilt Python grammar; it is cloned and compiled only when missing
+    # and TREE_SITTER_BUILD_IF_MISSING is set
+    TREE_SITTER_LIBRARY: str = "build/my-languages.so"
+    TREE_SITTER_BUILD_IF_MISSING: bool = True
+    # Parsers shared across request threads (0 = one per CPU), dropped
+    # after this long unused; a parse timeout needs binding support
+    PARSER_POOL_SIZE: int = 0
+    PARSER_IDLE_SECONDS: float = 300.0
+    PARSER_TIMEOUT_MICROS: int = 0
+    # Persistent per-file analysis cache under output/cache
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Worker processes for multi-file analysis (0 = one per CPU)
+    ANALYSIS_WORKERS: int = 0
+    # Uploads with fewer files than this are analyzed in-process
+    PARALLEL_MIN_FILES: int = 64
+    # Limits for each uploaded zip/tar archive
+    ARCHIVE_MAX_MEMBERS: int = 20000
+    ARCHIVE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Background analysis jobs
+    JOB_WORKERS: int = 2
+    JOB_QUEUE_SIZE: int = 8
+    JOB_TIMEOUT_SECONDS: float = 600.0
+    JOB_RETENTION: int = 100
+    # Incremental edit sessions
+    SESSION_MAX_COUNT: int = 32
+    SESSION_TTL_SECONDS: float = 1800.0
+    # Analyses kept for follow-up requests by analysis_id; past the memory
+    # budget the least recently used are written under output/analyses
+    ANALYSIS_STORE_MAX_BYTES: int = 512 * 1024 * 1024
+    ANALYSIS_STORE_TTL_SECONDS: float = 3600.0
+    ANALYSIS_STORE_SPILL: bool = True
+    # Upper bounds for call-graph queries; requests may ask for less
+    CALLGRAPH_MAX_DEPTH: int = 20
+    CALLGRAPH_MAX_RESULTS: int = 10000
+    # Size budget of generated diagrams; larger graphs collapse to modules
+    DIAGRAM_MAX_NODES: int = 150
+    DIAGRAM_MAX_EDGES: int = 300
+    # Generated diagrams kept in memory, and as files under output/diagrams
+    DIAGRAM_CACHE_SIZE: int = 128
+    DIAGRAM_CACHE_MAX_FILES: int = 1000
+    # Estimated tokens of analysis context sent with each question
+    LLM_CONTEXT_TOKEN_BUDGET: int = 6000
+    # Answers reused for identical questions, in memory and under output/questions
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_SIZE: int = 256
+    LLM_CACHE_MAX_FILES: int = 5000
+    LLM_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    # Model calls from request handlers: pooled connections, calls in
+    # flight at once, and retries with jittered exponential backoff
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 0.5
 
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
-
-# src/analyzer/tree_parser.py
-
-
-class CodeParser:
-    def __init__(self):
-        # Build tree-sitter library
-        Language.build_library(
-            'build/my-languages.so',
-            ['tree-sitter-python']
-        )
-        self.PY_LANGUAGE = Language('build/my-languages.so', 'python')
-        self.parser = Parser()
-        self.parser.set_language(self.PY_LANGUAGE)
-
-    def parse_file(self, file_path: str):
-        with open(file_path, 'rb') as f:
-            tree = self.parser.parse(f.read())
-            return tree
-
-    def get_functions(self, tree):
-        functions = []
-        cursor = tree.walk()
-
-        def walk_tree():
-            if cursor.node.type == 'function_definition':
-                functions.append({
-                    'name': cursor.node.child_by_field_name('name').text.decode('utf8'),
-                    'start_point': cursor.node.start_point,
-                    'end_point': cursor.node.end_point
-                })
-
-            if cursor.goto_first_child():
-                walk_tree()
-                while cursor.goto_next_sibling():
-                    walk_tree()
-                cursor.goto_parent()
-
-        walk_tree()
-        return functions
@@ -0,0 +1,264 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import re
+
+from analyzer.symbol_index import DOTTED_NAME, module_name
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Callees listed per function entry
+MAX_CALLS_PER_FUNCTION = 8
+
+# Dropped entries named in the report
+MAX_DROPPED_LISTED = 20
+
+# Share of the budget the file list may take before it is shortened
+FILE_LIST_SHARE = 0.1
+
+IDENTIFIER = re.compile(r"\w+")
+SUBWORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+STOPWORDS = frozenset("""
+    a an and are as at be by can could do does for from has have how i if in
+    is it its me my of on or should that the their them there these this to
+    was we what when where which who why will with would you your
+""".split())
+
+SECTIONS = ("functions", "classes", "imports")
+SECTION_TITLES = {
+    "functions": "Functions (file:name@lines [calls]):",
+    "classes": "Classes (file:name@lines [methods] (bases)):",
+    "imports": "Imports (file@line:import):"
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for code and English)."""
+    return len(text) // 4 + 1
+
+
+def _stem(term: str) -> str:
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def terms(text: str) -> List[str]:
+    """Search terms of a text: whole identifiers plus their snake_case and camelCase parts."""
+    found = []
+    for identifier in IDENTIFIER.findall(text):
+        found.append(_stem(identifier.lower()))
+        parts = SUBWORD.findall(identifier)
+        if len(parts) > 1:
+            found.extend(_stem(part.lower()) for part in parts)
+    return found
+
+
+class Entry:
+    """One line of prompt context and the text it is retrieved by."""
+
+    __slots__ = ("section", "line", "label", "tokens", "prior", "order")
+
+    def __init__(self, section: str, line: str, label: str, prior: float, order: int):
+        self.section = section
+        self.line = line
+        self.label = label
+        self.tokens = estimate_tokens(line) + 1
+        self.prior = prior
+        self.order = order
+
+
+class BM25Index:
+    """Okapi BM25 over a list of documents, scored through postings lists."""
+
+    def __init__(self, documents: List[List[str]]):
+        self.lengths = [len(document) for document in documents]
+        self.average_length = (sum(self.lengths) / len(documents)) if documents else 0.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for position, document in enumerate(documents):
+            for term, frequency in Counter(document).items():
+                self.postings.setdefault(term, []).append((position, frequency))
+        self.count = len(documents)
+
+    def scores(self, query: List[str]) -> Dict[int, float]:
+        """Score of every document sharing at least one term with the query."""
+        scores: Dict[int, float] = {}
+        for term in set(query):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self.count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = K1 * (1 - B + B * self.lengths[position] / (self.average_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        return scores
+
+
+class ContextIndex:
+    """
+    The entries of one analysis and their BM25 index. Building it is most
+    of the work of answering a question, so it can be kept and reused for
+    further questions about the same analysis.
+
+    Every function (with its call neighbourhood), class and import
+    becomes an entry.
+    """
+
+    def __init__(self, analysis: Dict[str, Any]):
+        self.files = list(analysis.get("files", []))
+        self.counts = {section: len(analysis.get(section, [])) for section in SECTIONS}
+        self.entries, documents = self._entries(analysis)
+        self.bm25 = BM25Index(documents)
+
+    @staticmethod
+    def _entries(analysis: Dict[str, Any]) -> Tuple[List[Entry], List[List[str]]]:
+        relationships = analysis.get("relationships", {})
+
+        # Call neighbourhoods: what each function calls and who calls it
+        calls: Dict[Tuple[str, str], List[str]] = {}
+        for call in relationships.get("function_calls", []):
+            caller = (call.get("file", ""), call.get("caller_qualified") or call.get("caller", ""))
+            callee = call.get("callee", "")
+            callees = calls.setdefault(caller, [])
+            # Calls on expressions like f(x).g() say little about what is called
+            if DOTTED_NAME.fullmatch(callee) and callee not in callees:
+                callees.append(callee)
+        called_by: Counter = Counter()
+        callers_of: Dict[str, List[str]] = {}
+        for call in relationships.get("resolved_calls", []):
+            called_by[call["callee"]] += 1
+            callers_of.setdefault(call["callee"], []).append(call["caller"].rpartition(".")[2])
+        bases: Dict[Tuple[str, str], List[str]] = {}
+        for inheritance in relationships.get("class_inheritance", []):
+            bases.setdefault((inheritance.get("file", ""), inheritance.get("class", "")), []).append(
+                inheritance.get("inherits_from", ""))
+
+        entries: List[Entry] = []
+        documents: List[List[str]] = []
+
+        def add(section: str, line: str, label: str, searchable: str, prior: float) -> None:
+            entries.append(Entry(section, line, label, prior, len(entries)))
+            documents.append(terms(searchable))
+
+        for f in analysis.get("functions", []):
+            path = f.get("file", "")
+            name = f.get("qualified_name") or f.get("name", "")
+            full_name = f"{module_name(path)}.{name}".lstrip(".")
+            callees = calls.get((path, name), [])
+            line = (f"{path.split('/')[-1]}:{name}@L{f.get('start_line', 0)}-{f.get('end_line', 0)}"
+                    + (f" [{','.join(callees[:MAX_CALLS_PER_FUNCTION])}]" if callees else ""))
+            searchable = " ".join([path, name] + callees + callers_of.get(full_name, []))
+            add("functions", line, f"function {full_name}", searchable,
+                math.log1p(called_by[full_name] + len(callees)))
+
+        for c in analysis.get("classes", []):
+            path = c.get("file", "")
+            name = c.get("qualified_name") or c.get("name", "")
+            methods = c.get("methods", [])
+            class_bases = bases.get((path, c.get("name", "")), [])
+            line = (f"{path.split('/')[-1]}:{name}@L{c.get('start_line', 0)}-{c.get('end_line', 0)}"
+                    f" [{','.join(methods)}]" + (f" ({','.join(class_bases)})" if class_bases else ""))
+            searchable = " ".join([path, name] + methods + class_bases)
+            add("classes", line, "class " + f"{module_name(path)}.{name}".lstrip("."), searchable,
+                math.log1p(len(methods)) + 1)
+
+        for imp in analysis.get("imports", []):
+            path = imp.get("file", "")
+            text = imp.get("text", "")
+            line = f"{path.split('/')[-1]}@L{imp.get('line', 0)}:{text}"
+            add("imports", line, f"import in {path}: {text}", f"{path} {text}", 0.0)
+
+        return entries, documents
+
+
+class ContextBuilder:
+    """
+    Packs the parts of an analysis most relevant to a question into a
+    token budget.
+
+    Entries are ranked with BM25 against the question, ties and unmatched
+    entries falling back to how connected a symbol is, and are added best
+    first until the budget is spent. Whatever did not fit is reported back
+    to the caller.
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+
+    def _header(self, index: ContextIndex) -> Tuple[str, int]:
+        files = index.files
+        listed = []
+        spent = 0
+        for file in files:
+            spent += estimate_tokens(file) + 1
+            if spent > self.token_budget * FILE_LIST_SHARE:
+                break
+            listed.append(file)
+        file_list = ", ".join(listed)
+        if len(listed) < len(files):
+            file_list += f" ... and {len(files) - len(listed)} more"
+
+        header = (
+            f"Analyzed Files: {file_list}\n\n"
+            f"Stats: {index.counts['functions']} functions, "
+            f"{index.counts['classes']} classes, "
+            f"{index.counts['imports']} imports"
+        )
+        return header, len(files) - len(listed)
+
+    def build(self, question: str, analysis: Optional[Dict[str, Any]] = None,
+              index: Optional[ContextIndex] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return the prompt context for a question and a report of what it
+        includes. Pass a prebuilt index instead of the analysis to reuse it.
+        """
+        if index is None:
+            index = ContextIndex(analysis)
+        header, files_dropped = self._header(index)
+        scores = index.bm25.scores(
+            [term for term in terms(question) if term not in STOPWORDS])
+
+        ranked = sorted(
+            index.entries,
+            key=lambda entry: (-scores.get(entry.order, 0.0), -entry.prior, entry.order)
+        )
+
+        remaining = self.token_budget - estimate_tokens(header)
+        remaining -= sum(estimate_tokens(title) + 2 for title in SECTION_TITLES.values())
+        included: List[Entry] = []
+        dropped: List[Entry] = []
+        for entry in ranked:
+            if entry.tokens <= remaining:
+                included.append(entry)
+                remaining -= entry.tokens
+            else:
+                dropped.append(entry)
+
+        # Keep the original order within each section so the prompt reads naturally
+        included.sort(key=lambda entry: entry.order)
+        parts = [header]
+        for section in SECTIONS:
+            lines = [entry.line for entry in included if entry.section == section]
+            if lines:
+                parts.append(SECTION_TITLES[section] + "\n" + "\n".join(lines))
+        if dropped:
+            omitted = Counter(entry.section for entry in dropped)
+            parts.append("Omitted as less relevant: " + ", ".join(
+                f"{count} {section}" for section, count in sorted(omitted.items())))
+        context = "\n\n".join(parts)
+
+        report = {
+            "token_budget": self.token_budget,
+            "estimated_tokens": estimate_tokens(context),
+            "matched": len(scores),
+            "included": dict(Counter(entry.section for entry in included)),
+            "dropped": dict(Counter(entry.section for entry in dropped)),
+            "dropped_files_from_list": files_dropped,
+            # Most relevant entries that did not fit, best first
+            "dropped_examples": [
+                entry.label for entry in dropped[:MAX_DROPPED_LISTED]
+            ]
+        }
+        return context, report
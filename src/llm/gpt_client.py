@@ -1,23 +1,91 @@
-from pathlib import Path
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from openai import OpenAI
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import random
+import time
+import httpx
+from openai import AsyncOpenAI, OpenAI, APIConnectionError, APIStatusError, RateLimitError, InternalServerError
 from config import settings
+from llm.response_cache import ResponseCache
+from telemetry.metrics import REGISTRY
 
+MODEL = "gpt-4"
 
-class GPTClient:
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Deterministic sampling, so identical requests may share one answer
+PARAMS = {"temperature": 0, "seed": 0}
 
-    def ask_question(self, question: str, context: str) -> str:
-        try:
-            system_prompt = """You are an expert code analysis assistant. You analyze Python code and provide detailed, 
+# Failures worth another attempt; APITimeoutError is an APIConnectionError
+RETRYABLE = (APIConnectionError, RateLimitError, InternalServerError)
+
+# Longest wait between two attempts
+MAX_BACKOFF_SECONDS = 20.0
+
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "code_analysis_llm_call_seconds",
+    "Duration of each request to the model API, by kind of call",
+    ("mode",)
+)
+LLM_ERRORS = REGISTRY.counter(
+    "code_analysis_llm_errors_total",
+    "Failed requests to the model API, including those retried",
+    ("mode",)
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "code_analysis_llm_first_token_seconds",
+    "Time from starting a streamed answer to its first text"
+)
+
+SYSTEM_PROMPT = """You are an expert code analysis assistant. You analyze Python code and provide detailed, 
             accurate answers about code structure, relationships, and patterns. When referencing specific parts of the code, 
             use precise references including file names and line numbers. Focus on providing practical, technically accurate 
             insights based on the code analysis provided."""
 
-            user_prompt = f"""
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, or longer if the server asked for it."""
+    delay = random.uniform(0, min(MAX_BACKOFF_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    if isinstance(error, APIStatusError):
+        try:
+            delay = max(delay, min(float(error.response.headers.get("retry-after", 0)), MAX_BACKOFF_SECONDS))
+        except ValueError:
+            pass
+    return delay
+
+
+class GPTClient:
+    """
+    Answers questions about an analysis with the chat-completions API.
+
+    ask_question is synchronous. ask_question_async is meant for request
+    handlers: its calls share one pooled HTTP client, at most
+    LLM_MAX_CONCURRENCY of them are sent at once, failed attempts are
+    retried with jittered backoff, and identical questions asked while one
+    is already in flight wait for that call instead of making their own.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.LLM_TIMEOUT_SECONDS
+        )
+        self.cache = cache
+        # Created on first use, inside the event loop that serves requests
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, "asyncio.Future[str]"] = {}
+
+        self.upstream_calls = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.streams = 0
+        self.cancelled_streams = 0
+        # Streams that produced any text; only those have a first token
+        self.first_tokens = 0
+        self.time_to_first_token = 0.0
+        self.stream_latency = 0.0
+
+    def _messages(self, question: str, context: str) -> List[Dict[str, str]]:
+        user_prompt = f"""
             Analysis of Python codebase:
 
             The following is a detailed analysis of the Python code:
@@ -32,29 +100,196 @@ class GPTClient:
             - Be specific about imports and dependencies
             - Reference concrete examples from the code
             """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
 
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0,
-                seed=0
-            )
-            return response.choices[0].message.content
+    def _cached(self, key: str) -> Optional[str]:
+        return self.cache.get(key) if self.cache is not None else None
+
+    def _store(self, key: str, answer: Optional[str]) -> None:
+        if self.cache is not None and answer is not None:
+            self.cache.put(key, answer)
+
+    # The cache reads and writes files, so coroutines use it from a thread
+    async def _cached_async(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._cached, key) if self.cache is not None else None
+
+    async def _store_async(self, key: str, answer: Optional[str]) -> None:
+        if self.cache is not None and answer is not None:
+            await asyncio.to_thread(self._store, key, answer)
+
+    def ask_question(self, question: str, context: str) -> str:
+        try:
+            messages = self._messages(question, context)
+            key = ResponseCache.key(MODEL, messages, PARAMS)
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+            self.upstream_calls += 1
+            try:
+                with LLM_CALL_SECONDS.time(mode="sync"):
+                    response = self.client.chat.completions.create(
+                        model=MODEL,
+                        messages=messages,
+                        **PARAMS
+                    )
+            except Exception:
+                LLM_ERRORS.inc(mode="sync")
+                raise
+            answer = response.choices[0].message.content
+            self._store(key, answer)
+            return answer
         except Exception as e:
             return f"Error: {str(e)}"
 
+    def _async(self) -> AsyncOpenAI:
+        if self._async_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                ),
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            )
+            self._async_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                # Retries are done here, outside the concurrency limit
+                max_retries=0,
+                http_client=http_client
+            )
+            self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._async_client
+
+    async def _complete(self, key: str, messages: List[Dict[str, str]]) -> str:
+        client = self._async()
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    self.upstream_calls += 1
+                    try:
+                        with LLM_CALL_SECONDS.time(mode="async"):
+                            response = await client.chat.completions.create(
+                                model=MODEL,
+                                messages=messages,
+                                **PARAMS
+                            )
+                    except Exception:
+                        LLM_ERRORS.inc(mode="async")
+                        raise
+                break
+            except RETRYABLE as e:
+                if attempt == settings.LLM_MAX_RETRIES:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, e))
+
+        answer = response.choices[0].message.content
+        await self._store_async(key, answer)
+        return answer
+
+    async def ask_question_async(self, question: str, context: str) -> str:
+        try:
+            messages = self._messages(question, context)
+            key = ResponseCache.key(MODEL, messages, PARAMS)
+            cached = await self._cached_async(key)
+            if cached is not None:
+                return cached
+
+            task = self._in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._complete(key, messages))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            else:
+                self.coalesced += 1
+            # A waiter that goes away must not cancel the call others share
+            return await asyncio.shield(task)
+        except Exception as e:
+            return f"Error: {str(e)}"
 
-# src/web/app.py
+    async def stream_question(self, question: str, context: str) -> AsyncIterator[str]:
+        """
+        Yield the answer in pieces as the model produces them; a cached
+        answer comes as one piece. Closing the iterator early, for example
+        when the client disconnects, closes the upstream response too.
+        Errors are raised rather than returned as text.
+        """
+        messages = self._messages(question, context)
+        key = ResponseCache.key(MODEL, messages, PARAMS)
+        cached = await self._cached_async(key)
+        if cached is not None:
+            yield cached
+            return
 
-app = FastAPI()
+        client = self._async()
+        started = time.perf_counter()
+        first_token: Optional[float] = None
+        parts: List[str] = []
+        self.streams += 1
+        try:
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                try:
+                    async with self._semaphore:
+                        self.upstream_calls += 1
+                        stream = await client.chat.completions.create(
+                            model=MODEL,
+                            messages=messages,
+                            stream=True,
+                            **PARAMS
+                        )
+                        try:
+                            async for chunk in stream:
+                                text = chunk.choices[0].delta.content if chunk.choices else None
+                                if not text:
+                                    continue
+                                if first_token is None:
+                                    first_token = time.perf_counter() - started
+                                    self.first_tokens += 1
+                                    self.time_to_first_token += first_token
+                                    LLM_FIRST_TOKEN_SECONDS.observe(first_token)
+                                parts.append(text)
+                                yield text
+                        finally:
+                            await stream.response.aclose()
+                    break
+                except RETRYABLE as e:
+                    LLM_ERRORS.inc(mode="stream")
+                    # Once text has been sent, a retry would repeat it
+                    if parts or attempt == settings.LLM_MAX_RETRIES:
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(backoff_delay(attempt, e))
+                except Exception:
+                    LLM_ERRORS.inc(mode="stream")
+                    raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled_streams += 1
+            raise
+        finally:
+            self.stream_latency += time.perf_counter() - started
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started, mode="stream")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="src/web/static"), name="static")
+        await self._store_async(key, "".join(parts))
 
-# Templates
-templates = Jinja2Templates(directory="src/web/templates")
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
 
-# Routes will be added here
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "streams": self.streams,
+            "cancelled_streams": self.cancelled_streams,
+            "mean_time_to_first_token": self.time_to_first_token / self.first_tokens if self.first_tokens else 0.0,
+            "mean_stream_latency": self.stream_latency / self.streams if self.streams else 0.0
+        }
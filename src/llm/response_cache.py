@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from storage import LOW_WATER_MARK, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever stored entries change shape, so old answers are not reused
+CACHE_VERSION = "1"
+
+
+class ResponseCache:
+    """
+    Model answers keyed by a hash of the model, the messages and the
+    sampling parameters.
+
+    Only deterministic requests (temperature 0 with a fixed seed) should
+    be cached. Recent answers are kept in an in-memory LRU of max_entries,
+    and every answer is written to the directory, capped at max_files.
+    Entries older than ttl_seconds are treated as misses and removed.
+    """
+
+    def __init__(self, directory: Path, max_entries: int, max_files: int,
+                 ttl_seconds: float):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.ttl_seconds = ttl_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # key -> (time stored, answer)
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.writes = 0
+        self.evictions = 0
+        self._file_count: Optional[int] = None
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        canonical = json.dumps(
+            {"version": CACHE_VERSION, "model": model, "messages": messages, "params": params},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode('utf8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl_seconds
+
+    def _remember(self, key: str, stored_at: float, answer: str) -> None:
+        self.entries[key] = (stored_at, answer)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _expire(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+            self.expired += 1
+            self.misses += 1
+        try:
+            self._entry_path(key).unlink()
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached answer for a key, from memory or else from disk."""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None:
+            stored_at, answer = entry
+            if not self._fresh(stored_at):
+                self._expire(key)
+                return None
+            with self.lock:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+            return answer
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                stored = json.load(f)
+            stored_at, answer = stored["stored_at"], stored["answer"]
+        except (OSError, ValueError, KeyError, TypeError):
+            with self.lock:
+                self.misses += 1
+            return None
+        if not self._fresh(stored_at):
+            self._expire(key)
+            return None
+
+        with self.lock:
+            self.disk_hits += 1
+            self._remember(key, stored_at, answer)
+        return answer
+
+    def put(self, key: str, answer: str) -> None:
+        """Store an answer in memory and on disk."""
+        stored_at = time.time()
+        with self.lock:
+            self._remember(key, stored_at, answer)
+
+        path = self._entry_path(key)
+        try:
+            write_atomic(path, json.dumps(
+                {"stored_at": stored_at, "answer": answer}, ensure_ascii=False
+            ).encode('utf8'))
+        except OSError as e:
+            logger.warning("Error writing response cache entry %s: %s", path, e)
+            return
+
+        with self.lock:
+            self.writes += 1
+            if self._file_count is None:
+                self._file_count = len(list(self.directory.glob("*.json")))
+            else:
+                self._file_count += 1
+            over_budget = self._file_count > self.max_files
+
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired answer files, then the oldest ones until under budget."""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort()
+
+        # Files are written once, so their mtime is when they were stored
+        cutoff = time.time() - self.ttl_seconds
+        expired = sum(1 for mtime, _ in files if mtime < cutoff)
+        target = int(self.max_files * LOW_WATER_MARK)
+        removed = 0
+        for _, path in files[:max(expired, len(files) - target)]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+
+        with self.lock:
+            self.evictions += removed
+            self._file_count = len(files) - removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "max_files": self.max_files,
+                "ttl_seconds": self.ttl_seconds
+            }
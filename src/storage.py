@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+import os
+import tempfile
+
+# Once a file-backed store is over budget, evict down to this fraction of
+# it so that eviction does not rescan the directory on every write
+LOW_WATER_MARK = 0.9
+
+
+@contextmanager
+def atomic_file(path: Path, mode: str = 'wb') -> Iterator[IO]:
+    """
+    Open a temporary file next to path and move it into place on success.
+
+    Readers see either the old file or the complete new one; on any error
+    the temporary file is removed and path is left untouched.
+    """
+    encoding = None if 'b' in mode else 'utf8'
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    with atomic_file(path) as f:
+        f.write(data)
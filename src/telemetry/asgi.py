@@ -0,0 +1,50 @@
+from typing import Any, Callable, Dict
+import time
+
+from telemetry.metrics import Histogram
+
+# ASGI callables, untyped to avoid depending on a framework
+Scope = Dict[str, Any]
+Receive = Callable[[], Any]
+Send = Callable[[Dict[str, Any]], Any]
+
+
+class RequestMetricsMiddleware:
+    """
+    Time every HTTP request, until its last body chunk is sent, by the
+    endpoint that served it and the response status.
+
+    Written as plain ASGI rather than a BaseHTTPMiddleware so streamed
+    responses pass through unbuffered and still see client disconnects.
+    """
+
+    def __init__(self, app: Callable, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router records the endpoint it matched in the shared scope;
+            # endpoint names keep the label set small, unlike raw paths
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", type(endpoint).__name__) if endpoint else "unmatched"
+            self.histogram.observe(
+                time.perf_counter() - started,
+                handler=handler,
+                method=scope["method"],
+                status=str(status[0])
+            )
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from storage import LOW_WATER_MARK, write_atomic
+from visualization.mermaid_generator import DIAGRAM_VERSION
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class DiagramCache:
+    """
+    Generated diagrams keyed by a hash of their analysis and generator options.
+
+    Recently used diagrams are kept in an in-memory LRU of max_entries;
+    every diagram is also written to the directory, capped at max_files,
+    so it survives restarts. Keys are content addresses: a key always
+    names the same diagram, which makes it usable as an ETag.
+    """
+
+    def __init__(self, directory: Path, max_entries: int, max_files: int):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._file_count: Optional[int] = None
+
+    @staticmethod
+    def key(analysis: Dict[str, Any], options: Dict[str, Any]) -> str:
+        """Content address of the diagram for this analysis and these options."""
+        canonical = json.dumps(
+            {"version": DIAGRAM_VERSION, "options": options, "analysis": analysis},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode('utf8')).hexdigest()
+
+    @staticmethod
+    def is_key(key: str) -> bool:
+        return bool(KEY_PATTERN.fullmatch(key))
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached diagram for a key, from memory or else from disk."""
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a generated diagram in memory and on disk."""
+        with self.lock:
+            self._remember(key, result)
+
+        path = self._entry_path(key)
+        try:
+            write_atomic(path, json.dumps(result, separators=(',', ':')).encode('utf8'))
+            # Plain markup of the latest diagram, served by /api/diagram without a key
+            write_atomic(self.directory / "codebase.mmd", result["diagram"].encode('utf8'))
+        except OSError as e:
+            logger.warning("Error writing diagram cache entry %s: %s", path, e)
+            return
+
+        with self.lock:
+            self.writes += 1
+            if self._file_count is None:
+                self._file_count = len(list(self.directory.glob("*.json")))
+            else:
+                self._file_count += 1
+            over_budget = self._file_count > self.max_files
+
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used diagram files until under budget."""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort()
+
+        target = int(self.max_files * LOW_WATER_MARK)
+        removed = 0
+        for _, path in files[:max(0, len(files) - target)]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+
+        with self.lock:
+            self.evictions += removed
+            self._file_count = len(files) - removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "max_files": self.max_files
+            }
@@ -1,117 +1,204 @@
-from typing import Dict, Any, Set, List
-from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter
+
+from analyzer.symbol_index import SymbolIndex, module_name
+
+# Bump whenever the generated markup changes, so cached diagrams are redrawn
+DIAGRAM_VERSION = "1"
+
+FUNCTION_LEVEL = "function"
+MODULE_LEVEL = "module"
+
+
+def _label(text: str) -> str:
+    # Mermaid labels are double-quoted; quotes inside use its entity syntax
+    return text.replace('"', "#quot;")
+
+
+def _in_module(module: str, scope: Optional[str]) -> bool:
+    return scope is None or module == scope or module.startswith(scope + ".")
+
+
+def _prefix(module: str, depth: int) -> str:
+    return ".".join(module.split(".")[:depth])
 
 
 class MermaidGenerator:
-    def __init__(self):
-        self.nodes = set()
-        self.connections = set()
-        self.file_mapping = {}
-        self.descriptions = {
-            'ask_api': 'Web interface using Gradio\nMakes HTTP requests to API\nendpoints',
-            'ask_url': 'Entry point for URL-based PDF\nprocessing\nHandles URL submissions',
-            'ask_file': 'Entry point for direct file uploads\nHandles file submissions',
-            'download_pdf': 'Downloads PDF from URL using\nurllib',
-            'generate_answer': 'Core function that generates\nanswer using context',
-            'generate_text': 'Generates text using LiteLLM\ncompletion',
-            'load_openai_key': 'Loads OpenAI API key from\nenvironment',
-            'load_recommender': 'Initializes semantic search system',
-            'pdf_to_text': 'Converts PDF to text using\nPyMuPDF',
-            'text_to_chunks': 'Splits text into manageable chunks',
-            'preprocess': 'Cleans and normalizes text',
-            'fit': 'Trains semantic search model\non document chunks',
-            'get_text_embedding': 'Generates embeddings for\ntext using USE model'
+    """
+    Builds a Mermaid flowchart of one analysis.
+
+    Nothing is kept between calls, so a generator may be created per
+    request. Functions are grouped into subgraphs by the module of the
+    file that defines them. When there are more functions than max_nodes,
+    the chart collapses to modules, or to packages, with one edge per pair
+    carrying the number of calls between them. Passing a module drills
+    down into it, showing the modules it calls or is called by as
+    external nodes. At most max_edges edges are drawn, heaviest first.
+    """
+
+    def __init__(self, max_nodes: int = 150, max_edges: int = 300):
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+
+    def _calls(self, analysis_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        relationships = analysis_data.get('relationships', {})
+        resolved = relationships.get('resolved_calls')
+        if resolved is not None:
+            return resolved
+
+        # Older analyses carry only raw calls; resolve them here if possible
+        calls = relationships.get('function_calls', [])
+        if not all('caller_qualified' in call for call in calls):
+            return []
+        index = SymbolIndex()
+        index.add(analysis_data)
+        return list(index.resolve_calls(calls))
+
+    def graph(self, analysis_data: Dict[str, Any]) -> Tuple[Dict[str, str], Counter]:
+        """
+        Module of every function and the number of calls between each pair.
+        It does not depend on the options, so it may be kept and passed to
+        build for further diagrams of the same analysis.
+        """
+        modules: Dict[str, str] = {}
+        for function in analysis_data.get('functions', []):
+            module = module_name(function.get('file', ''))
+            local = function.get('qualified_name') or function.get('name', '')
+            modules[f"{module}.{local}".lstrip('.')] = module
+
+        calls: Counter = Counter()
+        for call in self._calls(analysis_data):
+            if call.get('callee_kind', 'function') != 'function':
+                continue
+            modules.setdefault(call['caller'], module_name(call['file']))
+            modules.setdefault(call['callee'], module_name(call['callee_file']))
+            calls[(call['caller'], call['callee'])] += 1
+        return modules, calls
+
+    def _levels(self, modules: Dict[str, str], scope: Optional[str]) -> List[Optional[int]]:
+        """Candidate levels of detail, finest first: functions, then module prefixes."""
+        depths = [len(module.split('.')) for module in set(modules.values())]
+        if not depths:
+            return [None]
+        floor = len(scope.split('.')) if scope else 0
+        return [None] + list(range(max(depths), max(floor, 1) - 1, -1))
+
+    def build(self, analysis_data: Dict[str, Any], module: Optional[str] = None,
+              graph: Optional[Tuple[Dict[str, str], Counter]] = None) -> Dict[str, Any]:
+        """Build the flowchart and describe the level of detail it was drawn at."""
+        modules, calls = graph if graph is not None else self.graph(analysis_data)
+        scoped = {name: mod for name, mod in modules.items() if _in_module(mod, module)}
+
+        # Finest level whose nodes fit the budget
+        levels = self._levels(scoped, module)
+        for depth in levels:
+            keys = {name: (name if depth is None else _prefix(mod, depth))
+                    for name, mod in scoped.items()}
+            if len(set(keys.values())) <= self.max_nodes:
+                break
+
+        # Aggregate calls between nodes; calls leaving the scope go to a
+        # node for the other side's module
+        edges: Counter = Counter()
+        external: Counter = Counter()
+        for (caller, callee), count in calls.items():
+            source = keys.get(caller)
+            target = keys.get(callee)
+            if source is None and target is None:
+                continue
+            if source is None:
+                source = modules[caller]
+                external[source] += count
+            elif target is None:
+                target = modules[callee]
+                external[target] += count
+            if depth is not None and source == target:
+                continue
+            edges[(source, target)] += count
+
+        # Keep the busiest nodes when even the coarsest level is over budget
+        weight: Counter = Counter()
+        for (source, target), count in edges.items():
+            weight[source] += count
+            weight[target] += count
+        internal = sorted(set(keys.values()), key=lambda key: (-weight[key], key))
+        shown = set(internal[:self.max_nodes])
+        room = self.max_nodes - len(shown)
+        shown_external = [key for key, _ in sorted(
+            external.items(), key=lambda item: (-item[1], item[0]))[:max(room, 0)]]
+        shown.update(shown_external)
+        omitted_nodes = len(internal) + len(external) - len(shown)
+
+        kept = sorted(
+            ((pair, count) for pair, count in edges.items()
+             if pair[0] in shown and pair[1] in shown),
+            key=lambda item: (-item[1], item[0])
+        )
+        omitted_edges = len(edges) - min(len(kept), self.max_edges)
+        kept = kept[:self.max_edges]
+
+        level = FUNCTION_LEVEL if depth is None else MODULE_LEVEL
+        node_modules = {key: scoped[key] if depth is None else key for key in shown
+                        if key not in external}
+        diagram = self._render(level, node_modules, set(shown_external), kept,
+                               Counter(keys.values()), omitted_nodes, omitted_edges)
+        return {
+            "diagram": diagram,
+            "level": level,
+            "module": module,
+            "nodes": len(shown),
+            "edges": len(kept),
+            "omitted_nodes": omitted_nodes,
+            "omitted_edges": omitted_edges
         }
 
-    def process_analysis_data(self, analysis_data):
-        # Track functions by file
-        for func in analysis_data.get('functions', []):
-            if not func['name'].startswith('__'):
-                file = 'api.py' if 'api.py' in func['file'] else 'app.py'
-                self.file_mapping[func['name']] = file
-                self.nodes.add(func['name'])
-
-        # Process function calls
-        function_calls = analysis_data.get(
-            'relationships', {}).get('function_calls', [])
-        for call in function_calls:
-            caller = call.get('caller')
-            callee = call.get('callee')
-
-            if (caller and callee and
-                not caller.startswith('__') and
-                not callee.startswith('_') and
-                    not any(x in callee for x in ['.', 'print', 'str', 'len'])):
-
-                # Add relationship for semantic search internals
-                if caller == 'fit' or callee == 'fit' or \
-                   caller == 'get_text_embedding' or callee == 'get_text_embedding':
-                    self.connections.add((caller, callee))
-                elif callee in self.file_mapping.keys():
-                    self.connections.add((caller, callee))
-
-        # Add explicit app->api relationships
-        if 'ask_api' in self.nodes:
-            self.connections.add(('ask_api', 'ask_url'))
-            self.connections.add(('ask_api', 'ask_file'))
-
-        # Add semantic search relationships
-        self.connections.add(('load_recommender', 'fit'))
-        self.connections.add(('fit', 'get_text_embedding'))
-
-    def generate_mermaid(self):
-        """Generate Mermaid flowchart code with subgraphs and tooltips."""
+    def _render(self, level: str, node_modules: Dict[str, str], external: set,
+                edges: List[Tuple[Tuple[str, str], int]], sizes: Counter,
+                omitted_nodes: int, omitted_edges: int) -> str:
         lines = ["flowchart TD"]
+        ids = {key: f"n{i}" for i, key in enumerate(sorted(node_modules) + sorted(external))}
+
+        if level == FUNCTION_LEVEL:
+            # One subgraph per module, nodes labelled by their name within it
+            by_module: Dict[str, List[str]] = {}
+            for key, module in node_modules.items():
+                by_module.setdefault(module, []).append(key)
+            for i, module in enumerate(sorted(by_module)):
+                lines.append(f'    subgraph m{i}["{_label(module or "(root)")}"]')
+                for key in sorted(by_module[module]):
+                    local = key[len(module):].lstrip('.') if module else key
+                    lines.append(f'        {ids[key]}["{_label(local)}"]:::function')
+                lines.append('    end')
+        else:
+            for key in sorted(node_modules):
+                count = sizes[key]
+                noun = "function" if count == 1 else "functions"
+                lines.append(
+                    f'    {ids[key]}["{_label(key or "(root)")}<br><small>{count} {noun}</small>"]:::module')
+
+        for key in sorted(external):
+            lines.append(f'    {ids[key]}["{_label(key or "(root)")}"]:::external')
+
+        for (source, target), count in edges:
+            # Dashed arrows cross a module boundary or leave the drilled-down module
+            crosses = source in external or target in external or (
+                level == FUNCTION_LEVEL and node_modules[source] != node_modules[target])
+            arrow = "-.->" if crosses else "-->"
+            label = f"|{count}|" if count > 1 else ""
+            lines.append(f"    {ids[source]} {arrow}{label} {ids[target]}")
+
+        if omitted_nodes:
+            lines.append(f"    %% {omitted_nodes} nodes omitted")
+        if omitted_edges:
+            lines.append(f"    %% {omitted_edges} edges omitted")
 
-        # Add app.py subgraph
-        lines.append('    subgraph APP[app.py]')
-        for node in sorted(n for n in self.nodes if self.file_mapping.get(n) == 'app.py'):
-            desc = self.descriptions.get(node, '').replace('\n', '<br>')
-            lines.append(
-                f'        {node}["{node}<br><small>{desc}</small>"]:::interface')
-        lines.append('    end')
-
-        # Add api.py subgraph
-        lines.append('    subgraph API[api.py]')
-        # Entry points
-        for node in sorted(n for n in ['ask_url', 'ask_file'] if n in self.nodes):
-            desc = self.descriptions.get(node, '').replace('\n', '<br>')
-            lines.append(
-                f'        {node}["{node}<br><small>{desc}</small>"]:::entryPoint')
-
-        # Core functions
-        for node in sorted(n for n in ['generate_answer', 'generate_text'] if n in self.nodes):
-            desc = self.descriptions.get(node, '').replace('\n', '<br>')
-            lines.append(
-                f'        {node}["{node}<br><small>{desc}</small>"]:::core')
-
-        # Utility functions including semantic search
-        for node in sorted(n for n in self.nodes if n not in ['ask_api', 'ask_url', 'ask_file', 'generate_answer', 'generate_text']
-                           and self.file_mapping.get(n) == 'api.py'):
-            desc = self.descriptions.get(node, '').replace('\n', '<br>')
-            lines.append(
-                f'        {node}["{node}<br><small>{desc}</small>"]:::utility')
-        lines.append('    end')
-
-        # Add connections
-        for caller, callee in sorted(self.connections):
-            if self.file_mapping.get(caller) != self.file_mapping.get(callee):
-                lines.append(f"    {caller} -.-> {callee}")
-            else:
-                lines.append(f"    {caller} --> {callee}")
-
-        # Add styling
         lines.extend([
-            "    classDef interface fill:#E1BEE7,stroke:#4A148C,stroke-width:2px",
-            "    classDef entryPoint fill:#90CAF9,stroke:#0D47A1,stroke-width:2px",
-            "    classDef core fill:#A5D6A7,stroke:#1B5E20,stroke-width:2px",
-            "    classDef utility fill:#FFF59D,stroke:#F57F17,stroke-width:1px",
-            "    style API fill:#f8f9fa,stroke:#666,stroke-width:2px",
-            "    style APP fill:#f8f9fa,stroke:#666,stroke-width:2px"
+            "    classDef function fill:#FFF59D,stroke:#F57F17,stroke-width:1px",
+            "    classDef module fill:#A5D6A7,stroke:#1B5E20,stroke-width:2px",
+            "    classDef external fill:#f8f9fa,stroke:#666,stroke-dasharray:4 2"
         ])
-
         return "\n".join(lines)
 
-    def create_flowchart(self, analysis_data):
-        self.process_analysis_data(analysis_data)
-        return self.generate_mermaid()
+    def create_flowchart(self, analysis_data: Dict[str, Any],
+                         module: Optional[str] = None) -> str:
+        return self.build(analysis_data, module)["diagram"]
@@ -0,0 +1,303 @@
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from analyzer.call_graph import CallGraph
+from analyzer.results import AnalysisResults
+from llm.context_builder import ContextIndex
+from storage import atomic_file
+from visualization.mermaid_generator import MermaidGenerator
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _deep_size(value: Any) -> int:
+    """
+    Approximate bytes held by an object and everything it references:
+    containers, instance attributes and numpy buffers. Shared objects
+    are counted once.
+    """
+    seen = set()
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        # An array that owns its buffer includes it here
+        size += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            stack.extend(getattr(item, '__dict__', {}).values())
+            for name in getattr(type(item), '__slots__', ()):
+                if hasattr(item, name):
+                    stack.append(getattr(item, name))
+    return size
+
+
+class StoredAnalysis:
+    """
+    An analysis kept for follow-up requests.
+
+    The structures those requests need (call graph, question context
+    index, diagram graph) are derived on first use and kept with it.
+    Their estimated size is added to the analysis's, through on_grow
+    when it is held by a store, so they count toward its memory budget.
+    """
+
+    def __init__(self, analysis_id: str, results: AnalysisResults,
+                 on_grow: Optional[Callable[["StoredAnalysis", int], None]] = None):
+        self.analysis_id = analysis_id
+        self.results = results
+        self.size = results.memory_size()
+        self.on_grow = on_grow
+        self.lock = threading.Lock()
+        self._call_graph: Optional[CallGraph] = None
+        self._context_index: Optional[ContextIndex] = None
+        self._diagram_graph: Optional[Tuple[Dict[str, str], Counter]] = None
+
+    def view(self) -> Dict[str, Any]:
+        return self.results.view()
+
+    def _derive(self, attribute: str, build: Callable[[], Any]) -> Any:
+        with self.lock:
+            value = getattr(self, attribute)
+            if value is not None:
+                return value
+            value = build()
+            setattr(self, attribute, value)
+            added = _deep_size(value)
+        if self.on_grow is not None:
+            self.on_grow(self, added)
+        else:
+            self.size += added
+        return value
+
+    def call_graph(self) -> CallGraph:
+        return self._derive('_call_graph', lambda: CallGraph.from_analysis(self.view()))
+
+    def context_index(self) -> ContextIndex:
+        return self._derive('_context_index', lambda: ContextIndex(self.view()))
+
+    def diagram_graph(self) -> Tuple[Dict[str, str], Counter]:
+        return self._derive('_diagram_graph', lambda: MermaidGenerator().graph(self.view()))
+
+
+class AnalysisStore:
+    """
+    Holds analysis results by id so follow-up requests need not send them.
+
+    Analyses unused for longer than ttl seconds are dropped. Once the
+    analyses in memory take more than max_bytes, the least recently used
+    ones are written to the directory, if one is given, and read back
+    when next asked for; without a directory they are dropped.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, directory: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.analyses: "OrderedDict[str, StoredAnalysis]" = OrderedDict()
+        self.last_used: Dict[str, float] = {}
+        # Evicted analyses while they are being written out
+        self.spilling: Dict[str, StoredAnalysis] = {}
+        self.bytes_used = 0
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spills = 0
+        # Kept up to date as files are written and removed, so stats() need
+        # not list the directory; files left by an earlier run count too
+        self.spilled_files = len(list(self.directory.glob("*.json"))) if self.directory else 0
+
+    def _path(self, analysis_id: str) -> Path:
+        return self.directory / f"{analysis_id}.json"
+
+    def _remove(self, analysis_id: str) -> Optional[StoredAnalysis]:
+        stored = self.analyses.pop(analysis_id, None)
+        self.last_used.pop(analysis_id, None)
+        if stored is not None:
+            self.bytes_used -= stored.size
+        return stored
+
+    def _expire(self) -> None:
+        now = time.time()
+        for analysis_id in [
+            analysis_id for analysis_id, used in self.last_used.items()
+            if now - used > self.ttl
+        ]:
+            self._remove(analysis_id)
+
+    def _unlinked(self) -> None:
+        with self.lock:
+            self.spilled_files -= 1
+
+    def _expire_files(self) -> None:
+        if self.directory is None:
+            return
+        cutoff = time.time() - self.ttl
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    self._unlinked()
+            except OSError:
+                continue
+
+    def _add(self, stored: StoredAnalysis) -> List[StoredAnalysis]:
+        """Keep an analysis in memory; return those evicted to make room."""
+        self.analyses[stored.analysis_id] = stored
+        self.last_used[stored.analysis_id] = time.time()
+        self.bytes_used += stored.size
+        return self._evict()
+
+    def _evict(self) -> List[StoredAnalysis]:
+        """Remove the least recently used analyses until the rest fit the budget."""
+        evicted = []
+        # The newest analysis stays even if it alone is over budget
+        while self.bytes_used > self.max_bytes and len(self.analyses) > 1:
+            oldest = next(iter(self.analyses))
+            evicted.append(self._remove(oldest))
+        if self.directory is not None:
+            for victim in evicted:
+                self.spilling[victim.analysis_id] = victim
+        return evicted
+
+    def _spill(self, evicted: List[StoredAnalysis]) -> None:
+        if self.directory is None:
+            return
+        for stored in evicted:
+            path = self._path(stored.analysis_id)
+            try:
+                # Written once; a reloaded analysis keeps its file
+                if not path.exists():
+                    with atomic_file(path, 'w') as f:
+                        for chunk in stored.results.iter_json():
+                            f.write(chunk)
+                    with self.lock:
+                        self.spilled_files += 1
+                else:
+                    os.utime(path)
+                with self.lock:
+                    self.spills += 1
+            except OSError as e:
+                logger.warning("Error writing analysis %s to %s: %s", stored.analysis_id, path, e)
+            finally:
+                with self.lock:
+                    self.spilling.pop(stored.analysis_id, None)
+
+    def _grow(self, stored: StoredAnalysis, added: int) -> None:
+        """Account for a structure derived from an analysis, evicting others to make room."""
+        with self.lock:
+            stored.size += added
+            if self.analyses.get(stored.analysis_id) is not stored:
+                # Already evicted; it is not counted any more
+                return
+            self.bytes_used += added
+            self.analyses.move_to_end(stored.analysis_id)
+            evicted = self._evict()
+        self._spill(evicted)
+
+    def put(self, results: AnalysisResults) -> StoredAnalysis:
+        """Store resolved results under a new id. Blocking when it spills to disk."""
+        stored = StoredAnalysis(uuid.uuid4().hex, results, self._grow)
+        with self.lock:
+            self._expire()
+            evicted = self._add(stored)
+        self._spill(evicted)
+        self._expire_files()
+        return stored
+
+    def get(self, analysis_id: str) -> Optional[StoredAnalysis]:
+        """The analysis with this id, read back from disk if it was spilled. Blocking."""
+        if not ANALYSIS_ID_PATTERN.fullmatch(analysis_id):
+            return None
+
+        with self.lock:
+            self._expire()
+            stored = self.analyses.get(analysis_id) or self.spilling.get(analysis_id)
+            if stored is not None:
+                if analysis_id in self.analyses:
+                    self.analyses.move_to_end(analysis_id)
+                    self.last_used[analysis_id] = time.time()
+                self.memory_hits += 1
+                return stored
+
+        if self.directory is None:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        path = self._path(analysis_id)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink()
+                self._unlinked()
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf8') as f:
+                results = AnalysisResults.from_dict(json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        stored = StoredAnalysis(analysis_id, results, self._grow)
+        with self.lock:
+            self.disk_hits += 1
+            # Another request may have read it back meanwhile
+            existing = self.analyses.get(analysis_id)
+            if existing is not None:
+                return existing
+            evicted = self._add(stored)
+        self._spill(evicted)
+        return stored
+
+    def delete(self, analysis_id: str) -> bool:
+        if not ANALYSIS_ID_PATTERN.fullmatch(analysis_id):
+            return False
+        with self.lock:
+            found = self._remove(analysis_id) is not None
+        if self.directory is not None:
+            try:
+                self._path(analysis_id).unlink()
+                self._unlinked()
+                found = True
+            except OSError:
+                pass
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "analyses": len(self.analyses),
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "spills": self.spills,
+                "spilled_files": self.spilled_files
+            }
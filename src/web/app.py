@@ -1,19 +1,63 @@
+import time
+
+# Boot is timed from here, so the imports below are included
+BOOT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, UploadFile, File, Request, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
-from typing import List
-import tempfile
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import tarfile
+import zipfile
 import json
+import logging
 import os
 
 from analyzer.tree_parser import CodeParser
-from analyzer.code_analyzer import CodeAnalyzer
-from llm.gpt_client import GPTClient
+from analyzer.analysis_cache import AnalysisCache
+from analyzer.parallel import ParallelAnalyzer
+from analyzer.parser_pool import ParserPool
+from analyzer.results import AnalysisResults, RELATIONSHIP_TYPES, RESOLVED_CALLS
+from analyzer.symbol_index import SymbolIndex
+from analyzer.call_graph import CallGraph
+from analyzer.sources import ArchiveLimitExceeded, is_archive, iter_archive_sources
+from analyzer.incremental import EditSession
+from llm.context_builder import ContextBuilder
+from llm.response_cache import ResponseCache
 from visualization.mermaid_generator import MermaidGenerator
+from visualization.diagram_cache import DiagramCache
+from web.jobs import Job, JobManager, JobQueueFull, JobCancelled, JobTimedOut, COMPLETED
+from web.sessions import SessionStore
+from web.analyses import AnalysisStore, StoredAnalysis
+from web.startup import Lazy, StartupTimer
+from telemetry.asgi import RequestMetricsMiddleware
+from telemetry.logs import configure_logging
+from telemetry.metrics import PHASE_SECONDS, REGISTRY
+from config import settings
+
+startup_timer = StartupTimer(BOOT_STARTED)
+startup_timer.phase("imports")
+
+configure_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "code_analysis_http_request_seconds",
+    "Time to serve each HTTP request, including streamed bodies",
+    ("handler", "method", "status")
+)
+UPLOADED_BYTES = REGISTRY.counter(
+    "code_analysis_uploaded_bytes_total",
+    "Bytes of Python source received in uploads, after expanding archives"
+)
 
 # Initialize FastAPI app
 app = FastAPI(title="Code Analysis Tool")
+app.add_middleware(RequestMetricsMiddleware, histogram=REQUEST_SECONDS)
 
 # Setup paths
 BASE_DIR = Path(__file__).resolve().parent
@@ -31,10 +75,101 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 # Initialize templates
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-# Initialize components
-code_parser = CodeParser()
-gpt_client = GPTClient()
-mermaid_generator = MermaidGenerator()
+# Initialize components. The parser, the analysis worker pool and the
+# model client are created on first use, so the server starts without
+# loading the grammar or importing the OpenAI SDK
+code_parser = Lazy("code_parser", lambda: CodeParser(
+    settings.TREE_SITTER_LIBRARY,
+    build_if_missing=settings.TREE_SITTER_BUILD_IF_MISSING
+), startup_timer)
+response_cache = ResponseCache(
+    OUTPUT_DIR / "questions",
+    settings.LLM_CACHE_SIZE,
+    settings.LLM_CACHE_MAX_FILES,
+    settings.LLM_CACHE_TTL_SECONDS
+) if settings.LLM_CACHE_ENABLED else None
+
+
+def create_gpt_client():
+    # Imported here: the OpenAI SDK is a large share of import time
+    from llm.gpt_client import GPTClient
+    return GPTClient(cache=response_cache)
+
+
+gpt_client = Lazy("gpt_client", create_gpt_client, startup_timer)
+analysis_cache = Lazy("analysis_cache", lambda: AnalysisCache(
+    OUTPUT_DIR / "cache",
+    settings.ANALYSIS_CACHE_MAX_BYTES,
+    code_parser.get().grammar_version
+) if settings.ANALYSIS_CACHE_ENABLED else None, startup_timer)
+diagram_cache = DiagramCache(
+    OUTPUT_DIR / "diagrams",
+    settings.DIAGRAM_CACHE_SIZE,
+    settings.DIAGRAM_CACHE_MAX_FILES
+)
+# Parsers shared by in-process analyses and edit sessions across threads
+parser_pool = Lazy("parser_pool", lambda: ParserPool(
+    code_parser.get(),
+    max_size=settings.PARSER_POOL_SIZE or os.cpu_count() or 1,
+    idle_timeout=settings.PARSER_IDLE_SECONDS,
+    timeout_micros=settings.PARSER_TIMEOUT_MICROS
+), startup_timer)
+parallel_analyzer = Lazy("parallel_analyzer", lambda: ParallelAnalyzer(
+    code_parser.get(),
+    workers=settings.ANALYSIS_WORKERS,
+    min_files=settings.PARALLEL_MIN_FILES,
+    analysis_cache=analysis_cache.get(),
+    pool=parser_pool.get()
+), startup_timer)
+
+job_manager = JobManager(
+    max_workers=settings.JOB_WORKERS,
+    max_pending=settings.JOB_QUEUE_SIZE,
+    timeout=settings.JOB_TIMEOUT_SECONDS,
+    max_finished=settings.JOB_RETENTION
+)
+
+analysis_store = AnalysisStore(
+    max_bytes=settings.ANALYSIS_STORE_MAX_BYTES,
+    ttl=settings.ANALYSIS_STORE_TTL_SECONDS,
+    directory=OUTPUT_DIR / "analyses" if settings.ANALYSIS_STORE_SPILL else None
+)
+
+session_store = SessionStore(
+    lambda: EditSession(parser_pool.get(), code_parser.get().extractor),
+    max_sessions=settings.SESSION_MAX_COUNT,
+    ttl=settings.SESSION_TTL_SECONDS
+)
+
+
+startup_timer.phase("setup")
+
+
+@app.on_event("startup")
+def report_startup():
+    startup_timer.phase("startup")
+    logger.info(startup_timer.summary())
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Stop background jobs and the analysis worker processes with the server."""
+    job_manager.shutdown()
+    if parallel_analyzer.created:
+        parallel_analyzer.get().shutdown()
+
+
+@app.on_event("shutdown")
+async def close_gpt_client():
+    """Close the pooled connections to the model API."""
+    if gpt_client.created:
+        await gpt_client.get().aclose()
+
+
+@app.get("/api/startup")
+async def startup_report():
+    """How long the server took to start, by phase, and the components set up since."""
+    return startup_timer.report()
 
 
 @app.get("/")
@@ -46,190 +181,656 @@ async def index(request: Request):
     )
 
 
+def read_archive_sources(file: UploadFile) -> List[Tuple[str, bytes]]:
+    """Read the Python members of an uploaded archive into memory."""
+    prefix = file.filename.rsplit('/', 1)[-1]
+    try:
+        return [
+            (f"{prefix}/{name}", content)
+            for name, content in iter_archive_sources(
+                file.file,
+                file.filename,
+                max_members=settings.ARCHIVE_MAX_MEMBERS,
+                max_bytes=settings.ARCHIVE_MAX_BYTES
+            )
+        ]
+    except ArchiveLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not read archive {file.filename}: {str(e)}"
+        )
+
+
+async def read_python_uploads(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """
+    Read the Python sources of a multipart upload into memory, expanding
+    zip and tar archives into their Python members.
+    """
+    uploads = []
+    with PHASE_SECONDS.time(phase="upload"):
+        for file in files:
+            if file.filename.endswith('.py'):
+                uploads.append((file.filename, await file.read()))
+            elif is_archive(file.filename):
+                # Decompression is blocking; keep it off the event loop
+                uploads.extend(await run_in_threadpool(read_archive_sources, file))
+    UPLOADED_BYTES.inc(sum(len(content) for _, content in uploads))
+
+    if not uploads:
+        raise HTTPException(
+            status_code=400,
+            detail="No Python files were uploaded"
+        )
+    return uploads
+
+
+def run_analysis(uploads: List[Tuple[str, bytes]],
+                 job: Optional[Job] = None) -> AnalysisResults:
+    """
+    Analyze in-memory sources and assemble the /api/analyze response.
+
+    Blocking; call it from a worker thread, never on the event loop.
+    When a job is given, progress is reported to it after every file.
+    """
+    # Each record carries the file's symbols and its relationships,
+    # so one pass per file covers both phases of the analysis
+    results = AnalysisResults([name for name, _ in uploads])
+    try:
+        for record in parallel_analyzer.get().analyze(uploads):
+            results.add(record)
+            if job is not None:
+                job.advance()
+    except (JobCancelled, JobTimedOut):
+        raise
+    except Exception as e:
+        results.add_error({
+            "component": "analysis",
+            "error": str(e)
+        })
+
+    # Link calls to their definitions once, while still off the event loop
+    with PHASE_SECONDS.time(phase="relationships"):
+        results.resolve()
+    return results
+
+
+def analysis_response(stored: StoredAnalysis) -> StreamingResponse:
+    """Stream an analysis and its id as JSON instead of building the whole body in memory."""
+    return StreamingResponse(
+        stored.results.iter_json({"analysis_id": stored.analysis_id}),
+        media_type="application/json"
+    )
+
+
+async def get_analysis_or_404(analysis_id: Any) -> StoredAnalysis:
+    # May read a spilled analysis back from disk
+    stored = await run_in_threadpool(analysis_store.get, str(analysis_id))
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return stored
+
+
 @app.post("/api/analyze")
 async def analyze_files(files: List[UploadFile] = File(...)):
     try:
-        results = {
-            "files": [],
-            "functions": [],
-            "classes": [],
-            "relationships": {
-                "function_calls": [],
-                "class_inheritance": [],
-                "import_dependencies": []
-            },
-            "imports": [],
-            "errors": []
-        }
+        uploads = await read_python_uploads(files)
+        # Parsing is blocking; keep it off the event loop
+        results = await run_in_threadpool(run_analysis, uploads)
+        # Kept so follow-up requests can refer to it by analysis_id
+        stored = await run_in_threadpool(analysis_store.put, results)
+        return analysis_response(stored)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            file_paths = []
-
-            # Save uploaded files
-            for file in files:
-                if not file.filename.endswith('.py'):
-                    continue
-
-                file_path = Path(temp_dir) / file.filename
-                content = await file.read()
-
-                with open(file_path, "wb") as f:
-                    f.write(content)
-
-                await file.seek(0)
-                file_paths.append(file_path)
-                results["files"].append(file.filename)
-
-            if not file_paths:
-                raise HTTPException(
-                    status_code=400,
-                    detail="No Python files were uploaded"
-                )
-
-            # Initialize analyzer
-            analyzer = CodeAnalyzer(code_parser)
-
-            # Analyze each file
-            for file_path in file_paths:
-                try:
-                    analysis = analyzer.analyze_file(file_path)
-                    if "error" in analysis:
-                        results["errors"].append({
-                            "file": str(file_path),
-                            "error": analysis["error"]
-                        })
-                        continue
-
-                    results["functions"].extend(analysis.get("functions", []))
-                    results["classes"].extend(analysis.get("classes", []))
-                    results["imports"].extend(analysis.get("imports", []))
-
-                    for rel_type, rel_data in analysis.get("relationships", {}).items():
-                        if rel_type in results["relationships"]:
-                            results["relationships"][rel_type].extend(rel_data)
-
-                except Exception as e:
-                    results["errors"].append({
-                        "file": str(file_path),
-                        "error": str(e)
-                    })
-
-            # Analyze relationships between files
-            try:
-                file_relationships = analyzer.analyze_relationships(file_paths)
-                # Merge the inter-file relationships
-                for rel_type, rel_data in file_relationships.items():
-                    if rel_type in results["relationships"]:
-                        results["relationships"][rel_type].extend(rel_data)
-            except Exception as e:
-                results["errors"].append({
-                    "component": "relationships",
-                    "error": str(e)
-                })
 
-            return results
+def format_ndjson_event(event: str, data: Any) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+
+def format_sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_analysis(uploads: List[Tuple[str, bytes]],
+                    format_event: Callable[[str, Any], str]) -> Iterator[str]:
+    """
+    Analyze uploads and yield each file's symbols as soon as it is done.
+
+    Only the relationships and a symbol index are held until the end,
+    where the relationships, including the calls resolved across files,
+    are sent as one merged event, so the full response is never built in
+    memory.
+    """
+    relationships = {rel_type: [] for rel_type in RELATIONSHIP_TYPES}
+    symbol_index = SymbolIndex()
+    error_count = 0
 
+    yield format_event("start", {"files": [name for name, _ in uploads]})
+
+    try:
+        for index, record in enumerate(parallel_analyzer.get().analyze(uploads)):
+            if "error" in record:
+                error_count += 1
+                yield format_event("error", {
+                    "index": index,
+                    "file": record["file"],
+                    "error": record["error"]
+                })
+                continue
+
+            for rel_type in RELATIONSHIP_TYPES:
+                relationships[rel_type].extend(record[rel_type])
+            symbol_index.add(record)
+
+            yield format_event("file", {
+                "index": index,
+                "file": record["file"],
+                "functions": record["functions"],
+                "classes": record["classes"],
+                "imports": record["imports"]
+            })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        error_count += 1
+        yield format_event("error", {"component": "analysis", "error": str(e)})
 
+    with PHASE_SECONDS.time(phase="relationships"):
+        relationships[RESOLVED_CALLS] = list(
+            symbol_index.resolve_calls(relationships["function_calls"]))
+    yield format_event("relationships", relationships)
+    yield format_event("done", {"files": len(uploads), "errors": error_count})
 
-@app.post("/api/ask-gpt")
-async def ask_gpt(request: Request):
+
+@app.post("/api/analyze/stream")
+async def analyze_files_stream(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Streaming variant of /api/analyze. Emits newline-delimited JSON events,
+    or Server-Sent Events when the client accepts text/event-stream.
+    """
+    uploads = await read_python_uploads(files)
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        format_event, media_type = format_sse_event, "text/event-stream"
+    else:
+        format_event, media_type = format_ndjson_event, "application/x-ndjson"
+
+    # A sync generator is iterated on a worker thread by StreamingResponse
+    return StreamingResponse(
+        stream_analysis(uploads, format_event),
+        media_type=media_type
+    )
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_analysis_job(files: List[UploadFile] = File(...)):
+    """Queue an analysis to run in the background and return its job id."""
+    uploads = await read_python_uploads(files)
+
+    try:
+        job = job_manager.submit(
+            len(uploads), lambda job: analysis_store.put(run_analysis(uploads, job)).analysis_id)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many analyses in progress, retry later"
+        )
+
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Report a job's status and how many of its files are done."""
+    return get_job_or_404(job_id).to_dict()
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str):
+    """Return the result of a completed job."""
+    job = get_job_or_404(job_id)
+    if job.status != COMPLETED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job.status}" + (f": {job.error}" if job.error else "")
+        )
+    # The job keeps only the id; the store may have evicted the analysis since
+    stored = await run_in_threadpool(analysis_store.get, job.result)
+    if stored is None:
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    return analysis_response(stored)
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    """Cancel a queued or running job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/api/analyses/stats")
+async def analysis_store_stats():
+    """Memory use and hit counts of the stored analyses."""
+    return await run_in_threadpool(analysis_store.stats)
+
+
+@app.get("/api/analyses/{analysis_id}")
+async def get_stored_analysis(analysis_id: str):
+    """Return a stored analysis again."""
+    return analysis_response(await get_analysis_or_404(analysis_id))
+
+
+@app.delete("/api/analyses/{analysis_id}")
+async def delete_stored_analysis(analysis_id: str):
+    """Forget a stored analysis."""
+    if not await run_in_threadpool(analysis_store.delete, analysis_id):
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return {"analysis_id": analysis_id, "deleted": True}
+
+
+def get_session_or_404(session_id: str) -> EditSession:
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+def session_results(session: EditSession) -> Dict[str, Any]:
+    records = session.records()
+    results = AnalysisResults([record["file"] for record in records])
+    for record in records:
+        results.add(record)
+    return results.to_dict()
+
+
+def open_session(uploads: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    session_id, session = session_store.create()
+    for name, content in uploads:
+        session.add_file(name, content)
+    return {"session_id": session_id, **session_results(session)}
+
+
+@app.post("/api/sessions")
+async def create_session(files: List[UploadFile] = File(...)):
+    """Open an edit session over the uploaded files and return its full analysis."""
+    uploads = await read_python_uploads(files)
+    return await run_in_threadpool(open_session, uploads)
+
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Return the current analysis of every file in a session."""
+    session = get_session_or_404(session_id)
+    return await run_in_threadpool(session_results, session)
+
+
+def validate_edits(data: Any) -> Tuple[str, List[Dict[str, Any]]]:
+    """The file and edits of an edit request, checked before any edit is applied."""
+    if not isinstance(data, dict) or not isinstance(data.get("file"), str):
+        raise HTTPException(status_code=400, detail='Body must be {"file": name, "edits": [...]}')
+    edits = data.get("edits", [])
+    if not isinstance(edits, list):
+        raise HTTPException(status_code=400, detail="edits must be a list")
+    for number, edit in enumerate(edits):
+        if not isinstance(edit, dict):
+            raise HTTPException(status_code=400, detail=f"Edit {number} must be an object")
+        for key in ("start_byte", "end_byte"):
+            # bool is an int, but never a byte offset
+            if not isinstance(edit.get(key), int) or isinstance(edit.get(key), bool):
+                raise HTTPException(status_code=400, detail=f"Edit {number} needs an integer {key}")
+        if not isinstance(edit.get("text"), str):
+            raise HTTPException(status_code=400, detail=f"Edit {number} needs a string text")
+    return data["file"], edits
+
+
+@app.post("/api/sessions/{session_id}/edits")
+async def edit_session(session_id: str, request: Request):
+    """
+    Apply edits to one file of a session and re-analyze only what changed.
+
+    Body: {"file": name, "edits": [{"start_byte", "end_byte", "text"}, ...]}
+    with byte offsets into the file's UTF-8 content.
+    """
+    session = get_session_or_404(session_id)
     try:
         data = await request.json()
-        question = data["question"]
-        context = data["context"]
-
-        # Create a concise summary of the analysis
-        summary = {
-            "files": context["files"],
-            "summary": {
-                "total_functions": len(context["functions"]),
-                "total_classes": len(context["classes"]),
-                "total_imports": len(context["imports"])
-            },
-            "functions": [
-                {
-                    # Just the filename
-                    "file": f.get("file", "").split('/')[-1],
-                    "name": f.get("name", ""),
-                    "lines": f"L{f.get('start_line', 0)}-{f.get('end_line', 0)}"
-                }
-                for f in context["functions"]
-            ],
-            "classes": [
-                {
-                    "file": c.get("file", "").split('/')[-1],
-                    "name": c.get("name", ""),
-                    "lines": f"L{c.get('start_line', 0)}-{c.get('end_line', 0)}",
-                    "methods": c.get("methods", [])
-                }
-                for c in context["classes"]
-            ],
-            "imports": [
-                {
-                    "file": imp.get("file", "").split('/')[-1],
-                    "import": imp.get("text", ""),
-                    "line": imp.get("line", 0)
-                }
-                for imp in context["imports"]
-            ]
-        }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    file, edits = validate_edits(data)
+    # Files are only ever added to a session, so this cannot change under us
+    if file not in session.files:
+        raise HTTPException(status_code=404, detail=f"File not in session: {file}")
+
+    def apply():
+        stats = session.apply_edits(file, edits)
+        return {"stats": stats, **session.file_results(file)}
+
+    try:
+        return await run_in_threadpool(apply)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/api/sessions/{session_id}")
+async def close_session(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "closed": True}
 
-        # Convert to a more token-efficient string format
-        context_str = f"""
-        Analyzed Files: {', '.join(summary['files'])}
 
-        Stats: {summary['summary']['total_functions']} functions, {summary['summary']['total_classes']} classes, {summary['summary']['total_imports']} imports
+@app.get("/api/parsers/stats")
+async def parser_pool_stats():
+    """Size and checkout counters of the shared parser pool."""
+    return parser_pool.get().stats()
 
-        Functions (file:name@lines):
-        {chr(10).join(f"{f['file']}:{f['name']}@{f['lines']}" for f in summary['functions'])}
 
-        Classes (file:name@lines [methods]):
-        {chr(10).join(f"{c['file']}:{c['name']}@{c['lines']} [{','.join(c['methods'])}]" for c in summary['classes'])}
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Report hit/miss counters of the persistent analysis cache, across all workers."""
+    stats = parallel_analyzer.get().cache_stats()
+    if stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **stats}
 
-        Imports (file@line:import):
-        {chr(10).join(f"{imp['file']}@L{imp['line']}:{imp['import']}" for imp in summary['imports'])}
 
-        Relationships:
-        {str(context.get('relationships', {}))}
-        """
+def query_limit(data: Dict[str, Any], key: str, ceiling: int) -> int:
+    """A positive query limit from the request body, capped at the configured ceiling."""
+    try:
+        value = int(data.get(key, ceiling))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+    if value < 1:
+        raise HTTPException(status_code=400, detail=f"{key} must be at least 1")
+    return min(value, ceiling)
+
+
+async def read_call_graph(request: Request) -> Tuple[CallGraph, Dict[str, Any]]:
+    """
+    Parse a call-graph query body and get the graph of its analysis, kept
+    with the stored analysis when the body names one by analysis_id.
+    """
+    data = await request.json()
+    if "analysis_id" in data:
+        stored = await get_analysis_or_404(data["analysis_id"])
+        return await run_in_threadpool(stored.call_graph), data
+
+    analysis = data.get("analysis")
+    if not isinstance(analysis, dict):
+        raise HTTPException(status_code=400, detail="analysis or analysis_id is required")
+    graph = await run_in_threadpool(CallGraph.from_analysis, analysis)
+    return graph, data
+
+
+def find_function(graph: CallGraph, data: Dict[str, Any], key: str) -> str:
+    """Resolve a function given by qualified name or unambiguous dotted suffix."""
+    name = data.get(key)
+    if not isinstance(name, str) or not name:
+        raise HTTPException(status_code=400, detail=f"{key} is required")
+
+    matches = graph.find(name)
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"Function not found: {name}")
+    if len(matches) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name} is ambiguous, use one of: {', '.join(sorted(matches)[:10])}"
+        )
+    return matches[0]
+
+
+async def call_graph_traversal(request: Request, reverse: bool) -> Dict[str, Any]:
+    graph, data = await read_call_graph(request)
+    function = find_function(graph, data, "function")
+    return await run_in_threadpool(
+        graph.bfs,
+        function,
+        reverse=reverse,
+        max_depth=query_limit(data, "max_depth", settings.CALLGRAPH_MAX_DEPTH),
+        max_results=query_limit(data, "max_results", settings.CALLGRAPH_MAX_RESULTS)
+    )
+
+
+@app.post("/api/callgraph/callers")
+async def call_graph_callers(request: Request):
+    """Functions that transitively call the given function."""
+    return await call_graph_traversal(request, reverse=True)
+
+
+@app.post("/api/callgraph/callees")
+async def call_graph_callees(request: Request):
+    """Functions the given function transitively reaches."""
+    return await call_graph_traversal(request, reverse=False)
+
+
+@app.post("/api/callgraph/path")
+async def call_graph_path(request: Request):
+    """Shortest call chain from source to target, if one exists within max_depth."""
+    graph, data = await read_call_graph(request)
+    source = find_function(graph, data, "source")
+    target = find_function(graph, data, "target")
+    path = await run_in_threadpool(
+        graph.shortest_path,
+        source,
+        target,
+        max_depth=query_limit(data, "max_depth", settings.CALLGRAPH_MAX_DEPTH)
+    )
+    return {"source": source, "target": target, "reachable": path is not None, "path": path}
+
+
+@app.post("/api/callgraph/cycles")
+async def call_graph_cycles(request: Request):
+    """Groups of mutually recursive functions, found as strongly connected components."""
+    graph, data = await read_call_graph(request)
+    return await run_in_threadpool(
+        graph.cycles,
+        max_results=query_limit(data, "max_results", settings.CALLGRAPH_MAX_RESULTS)
+    )
+
+
+@app.post("/api/callgraph/fan")
+async def call_graph_fan(request: Request):
+    """Functions with the most distinct callers and callees."""
+    graph, data = await read_call_graph(request)
+    result = graph.fan(limit=query_limit(data, "limit", settings.CALLGRAPH_MAX_RESULTS))
+    return {"functions": len(graph.names), "edges": graph.edge_count, **result}
+
+
+async def question_context(data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Prompt context for a question: the parts of the analysis most
+    relevant to it, packed into the token budget, and what was left out."""
+    builder = ContextBuilder(settings.LLM_CONTEXT_TOKEN_BUDGET)
+    if "analysis_id" in data:
+        # The stored analysis keeps its index between questions
+        stored = await get_analysis_or_404(data["analysis_id"])
+        with PHASE_SECONDS.time(phase="context"):
+            index = await run_in_threadpool(stored.context_index)
+            return await run_in_threadpool(builder.build, data["question"], None, index)
+    with PHASE_SECONDS.time(phase="context"):
+        return await run_in_threadpool(builder.build, data["question"], data["context"])
+
+
+@app.post("/api/ask-gpt")
+async def ask_gpt(request: Request):
+    try:
+        data = await request.json()
+        question = data["question"]
+        context_str, report = await question_context(data)
 
         # Get response from GPT
-        response = gpt_client.ask_question(question, context_str)
+        # The first question loads the client off the event loop
+        client = await run_in_threadpool(gpt_client.get)
+        response = await client.ask_question_async(question, context_str)
 
-        return {"answer": response}
+        return {"answer": response, "context": report}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def stream_answer(question: str, context_str: str, report: Dict[str, Any],
+                        received: float,
+                        format_event: Callable[[str, Any], str]) -> AsyncIterator[str]:
+    """
+    Yield the answer's text as the model produces it, then its latency.
+
+    If the client disconnects, StreamingResponse cancels this generator,
+    which closes the upstream model response as well.
+    """
+    yield format_event("context", report)
+
+    first_token: Optional[float] = None
+    try:
+        client = await run_in_threadpool(gpt_client.get)
+        async for text in client.stream_question(question, context_str):
+            if first_token is None:
+                first_token = time.perf_counter() - received
+            yield format_event("token", {"text": text})
+    except Exception as e:
+        yield format_event("error", {"error": str(e)})
+        return
+
+    total = time.perf_counter() - received
+    yield format_event("done", {
+        "time_to_first_token_ms": round(first_token * 1000, 1) if first_token is not None else None,
+        "total_ms": round(total * 1000, 1)
+    })
+
+
+@app.post("/api/ask-gpt/stream")
+async def ask_gpt_stream(request: Request):
+    """
+    Streaming variant of /api/ask-gpt. Emits newline-delimited JSON events,
+    or Server-Sent Events when the client accepts text/event-stream.
+    """
+    received = time.perf_counter()
+    data = await request.json()
+    if "question" not in data or ("context" not in data and "analysis_id" not in data):
+        raise HTTPException(status_code=400, detail="question and context or analysis_id are required")
+    context_str, report = await question_context(data)
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        format_event, media_type = format_sse_event, "text/event-stream"
+    else:
+        format_event, media_type = format_ndjson_event, "application/x-ndjson"
+
+    return StreamingResponse(
+        stream_answer(data["question"], context_str, report, received, format_event),
+        media_type=media_type,
+        # Keep proxies from buffering the answer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/ask-gpt/stats")
+async def response_cache_stats():
+    """Hit and miss counts of the answer cache, and model call counts."""
+    cache = {"enabled": False} if response_cache is None else {"enabled": True, **response_cache.stats()}
+    return {**cache, "client": gpt_client.get().stats() if gpt_client.created else None}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match names this entity tag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def diagram_response(request: Request, etag: str, body: Dict[str, Any],
+                     immutable: bool) -> Response:
+    """A diagram response with its ETag, or 304 when the client already has it."""
+    headers = {
+        "ETag": etag,
+        # A keyed diagram never changes; the latest one must be revalidated
+        "Cache-Control": "private, max-age=31536000, immutable" if immutable else "no-cache"
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
 @app.post("/api/generate-diagram")
 async def generate_diagram(request: Request):
+    """
+    Draw a flowchart of an analysis. Large analyses collapse to modules;
+    pass "module" to drill down into one module or package.
+    """
     try:
         data = await request.json()
-        analysis = data["analysis"]
-
-        # Always generate flowchart. I removed class diagram
-        # diagram = mermaid_generator.generate_flowchart(analysis) --- OLD, trying something new
-        mermaid_diagram = mermaid_generator.create_flowchart(analysis)
-        # print(f"ANALYSIS DATA: {analysis}")
-        # print(f"MERMAID DIAGRAM: {mermaid_diagram}")
-        return {"diagram": mermaid_diagram}
+        module = data.get("module") or None
+        options = {
+            "module": module,
+            "max_nodes": query_limit(data, "max_nodes", settings.DIAGRAM_MAX_NODES),
+            "max_edges": query_limit(data, "max_edges", settings.DIAGRAM_MAX_EDGES)
+        }
 
+        stored = None
+        if "analysis_id" in data:
+            stored = await get_analysis_or_404(data["analysis_id"])
+            # A stored analysis never changes, so its id stands for its content
+            key = DiagramCache.key({"analysis_id": stored.analysis_id}, options)
+        else:
+            analysis = data["analysis"]
+            key = await run_in_threadpool(DiagramCache.key, analysis, options)
+
+        result = await run_in_threadpool(diagram_cache.get, key)
+        if result is None:
+            # A generator per request, so no state is shared between diagrams
+            generator = MermaidGenerator(
+                max_nodes=options["max_nodes"], max_edges=options["max_edges"])
+            with PHASE_SECONDS.time(phase="diagram"):
+                if stored is not None:
+                    graph = await run_in_threadpool(stored.diagram_graph)
+                    result = await run_in_threadpool(generator.build, stored.view(), module, graph)
+                else:
+                    result = await run_in_threadpool(generator.build, analysis, module)
+            await run_in_threadpool(diagram_cache.put, key, result)
+
+        return diagram_response(request, f'"{key}"', {"key": key, **result}, immutable=True)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/diagram")
-async def get_diagram():
+async def get_diagram(request: Request, key: Optional[str] = None):
     """
-    Get the generated Mermaid diagram.
+    Get a generated Mermaid diagram by its key, or the latest one.
 
     Returns:
         Mermaid diagram markup
     """
     try:
+        if key is not None:
+            if not DiagramCache.is_key(key):
+                raise HTTPException(status_code=404, detail="Diagram not found")
+            # Keys are content addresses, so a matching tag needs no lookup
+            etag = f'"{key}"'
+            if etag_matches(request, etag):
+                return diagram_response(request, etag, {}, immutable=True)
+
+            result = await run_in_threadpool(diagram_cache.get, key)
+            if result is None:
+                raise HTTPException(status_code=404, detail="Diagram not found")
+            return diagram_response(request, etag, {"key": key, **result}, immutable=True)
+
         diagram_path = OUTPUT_DIR / "diagrams" / "codebase.mmd"
 
         if not diagram_path.exists():
@@ -239,24 +840,83 @@ async def get_diagram():
             )
 
         with open(diagram_path, "r") as f:
-            return {"diagram": f.read()}
+            diagram = f.read()
+        etag = '"' + hashlib.sha256(diagram.encode('utf8')).hexdigest() + '"'
+        return diagram_response(request, etag, {"diagram": diagram}, immutable=False)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.get("/api/diagram/stats")
+async def diagram_cache_stats():
+    """Report hit/miss counters of the diagram cache."""
+    return diagram_cache.stats()
+
+
+def cache_lookups() -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) of each cache set up so far."""
+    lookups = {}
+    analysis = parallel_analyzer.get().cache_stats() if parallel_analyzer.created else None
+    if analysis is not None:
+        lookups["analysis"] = (analysis["hits"], analysis["misses"])
+    for name, stats in (
+        ("diagram", diagram_cache.stats()),
+        ("response", response_cache.stats() if response_cache is not None else None),
+        ("analysis_store", analysis_store.stats())
+    ):
+        if stats is not None:
+            lookups[name] = (stats["memory_hits"] + stats["disk_hits"], stats["misses"])
+    return lookups
+
+
+REGISTRY.callback(
+    "code_analysis_cache_hits_total", "Cache lookups answered, by cache", "counter", ("cache",),
+    lambda: {(name,): hits for name, (hits, _) in cache_lookups().items()}
+)
+REGISTRY.callback(
+    "code_analysis_cache_misses_total", "Cache lookups not answered, by cache", "counter", ("cache",),
+    lambda: {(name,): misses for name, (_, misses) in cache_lookups().items()}
+)
+REGISTRY.callback(
+    "code_analysis_cache_hit_ratio", "Share of cache lookups answered, by cache", "gauge", ("cache",),
+    lambda: {
+        (name,): hits / (hits + misses) if hits + misses else 0.0
+        for name, (hits, misses) in cache_lookups().items()
+    }
+)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and counters in the Prometheus text format."""
+    # Cache stats may list a directory
+    body = await run_in_threadpool(REGISTRY.render)
+    return Response(body, media_type="text/plain; version=0.0.4")
+
 # Error handlers
 
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions."""
+    # API clients rely on the status code, e.g. 429 to back off
+    if request.url.path.startswith("/api/"):
+        return JSONResponse(
+            {"detail": exc.detail},
+            status_code=exc.status_code
+        )
+
     return templates.TemplateResponse(
         "error.html",
         {
             "request": request,
             "status_code": exc.status_code,
             "detail": exc.detail
-        }
+        },
+        status_code=exc.status_code
     )
 
 
@@ -269,5 +929,6 @@ async def general_exception_handler(request, exc):
             "request": request,
             "status_code": 500,
             "detail": "Internal server error"
-        }
+        },
+        status_code=500
     )
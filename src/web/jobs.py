@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import threading
+import time
+import uuid
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+class JobTimedOut(Exception):
+    """Raised inside a running job once it has passed its deadline."""
+
+
+class Job:
+    """A unit of background work with progress reporting and cooperative cancellation."""
+
+    def __init__(self, total: int, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.total = total
+        self.done = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.timeout = timeout
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    def advance(self, count: int = 1) -> None:
+        """Record progress and stop the job if it was cancelled or ran out of time."""
+        self.done += count
+        self.check()
+
+    def check(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        if self.started_at is not None and time.time() - self.started_at > self.timeout:
+            raise JobTimedOut()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a thread pool behind a bounded queue.
+
+    At most max_pending jobs may be queued or running at once; beyond
+    that submit() raises JobQueueFull so callers can push back. Finished
+    jobs are kept for retrieval until more than max_finished accumulate.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float,
+                 max_finished: int = 100):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job")
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_finished = max_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, total: int, work: Callable[[Job], Any],
+               cleanup: Optional[Callable[[], None]] = None) -> Job:
+        """Queue work(job) to run in the background and return its job."""
+        with self.lock:
+            pending = sum(
+                1 for job in self.jobs.values() if job.status not in FINISHED_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull()
+
+            job = Job(total, self.timeout)
+            self.jobs[job.id] = job
+
+        self.executor.submit(self._run, job, work, cleanup)
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], Any],
+             cleanup: Optional[Callable[[], None]]) -> None:
+        try:
+            if job.cancelled:
+                job.status = CANCELLED
+                return
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.result = work(job)
+            job.status = COMPLETED
+        except JobCancelled:
+            job.status = CANCELLED
+        except JobTimedOut:
+            job.status = TIMED_OUT
+            job.error = f"Job exceeded its {self.timeout:g}s time limit"
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if cleanup is not None:
+                cleanup()
+            self._prune()
+
+    def _prune(self) -> None:
+        with self.lock:
+            finished = [
+                job_id for job_id, job in self.jobs.items()
+                if job.status in FINISHED_STATES
+            ]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop; queued jobs never start, running ones stop at their next check."""
+        job = self.jobs.get(job_id)
+        if job is not None and job.status not in FINISHED_STATES:
+            job.cancel()
+            if job.status == QUEUED:
+                job.status = CANCELLED
+        return job
+
+    def shutdown(self) -> None:
+        for job in list(self.jobs.values()):
+            job.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import threading
+import time
+import uuid
+
+from analyzer.incremental import EditSession
+
+
+class SessionStore:
+    """
+    Holds live edit sessions by id.
+
+    Sessions idle for longer than ttl seconds are dropped, and once
+    max_sessions are open the least recently used one is evicted.
+    """
+
+    def __init__(self, factory: Callable[[], EditSession], max_sessions: int, ttl: float):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions: "OrderedDict[str, EditSession]" = OrderedDict()
+        self.last_used: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def _expire(self) -> None:
+        now = time.time()
+        for session_id in [
+            session_id for session_id, used in self.last_used.items()
+            if now - used > self.ttl
+        ]:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        self.last_used.pop(session_id, None)
+
+    def create(self) -> Tuple[str, EditSession]:
+        """Open a new empty session and return it with its id."""
+        with self.lock:
+            self._expire()
+            while len(self.sessions) >= self.max_sessions:
+                oldest = next(iter(self.sessions))
+                self._remove(oldest)
+
+            session_id = uuid.uuid4().hex
+            session = self.factory()
+            self.sessions[session_id] = session
+            self.last_used[session_id] = time.time()
+            return session_id, session
+
+    def get(self, session_id: str) -> Optional[EditSession]:
+        with self.lock:
+            self._expire()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                self.last_used[session_id] = time.time()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            found = session_id in self.sessions
+            self._remove(session_id)
+            return found
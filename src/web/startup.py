@@ -0,0 +1,72 @@
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """
+    Durations of the server's startup phases, and of the components
+    created later on first use.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self._mark = self.started
+        self.phases: Dict[str, float] = {}
+        self.components: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def phase(self, name: str) -> None:
+        """Close the phase running since the previous one ended."""
+        now = time.perf_counter()
+        self.phases[name] = now - self._mark
+        self._mark = now
+
+    def component(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.components[name] = seconds
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        return f"Started in {self._mark - self.started:.3f}s ({phases})"
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "boot_seconds": self._mark - self.started,
+                "phases": dict(self.phases),
+                # Components set up so far, and how long each took
+                "components": dict(self.components)
+            }
+
+
+class Lazy(Generic[T]):
+    """
+    A component created on first use rather than at import, so the server
+    starts without paying for it. Creation happens once, whichever thread
+    gets there first, and is timed.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], timer: StartupTimer):
+        self.name = name
+        self.factory = factory
+        self.timer = timer
+        self._value: Optional[T] = None
+        self._created = False
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._created
+
+    def get(self) -> T:
+        if not self._created:
+            with self._lock:
+                if not self._created:
+                    started = time.perf_counter()
+                    self._value = self.factory()
+                    self._created = True
+                    self.timer.component(self.name, time.perf_counter() - started)
+        return self._value
@@ -0,0 +1,25 @@
+from pathlib import Path
+import os
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+# Settings need no API key outside the web server
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from analyzer.tree_parser import CodeParser  # noqa: E402
+from config import settings  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def code_parser() -> CodeParser:
+    """The prebuilt grammar; tests needing it are skipped when it is not built."""
+    library = Path(settings.TREE_SITTER_LIBRARY)
+    if not library.is_absolute():
+        library = ROOT / library
+    if not library.exists():
+        pytest.skip(f"Grammar library {library} is not built")
+    return CodeParser(str(library), build_if_missing=False)
@@ -0,0 +1,65 @@
+"""Every construct the extractors record, for comparing extraction results."""
+import os
+import os.path as osp, sys
+from collections import OrderedDict, defaultdict as dd
+from . import sibling
+from ..parent.module import *
+
+
+def top(value, *args, **kwargs):
+    helper(value)
+    os.path.join("a", "b")
+    return [item(x) for x in args]
+
+
+@decorator(option=True)
+def decorated():
+    def inner(y):
+        def innermost():
+            return deep_call()
+        return innermost() + inner_call(y)
+    return inner(lambda z: lambda_call(z))
+
+
+async def coroutine():
+    await fetch()
+    async with session() as s:
+        s.get()
+
+
+class Plain:
+    attribute = factory()
+
+    def method(self):
+        return self.other().chained()
+
+    @staticmethod
+    def static():
+        pass
+
+    class Nested(Base):
+        def nested_method(self):
+            Plain.static()
+
+
+class Child(Plain, mixins.Mixin, metaclass=Meta):
+    def method(self):
+        super().method()
+        return [Child(), OrderedDict()]
+
+
+def later():
+    if True:
+        for i in range(3):
+            while cond(i):
+                with ctx() as c:
+                    try:
+                        c.run()
+                    except Error:
+                        handle()
+                    finally:
+                        cleanup()
+
+
+module_level_call()
+value = top(1)[0]
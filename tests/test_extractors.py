@@ -0,0 +1,65 @@
+from pathlib import Path
+import json
+
+from analyzer.code_analyzer import CodeAnalyzer
+from analyzer.extractors import RESULT_KEYS
+
+DATA = Path(__file__).resolve().parent / "data"
+
+
+def test_query_extraction_matches_cursor_walk(code_parser):
+    # Recorded with the recursive cursor-walk extractors the query replaced;
+    # fields added since then are left out of the comparison
+    expected = json.loads((DATA / "extraction_sample.expected.json").read_text())
+    source = (DATA / "extraction_sample.py").read_bytes()
+    extracted = CodeAnalyzer(code_parser).extract_source("extraction_sample.py", source)
+
+    assert set(extracted) == set(RESULT_KEYS)
+    for key in RESULT_KEYS:
+        projected = [
+            {field: record[field] for field in expected_record}
+            for record, expected_record in zip(extracted[key], expected[key])
+        ]
+        assert len(extracted[key]) == len(expected[key]), key
+        assert projected == expected[key], key
+
+
+def test_deeply_nested_code_does_not_recurse(code_parser):
+    depth = 3000
+    source = "def outer():\n    return " + "f(" * depth + ")" * depth + "\n"
+    extracted = CodeAnalyzer(code_parser).extract_source("deep.py", source.encode())
+
+    assert [record["name"] for record in extracted["functions"]] == ["outer"]
+    assert len(extracted["function_calls"]) == depth
+    assert all(call["caller"] == "outer" for call in extracted["function_calls"])
+
+
+class CountingParser:
+    def __init__(self, parser):
+        self.parser = parser
+        self.extractor = parser.extractor
+        self.parses = 0
+
+    def parse_bytes(self, content):
+        self.parses += 1
+        return self.parser.parse_bytes(content)
+
+
+def test_analyze_file_and_relationships_parse_once(code_parser, tmp_path):
+    paths = [tmp_path / "a.py", tmp_path / "b.py"]
+    paths[0].write_text("class A:\n    pass\n")
+    paths[1].write_text("from a import A\n\n\nclass B(A):\n    def f(self):\n        g()\n")
+    parser = CountingParser(code_parser)
+    analyzer = CodeAnalyzer(parser)
+
+    files = [analyzer.analyze_file(path) for path in paths]
+    relationships = analyzer.analyze_relationships(paths)
+    assert parser.parses == 2
+    assert [record["name"] for record in files[1]["classes"]] == ["B"]
+    assert [(record["class"], record["inherits_from"]) for record in relationships["class_inheritance"]] \
+        == [("B", "A")]
+
+    # A changed file is parsed again
+    paths[1].write_text("class B:\n    pass\n")
+    assert analyzer.analyze_relationships(paths)["class_inheritance"] == []
+    assert parser.parses == 3
@@ -0,0 +1,104 @@
+from pathlib import Path
+import random
+
+import pytest
+
+from analyzer.incremental import EditSession
+
+SOURCE = (Path(__file__).resolve().parent.parent / "src" / "analyzer" / "symbol_index.py").read_bytes()
+
+SNIPPETS = [
+    "", "\n", "x", "    ", "def added(value):\n    return helper(value)\n",
+    "class Added(Base):\n    def method(self):\n        return self.other()\n",
+    "import os\n", "from pkg.mod import name as alias\n", "call(1)", "(", ")", ":",
+]
+
+
+def new_session(code_parser) -> EditSession:
+    return EditSession(code_parser.new_parser(), code_parser.extractor)
+
+
+def fresh_results(code_parser, source: bytes):
+    session = new_session(code_parser)
+    session.add_file("main.py", source)
+    return session.file_results("main.py")
+
+
+def random_edit(rng: random.Random, length: int):
+    start = rng.randint(0, length)
+    end = min(length, start + rng.choice((0, 0, 1, 5, 40, 200)))
+    return {"start_byte": start, "end_byte": end, "text": rng.choice(SNIPPETS)}
+
+
+def apply_to(source: bytes, edits) -> bytes:
+    for edit in edits:
+        text = edit["text"].encode("utf8")
+        source = source[:edit["start_byte"]] + text + source[edit["end_byte"]:]
+    return source
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_incremental_matches_full_extraction(code_parser, seed):
+    rng = random.Random(seed)
+    session = new_session(code_parser)
+    session.add_file("main.py", SOURCE)
+    source = SOURCE
+    for _ in range(4):
+        edits = []
+        length = len(source)
+        for _ in range(rng.randint(1, 3)):
+            edit = random_edit(rng, length)
+            edits.append(edit)
+            length += len(edit["text"].encode("utf8")) - (edit["end_byte"] - edit["start_byte"])
+        session.apply_edits("main.py", edits)
+        source = apply_to(source, edits)
+        assert session.file_results("main.py") == fresh_results(code_parser, source)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rejected_batch_leaves_file_unchanged(code_parser, seed):
+    rng = random.Random(seed)
+    session = new_session(code_parser)
+    session.add_file("main.py", SOURCE)
+    before = session.file_results("main.py")
+
+    valid = random_edit(rng, len(SOURCE))
+    out_of_range = {"start_byte": 0, "end_byte": len(SOURCE) * 2, "text": ""}
+    with pytest.raises(ValueError):
+        session.apply_edits("main.py", [valid, out_of_range])
+    assert session.files["main.py"].source == SOURCE
+    assert session.file_results("main.py") == before
+
+    source = SOURCE
+    for _ in range(3):
+        edit = random_edit(rng, len(source))
+        session.apply_edits("main.py", [edit])
+        source = apply_to(source, [edit])
+    assert session.file_results("main.py") == fresh_results(code_parser, source)
+
+
+def test_failed_parse_keeps_previous_version(code_parser, monkeypatch):
+    session = new_session(code_parser)
+    session.add_file("main.py", SOURCE)
+    before = session.file_results("main.py")
+    edit = {"start_byte": 0, "end_byte": 0, "text": "def first():\n    pass\n"}
+
+    parser = session.parser
+
+    class TimingOut:
+        def parse(self, *args):
+            raise TimeoutError("parse timed out")
+
+    session.parser = TimingOut()
+    with pytest.raises(TimeoutError):
+        session.apply_edits("main.py", [edit])
+    session.parser = parser
+    assert session.file_results("main.py") == before
+
+    session.apply_edits("main.py", [edit])
+    assert session.file_results("main.py") == fresh_results(code_parser, apply_to(SOURCE, [edit]))
+
+
+def test_unknown_file(code_parser):
+    with pytest.raises(KeyError):
+        new_session(code_parser).apply_edits("missing.py", [])
@@ -0,0 +1,164 @@
+from pathlib import Path
+import shutil
+import subprocess
+
+import pytest
+
+from analyzer.parallel import ParallelAnalyzer
+from analyzer.repo_index import GitError, RepositoryIndex, SCAN
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+FILES = {
+    "pkg/__init__.py": "from .base import Base\n",
+    "pkg/base.py": "class Base:\n    def run(self):\n        pass\n\n\ndef util():\n    pass\n",
+    "pkg/child.py": (
+        "from pkg import Base\nfrom pkg.base import util\n\n\n"
+        "class Child(Base):\n    def go(self):\n        self.run()\n        util()\n"
+    ),
+    "app.py": "from pkg.child import Child\n\n\ndef main():\n    Child().go()\n",
+    "standalone.py": "def alone():\n    pass\n",
+    # Ignored by git, but analyzed like any other file
+    "gen/generated.py": "def gen_helper():\n    pass\n",
+    "uses_gen.py": "from gen.generated import gen_helper\n\n\ndef use():\n    gen_helper()\n",
+}
+
+
+def git(root: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=test", "-c", "user.email=test@localhost", *args],
+        check=True, capture_output=True
+    )
+
+
+@pytest.fixture
+def analyzer(code_parser):
+    analyzer = ParallelAnalyzer(code_parser, workers=1)
+    yield analyzer
+    analyzer.shutdown()
+
+
+@pytest.fixture
+def repo(tmp_path) -> Path:
+    root = tmp_path / "repo"
+    for name, source in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    (root / ".gitignore").write_text("gen/\n")
+    git(root, "init", "-q")
+    git(root, "add", "-A")
+    git(root, "commit", "-qm", "init")
+    return root
+
+
+def snapshot(index: RepositoryIndex):
+    return {file: index.record(file) for file in sorted(index.files)}
+
+
+def assert_matches_fresh(index: RepositoryIndex, root: Path, analyzer, directory: Path) -> None:
+    fresh = RepositoryIndex(directory, root, analyzer)
+    fresh.update()
+    assert snapshot(index) == snapshot(fresh)
+
+
+def update(tmp_path: Path, root: Path, analyzer, **kwargs):
+    index = RepositoryIndex(tmp_path / "index", root, analyzer)
+    return index, index.update(**kwargs)
+
+
+def test_full_build_matches_analysis(tmp_path, repo, analyzer):
+    index, stats = update(tmp_path, repo, analyzer)
+    assert stats["mode"] == "full"
+    assert sorted(index.files) == sorted(FILES)
+    resolved = {
+        (call["caller"], call["callee"])
+        for record in index.records() for call in record["resolved_calls"]
+    }
+    assert ("pkg.child.Child.go", "pkg.base.Base.run") in resolved
+    assert ("uses_gen.use", "gen.generated.gen_helper") in resolved
+
+
+def test_unchanged_tree_does_nothing(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    _, stats = update(tmp_path, repo, analyzer)
+    assert (stats["mode"], stats["analyzed"], stats["deleted"], stats["affected"]) == ("git", 0, [], [])
+
+
+def test_committed_changes(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    base = repo / "pkg" / "base.py"
+    base.write_text(base.read_text().replace("def run(", "def run_renamed("))
+    git(repo, "rm", "-q", "standalone.py")
+    (repo / "pkg" / "extra.py").write_text("from pkg.base import util\n\n\ndef extra():\n    util()\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", "change")
+
+    index, stats = update(tmp_path, repo, analyzer)
+    assert stats["mode"] == "git"
+    assert stats["analyzed"] == 2 and stats["added"] == 1
+    assert stats["deleted"] == ["standalone.py"]
+    # Only files whose imports reach a changed module are resolved again
+    assert {"pkg/child.py", "app.py"} <= set(stats["affected"])
+    assert "uses_gen.py" not in stats["affected"]
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh")
+
+
+def test_uncommitted_and_untracked_changes(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    with open(repo / "pkg" / "base.py", "a") as f:
+        f.write("\n\ndef late():\n    pass\n")
+    (repo / "untracked.py").write_text("from pkg.base import late\n\n\ndef fresh():\n    late()\n")
+    index, _ = update(tmp_path, repo, analyzer)
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh1")
+
+    # Reverting an edit git no longer reports is still picked up
+    git(repo, "checkout", "-q", "pkg/base.py")
+    (repo / "untracked.py").unlink()
+    index, stats = update(tmp_path, repo, analyzer)
+    assert stats["deleted"] == ["untracked.py"]
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh2")
+
+
+def test_gitignored_changes(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    generated = repo / "gen" / "generated.py"
+    generated.write_text(generated.read_text().replace("gen_helper", "gen_helper2"))
+    index, stats = update(tmp_path, repo, analyzer)
+    assert "gen/generated.py" in stats["affected"]
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh1")
+
+    generated.unlink()
+    (repo / "gen" / "other.py").write_text("def other():\n    pass\n")
+    index, stats = update(tmp_path, repo, analyzer)
+    assert stats["deleted"] == ["gen/generated.py"] and stats["added"] == 1
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh2")
+
+
+def test_scan_mode(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    base = repo / "pkg" / "base.py"
+    base.write_text(base.read_text().replace("def util(", "def util_renamed("))
+    index, stats = update(tmp_path, repo, analyzer, detect=SCAN)
+    assert stats["mode"] == "scan" and stats["analyzed"] == 1
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh")
+
+
+def test_since_until(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    (repo / "app.py").write_text(FILES["app.py"] + "\n\ndef more():\n    main()\n")
+    git(repo, "commit", "-qam", "more")
+    index, stats = update(tmp_path, repo, analyzer, since="HEAD~1", until="HEAD")
+    assert stats["analyzed"] == 1
+    assert_matches_fresh(index, repo, analyzer, tmp_path / "fresh")
+
+    with pytest.raises(GitError):
+        update(tmp_path, repo, analyzer, since="HEAD~1", until="HEAD~1")
+
+
+def test_outdated_index_is_rebuilt(tmp_path, repo, analyzer):
+    update(tmp_path, repo, analyzer)
+    index = RepositoryIndex(tmp_path / "index", repo, analyzer, ignore=["app.py"])
+    stats = index.update()
+    assert stats["mode"] == "full"
+    assert "app.py" not in index.files
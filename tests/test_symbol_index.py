@@ -0,0 +1,107 @@
+from typing import Dict, Set, Tuple
+
+import pytest
+
+from analyzer.code_analyzer import CodeAnalyzer
+from analyzer.results import AnalysisResults
+from analyzer.symbol_index import module_name
+
+FILES = {
+    "pkg/__init__.py": "from .core import Engine\nfrom .util import *\n",
+    "pkg/util.py": (
+        "def helper():\n    pass\n\n\n"
+        "def _private():\n    pass\n"
+    ),
+    "pkg/core.py": (
+        "from . import util\n"
+        "from .util import helper as assist\n\n\n"
+        "class Base:\n"
+        "    def start(self):\n        pass\n\n"
+        "    def stop(self):\n        pass\n\n\n"
+        "class Engine(Base):\n"
+        "    def run(self):\n"
+        "        self.start()\n"
+        "        self.stop()\n"
+        "        assist()\n"
+        "        util.helper()\n"
+        "        return self.missing()\n\n\n"
+        "def build():\n"
+        "    def configure():\n        pass\n"
+        "    configure()\n"
+        "    return Engine()\n"
+    ),
+    "app/main.py": (
+        "import pkg\n"
+        "import pkg.core as core\n"
+        "from pkg import Engine, helper\n"
+        "from pkg.core import build\n\n\n"
+        "class Custom(Engine):\n"
+        "    def go(self):\n"
+        "        self.run()\n"
+        "        self.start()\n\n\n"
+        "def main():\n"
+        "    build()\n"
+        "    core.build()\n"
+        "    pkg.Engine()\n"
+        "    helper()\n"
+        "    print('builtins stay unresolved')\n"
+        "    Custom().go()\n"
+    ),
+    # A cycle of re-exports must not loop
+    "cycle/a.py": "from cycle.b import name\n\n\ndef use():\n    name()\n",
+    "cycle/b.py": "from cycle.a import name\n",
+}
+
+
+@pytest.fixture(scope="module")
+def resolved(code_parser) -> Set[Tuple[str, str]]:
+    analyzer = CodeAnalyzer(code_parser)
+    results = AnalysisResults(list(FILES))
+    for name, source in FILES.items():
+        results.add({"file": name, **analyzer.extract_source(name, source.encode())})
+    results.resolve()
+    return {(call["caller"], call["callee"]) for call in results.relationships["resolved_calls"]}
+
+
+@pytest.mark.parametrize("caller, callee", [
+    # self methods, on the class and through its base
+    ("pkg.core.Engine.run", "pkg.core.Base.start"),
+    ("pkg.core.Engine.run", "pkg.core.Base.stop"),
+    # aliased from-import and a module imported from a relative package
+    ("pkg.core.Engine.run", "pkg.util.helper"),
+    # a nested function, then a class in the same module
+    ("pkg.core.build", "pkg.core.build.configure"),
+    ("pkg.core.build", "pkg.core.Engine"),
+    # inherited across files through a package re-export
+    ("app.main.Custom.go", "pkg.core.Engine.run"),
+    ("app.main.Custom.go", "pkg.core.Base.start"),
+    # absolute, aliased module, package attribute and star re-export
+    ("app.main.main", "pkg.core.build"),
+    ("app.main.main", "pkg.core.Engine"),
+    ("app.main.main", "pkg.util.helper"),
+    ("app.main.main", "app.main.Custom"),
+])
+def test_resolves(resolved, caller, callee):
+    assert (caller, callee) in resolved
+
+
+def test_leaves_unknown_calls_unresolved(resolved):
+    callees: Dict[str, Set[str]] = {}
+    for caller, callee in resolved:
+        callees.setdefault(caller, set()).add(callee)
+    # self.missing() and print() have no definition in the analyzed files
+    assert callees["pkg.core.Engine.run"] == {
+        "pkg.core.Base.start", "pkg.core.Base.stop", "pkg.util.helper"}
+    assert not any(caller.startswith("cycle.") for caller, _ in resolved)
+
+
+@pytest.mark.parametrize("path, module", [
+    ("pkg/mod.py", "pkg.mod"),
+    ("pkg/__init__.py", "pkg"),
+    ("site-packages/pkg/mod.py", "pkg.mod"),
+    ("repo.zip/pkg/mod.py", "pkg.mod"),
+    ("src\\pkg\\mod.py", "src.pkg.mod"),
+    ("my-script.py", "my-script"),
+])
+def test_module_name(path, module):
+    assert module_name(path) == module